@@ -1,5 +1,6 @@
+import heapq
 from datetime import datetime
-from sqlalchemy import select
+from sqlalchemy import select, and_
 from construct.database import projects_table, tasks_table
 from construct.utils import parse_user_date
 
@@ -33,11 +34,15 @@ class ConstructionAgent:
             fraction = elapsed_seconds / total_seconds
             return min(100.0, max(0.0, fraction * 100.0))
 
-    def analyze_progress(self, schedule_id: str):
+    def load_progress_inputs(self, schedule_id: str):
+        """
+        The DB half of analyze_progress: (target_tasks, progress_tasks, current_day),
+        or None if either schedule is missing.
+        """
         target_tasks = self.fetch_tasks(schedule_id, "target")
         progress_tasks = self.fetch_tasks(schedule_id, "in-progress")
         if not target_tasks or not progress_tasks:
-            return {"error": "Target or in-progress schedule not found"}
+            return None
         with self.engine.connect() as conn:
             row = conn.execute(
                 select(projects_table.c.current_in_progress_date)
@@ -46,6 +51,10 @@ class ConstructionAgent:
             ).fetchone()
         current_str = row[0] if row else None
         current_day = parse_user_date(current_str) or datetime.utcnow()
+        return target_tasks, progress_tasks, current_day
+
+    def compare_progress(self, schedule_id: str, target_tasks: list, progress_tasks: list, current_day: datetime):
+        """The CPU half of analyze_progress; needs no database."""
         target_dict = {t["task_id"]: t for t in target_tasks}
         progress_dict = {t["task_id"]: t for t in progress_tasks}
         insights = []
@@ -70,4 +79,163 @@ class ConstructionAgent:
         return {
             "schedule_id": schedule_id,
             "insights": insights if insights else ["no major schedule deviations detected."]
-        }
\ No newline at end of file
+        }
+
+    def summarize_progress(self, schedule_ids: list) -> dict:
+        """
+        Per-schedule progress summaries for many schedules with one set-based query:
+        target tasks joined to their in-progress rows and the status date.
+        Returns schedule_id -> {"tasks_compared", "behind", "ahead", "on_track", "worst_variance"};
+        schedules without both schedules get {"error": ...} like analyze_progress.
+        """
+        target = tasks_table.alias("target")
+        progress = tasks_table.alias("progress")
+        with self.engine.connect() as conn:
+            rows = conn.execute(
+                select(
+                    target.c.schedule_id, target.c.task_id, target.c.bl_start, target.c.bl_finish,
+                    progress.c.task_name, progress.c.percent_done, projects_table.c.current_in_progress_date,
+                )
+                .select_from(
+                    target.join(progress, and_(
+                        progress.c.schedule_id == target.c.schedule_id,
+                        progress.c.task_id == target.c.task_id,
+                        progress.c.schedule_type == "in-progress",
+                    )).outerjoin(projects_table, and_(
+                        projects_table.c.schedule_id == target.c.schedule_id,
+                        projects_table.c.schedule_type == "target",
+                    ))
+                )
+                .where(target.c.schedule_type == "target")
+                .where(target.c.schedule_id.in_(schedule_ids))
+            ).fetchall()
+
+        by_schedule = {}
+        for r in rows:
+            # Keyed by task_id so duplicate rows collapse the way analyze_progress's dicts do.
+            by_schedule.setdefault(r.schedule_id, {})[r.task_id] = r
+        now = datetime.utcnow()
+        summaries = {}
+        for schedule_id in schedule_ids:
+            tasks = by_schedule.get(schedule_id)
+            if not tasks:
+                summaries[schedule_id] = {"error": "Target or in-progress schedule not found"}
+                continue
+            current_day = parse_user_date(next(iter(tasks.values())).current_in_progress_date) or now
+            behind = ahead = 0
+            worst = None
+            for r in tasks.values():
+                actual = r.percent_done or 0.0
+                expected = self.compute_expected_percent_done(r.bl_start, r.bl_finish, current_day)
+                variance = actual - expected
+                if variance < 0:
+                    behind += 1
+                elif variance > 0:
+                    ahead += 1
+                if worst is None or variance < worst["variance"]:
+                    worst = {
+                        "task_id": r.task_id,
+                        "task_name": r.task_name,
+                        "progress": actual,
+                        "expected": round(expected, 1),
+                        "variance": round(variance, 1),
+                    }
+            summaries[schedule_id] = {
+                "tasks_compared": len(tasks),
+                "behind": behind,
+                "ahead": ahead,
+                "on_track": len(tasks) - behind - ahead,
+                "worst_variance": worst,
+            }
+        return summaries
+
+    def task_variances(self, target_tasks: list, progress_tasks: list, current_day: datetime) -> list:
+        """
+        One row per task present in both schedules: progress, expected progress and their
+        difference (negative = behind), plus the task's WBS and status for rollups.
+        """
+        progress_dict = {t["task_id"]: t for t in progress_tasks}
+        rows = []
+        for tid, ttarget in {t["task_id"]: t for t in target_tasks}.items():
+            tprogress = progress_dict.get(tid)
+            if tprogress is None:
+                continue
+            actual = tprogress.get("percent_done") or 0.0
+            expected = self.compute_expected_percent_done(ttarget.get("bl_start"), ttarget.get("bl_finish"), current_day)
+            rows.append({
+                "task_id": tid,
+                "task_name": tprogress.get("task_name"),
+                "wbs_value": tprogress.get("wbs_value") or ttarget.get("wbs_value"),
+                "status": tprogress.get("status"),
+                "progress": actual,
+                "expected": round(expected, 1),
+                "variance": round(actual - expected, 1),
+            })
+        return rows
+
+    def top_variances(self, schedule_id: str, k: int = 10):
+        """The k tasks furthest behind their expected progress, worst first."""
+        inputs = self.load_progress_inputs(schedule_id)
+        if inputs is None:
+            return {"error": "Target or in-progress schedule not found"}
+        rows = [r for r in self.task_variances(*inputs) if r["variance"] < 0]
+        return {"schedule_id": schedule_id, "behind": len(rows), "tasks": heapq.nsmallest(k, rows, key=lambda r: r["variance"])}
+
+    def wbs_rollup(self, schedule_id: str):
+        """Per-WBS task counts, average progress vs. expected and the worst task in each."""
+        inputs = self.load_progress_inputs(schedule_id)
+        if inputs is None:
+            return {"error": "Target or in-progress schedule not found"}
+        groups = {}
+        for r in self.task_variances(*inputs):
+            groups.setdefault(r["wbs_value"] or "(none)", []).append(r)
+        rollup = []
+        for wbs, rows in sorted(groups.items()):
+            worst = min(rows, key=lambda r: r["variance"])
+            rollup.append({
+                "wbs_value": wbs,
+                "tasks": len(rows),
+                "behind": sum(1 for r in rows if r["variance"] < 0),
+                "ahead": sum(1 for r in rows if r["variance"] > 0),
+                "avg_progress": round(sum(r["progress"] for r in rows) / len(rows), 1),
+                "avg_expected": round(sum(r["expected"] for r in rows) / len(rows), 1),
+                "worst_task": worst["task_name"] if worst["variance"] < 0 else None,
+                "worst_variance": worst["variance"],
+            })
+        return {"schedule_id": schedule_id, "wbs": rollup}
+
+    def status_counts(self, schedule_id: str):
+        """
+        In-progress task counts by status, and by schedule position (behind/ahead/on
+        track). Tasks without a status are classed by percent_done.
+        """
+        inputs = self.load_progress_inputs(schedule_id)
+        if inputs is None:
+            return {"error": "Target or in-progress schedule not found"}
+        by_status = {}
+        for t in inputs[1]:
+            status = t.get("status")
+            if not status:
+                done = t.get("percent_done") or 0.0
+                status = "Not Started" if done <= 0 else "Completed" if done >= 100 else "In Progress"
+            by_status[status] = by_status.get(status, 0) + 1
+        rows = self.task_variances(*inputs)
+        behind = sum(1 for r in rows if r["variance"] < 0)
+        ahead = sum(1 for r in rows if r["variance"] > 0)
+        return {
+            "schedule_id": schedule_id,
+            "by_status": by_status,
+            "behind": behind,
+            "ahead": ahead,
+            "on_track": len(rows) - behind - ahead,
+        }
+
+    def analyze_progress(self, schedule_id: str):
+        inputs = self.load_progress_inputs(schedule_id)
+        if inputs is None:
+            return {"error": "Target or in-progress schedule not found"}
+        return self.compare_progress(schedule_id, *inputs)
+
+def compare_progress(schedule_id: str, target_tasks: list, progress_tasks: list, current_day: datetime):
+    """Module-level entry point for ConstructionAgent.compare_progress, for the process pool."""
+    return ConstructionAgent(None).compare_progress(schedule_id, target_tasks, progress_tasks, current_day)
@@ -1,19 +1,135 @@
-from fastapi import FastAPI, HTTPException, Body
-from construct.database import init_db
-from construct.ingestion import ingest_schedule_data
-from construct.agent import ConstructionAgent
-from construct.llm_agent import run_llm_agent
-from construct.scheduler import run_optic
+from fastapi import FastAPI, HTTPException, Body, Request, Response
+from fastapi.responses import StreamingResponse, PlainTextResponse
+from fastapi.middleware.gzip import GZipMiddleware
+from construct.ingestion import parse_schedule_file, write_schedule_data
+from construct.agent import ConstructionAgent, compare_progress
+from construct.llm_agent import arun_llm_agent, astream_llm_agent, aclose_http_session
+from construct import executors
+from construct.planner_service import planner_service, PLANNER_MODES
+from construct.planner_cache import planner_cache
+from construct.llm_cache import llm_cache
+from construct.plan_cache import plan_cache
+from construct.metrics import metrics
+from construct.tracing import tracer, chrome_trace, speedscope, TRACING_CONFIG
 import json
+import asyncio
+from typing import List, Optional
 from pydantic import BaseModel
 from construct.project import create_project
 import os
+import hashlib
+import tempfile
+import threading
+from collections import OrderedDict
 from sqlalchemy import text
 from construct.eventing import event_manager
 from construct.event_handlers import schedule_ingested_handler
+from construct import outbox
+from construct.jobs import JobRegistry, QUEUED, RUNNING, SUCCEEDED
+from construct.project_management import get_data_version
+from construct.registry import project_registry, ProjectNotFound
+
+try:
+    # Optional: brotli for clients that accept it, gzip for the rest.
+    from brotli_asgi import BrotliMiddleware
+except ImportError:
+    BrotliMiddleware = None
 
 app = FastAPI()
 
+class SkipEventStreamCompression:
+    """
+    Compression for everything but Server-Sent Events: the compressors buffer small
+    writes, which would hold streamed events back until the response ends.
+    """
+    def __init__(self, app, compressor, **options):
+        self.app = app
+        self.compressed = compressor(app, **options)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "http" and _wants_event_stream(scope):
+            await self.app(scope, receive, send)
+        else:
+            await self.compressed(scope, receive, send)
+
+def _wants_event_stream(scope) -> bool:
+    accept = dict(scope.get("headers") or []).get(b"accept", b"")
+    return b"text/event-stream" in accept or scope["path"].endswith("/stream")
+
+COMPRESSION_MIN_BYTES = int(os.environ.get("CONSTRUCT_COMPRESSION_MIN_BYTES", "1024"))
+if BrotliMiddleware is not None:
+    app.add_middleware(SkipEventStreamCompression, compressor=BrotliMiddleware,
+                       minimum_size=COMPRESSION_MIN_BYTES, gzip_fallback=True)
+else:
+    app.add_middleware(SkipEventStreamCompression, compressor=GZipMiddleware, minimum_size=COMPRESSION_MIN_BYTES)
+
+class TraceRequests:
+    """
+    Runs each HTTP request in a trace: the client's X-Trace-Id if it sent one, else a
+    new id, returned in the X-Trace-Id response header. GET /traces/{trace_id} exports it.
+    """
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not tracer.enabled:
+            await self.app(scope, receive, send)
+            return
+        requested = dict(scope.get("headers") or []).get(b"x-trace-id", b"").decode("latin-1").strip()
+        with tracer.continue_trace(requested[:64] or None) as trace_id:
+            with tracer.span("http.request", method=scope["method"], path=scope["path"]) as span:
+                async def send_with_trace_id(message):
+                    if message["type"] == "http.response.start":
+                        span.set(status=message["status"])
+                        message.setdefault("headers", [])
+                        message["headers"] = list(message["headers"]) + [(b"x-trace-id", trace_id.encode("latin-1"))]
+                    await send(message)
+                await self.app(scope, receive, send_with_trace_id)
+
+app.add_middleware(TraceRequests)
+
+EVENT_CONFIG = {
+    "workers": int(os.environ.get("CONSTRUCT_EVENT_WORKERS", "2")),
+    "queue_size": int(os.environ.get("CONSTRUCT_EVENT_QUEUE_SIZE", "100")),
+}
+
+UPLOAD_CONFIG = {
+    "workers": int(os.environ.get("CONSTRUCT_INGEST_WORKERS", "2")),
+    "upload_dir": os.environ.get("CONSTRUCT_UPLOAD_DIR") or None,  # None: system temp dir
+    "max_bytes": int(os.environ.get("CONSTRUCT_UPLOAD_MAX_MB", "200")) * 1024 * 1024,
+    "max_tracked": int(os.environ.get("CONSTRUCT_UPLOAD_TRACKED", "1024")),  # uploads remembered for dedup
+}
+
+ingest_jobs = JobRegistry(max_workers=UPLOAD_CONFIG["workers"], name="ingest")
+# (db_url, schedule_id, schedule_type) -> (sha256, job) of the latest upload, to skip re-sends;
+# least recently uploaded evicted beyond max_tracked.
+_last_uploads = OrderedDict()
+_last_uploads_lock = threading.Lock()
+
+# Finish work a previous process accepted but never completed, for each DB as it is opened.
+project_registry.add_open_hook(outbox.ensure_replayed)
+
+@app.on_event("startup")
+def start_event_workers():
+    # Downstream artifact builds (PDDL generation) run off the request path.
+    event_manager.start(workers=EVENT_CONFIG["workers"], queue_size=EVENT_CONFIG["queue_size"])
+    outbox.completions.start()
+    # Opening the default DB replays its unfinished outbox events.
+    project_registry.engine()
+    if TRACING_CONFIG["profile_interval"] > 0:
+        tracer.start_profiler(TRACING_CONFIG["profile_interval"])
+
+@app.on_event("shutdown")
+def stop_event_workers():
+    event_manager.stop(wait=True)
+    outbox.completions.stop(wait=True)
+    executors.shutdown(wait=True)
+    tracer.stop_profiler()
+
+@app.on_event("shutdown")
+async def close_llm_connections():
+    await aclose_http_session()
+
 class CreateProjectRequest(BaseModel):
     project_name: str
     schedule_id: str
@@ -25,7 +141,8 @@ def create_project_endpoint(request: CreateProjectRequest):
     folder = os.path.join(request.project_folder, safe_name)
     os.makedirs(folder, exist_ok=True)
     project_file, db_file = create_project(request.project_name, request.schedule_id, folder)
-    engine = init_db(db_url=f"sqlite:///{db_file}")
+    info = project_registry.register(project_file)
+    project_registry.engine(info.db_url)
 
     # Register the schedule_ingested event handler if not already registered.
     if schedule_ingested_handler not in event_manager.listeners.get("schedule_ingested", []):
@@ -38,28 +155,27 @@ def create_project_endpoint(request: CreateProjectRequest):
         "db_file": os.path.abspath(db_file)
     }
 
+def resolve_project(project_handle: str = None, schedule_id: str = None):
+    """
+    (engine, project_folder) for a request, via the project registry: the project
+    handle if given, else the project that owns schedule_id, else the default DB.
+    Raises HTTPException(400) for a bad handle.
+    """
+    try:
+        return project_registry.resolve(project_handle, schedule_id)
+    except ProjectNotFound as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
 @app.post("/ingest-schedule/")
-def ingest_schedule(file_path: str, schedule_id: str, schedule_type: str = "target", project_handle: str = None):
-    if project_handle:
-        try:
-            # Ensure the project handle is an absolute path.
-            if not os.path.isabs(project_handle):
-                project_handle = os.path.abspath(project_handle)
-            with open(project_handle, "r") as f:
-                project_data = json.load(f)
-            db_file = project_data.get("db_file")
-            project_folder = project_data.get("project_folder")
-            if not db_file or not project_folder:
-                raise HTTPException(status_code=400, detail="Invalid project handle: missing db_file or project_folder")
-            engine = init_db(db_url=f"sqlite:///{db_file}")
-        except Exception as e:
-            raise HTTPException(status_code=400, detail=f"Could not open project handle: {e}")
-    else:
-        engine = init_db()
-        project_folder = None
+async def ingest_schedule(file_path: str, schedule_id: str, schedule_type: str = "target", project_handle: str = None):
+    engine, project_folder = await executors.run_io(resolve_project, project_handle, schedule_id)
 
-    # Pass the project_folder to the ingestion function so that generated PDDL files are written there.
-    schedule_data = ingest_schedule_data(
+    # Excel parsing is CPU-bound and runs in the process pool; the DB write on the I/O pool.
+    parsed = await executors.run_cpu(parse_schedule_file, file_path, schedule_id, schedule_type)
+    # Pass the project_folder so that generated PDDL files are written there.
+    schedule_data = await executors.run_io(
+        write_schedule_data,
+        parsed,
         file_path,
         schedule_id,
         schedule_type=schedule_type,
@@ -69,31 +185,293 @@ def ingest_schedule(file_path: str, schedule_id: str, schedule_type: str = "targ
     )
     if schedule_data is None:
         return {"error": "Failed to ingest schedule"}
-    return {"status": "success", "schedule_id": schedule_data.schedule_id}
+    return {"status": "success", "schedule_id": schedule_data.schedule_id, "event_id": schedule_data.event_id}
+
+def _ingest_upload(job, upload_path: str, schedule_id: str, schedule_type: str, engine, project_folder: str):
+    try:
+        parsed = executors.call_cpu(parse_schedule_file, upload_path, schedule_id, schedule_type)
+        schedule_data = write_schedule_data(
+            parsed,
+            upload_path,
+            schedule_id,
+            schedule_type=schedule_type,
+            engine=engine,
+            auto_generate_pddl=True,
+            project_folder=project_folder
+        )
+    finally:
+        os.remove(upload_path)
+    if schedule_data is None:
+        raise RuntimeError("Failed to ingest schedule")
+    return {"schedule_id": schedule_data.schedule_id, "event_id": schedule_data.event_id}
+
+@app.post("/upload-schedule/")
+async def upload_schedule(request: Request, schedule_id: str, schedule_type: str = "target",
+                          project_handle: str = None, filename: str = "schedule.xlsx"):
+    """
+    Ingest a workbook sent as the raw request body (application/octet-stream).
+    The body is streamed to a temp file chunk by chunk and hashed on the way, so the
+    workbook is never held in memory; ingestion runs as a background job.
+    Re-sending the same content for a schedule returns the earlier job instead of a new one.
+    """
+    engine, project_folder = await executors.run_io(resolve_project, project_handle, schedule_id)
+    suffix = os.path.splitext(filename)[1] or ".xlsx"
+    fd, upload_path = tempfile.mkstemp(prefix="upload_", suffix=suffix, dir=UPLOAD_CONFIG["upload_dir"])
+    digest = hashlib.sha256()
+    size = 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            async for chunk in request.stream():
+                size += len(chunk)
+                if size > UPLOAD_CONFIG["max_bytes"]:
+                    raise HTTPException(status_code=413, detail="Upload exceeds the size limit")
+                digest.update(chunk)
+                f.write(chunk)
+    except BaseException:
+        os.remove(upload_path)
+        raise
+    if size == 0:
+        os.remove(upload_path)
+        raise HTTPException(status_code=400, detail="Empty upload")
+    metrics.inc("construct_bytes_written_total", size, kind="upload")
+
+    sha256 = digest.hexdigest()
+    key = (outbox.db_url_of(engine), schedule_id, schedule_type)
+    with _last_uploads_lock:
+        previous = _last_uploads.get(key)
+        if previous and previous[0] == sha256 and previous[1].status in (QUEUED, RUNNING, SUCCEEDED):
+            os.remove(upload_path)
+            return {"status": "duplicate", "job_id": previous[1].job_id, "sha256": sha256}
+        job = ingest_jobs.submit(
+            "ingest", _ingest_upload, upload_path, schedule_id, schedule_type, engine, project_folder,
+            meta={"schedule_id": schedule_id, "schedule_type": schedule_type, "sha256": sha256, "bytes": size},
+        )
+        _last_uploads[key] = (sha256, job)
+        _last_uploads.move_to_end(key)
+        while len(_last_uploads) > UPLOAD_CONFIG["max_tracked"]:
+            _last_uploads.popitem(last=False)
+    return {"status": "submitted", "job_id": job.job_id, "sha256": sha256}
+
+@app.get("/ingest-jobs/{job_id}")
+def ingest_job_status(job_id: str, wait: float = 0):
+    job = ingest_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown ingest job {job_id}")
+    if wait:
+        job.wait(wait)
+    return job.to_dict(include_result=True)
+
+@app.get("/events/metrics")
+def event_metrics():
+    return event_manager.metrics()
+
+@app.get("/events/{event_id}")
+def event_status(event_id: str, wait: float = 0):
+    handle = event_manager.get_handle(event_id)
+    if handle is None:
+        raise HTTPException(status_code=404, detail=f"Unknown event {event_id}")
+    if wait:
+        handle.wait(wait)
+    return handle.to_dict()
+
+def _etag_matches(request: Request, etag: str) -> bool:
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [c.strip().removeprefix("W/") for c in header.split(",")]
+    return "*" in candidates or etag.removeprefix("W/") in candidates
 
 @app.get("/compare-schedules/{schedule_id}")
-def compare_schedules(schedule_id: str):
-    engine = init_db()
+async def compare_schedules(schedule_id: str, request: Request, response: Response, project_handle: str = None):
+    engine, _ = await executors.run_io(resolve_project, project_handle, schedule_id)
+    # Weak tag: the body is the same JSON whichever encoding the compression layer picks.
+    etag = 'W/"' + await executors.run_io(get_data_version, engine, schedule_id) + '"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
     agent = ConstructionAgent(engine)
-    result = agent.analyze_progress(schedule_id)
+    inputs = await executors.run_io(agent.load_progress_inputs, schedule_id)
+    if inputs is None:
+        result = {"error": "Target or in-progress schedule not found"}
+    else:
+        result = await executors.run_cpu(compare_progress, schedule_id, *inputs)
+    response.headers.update(headers)
     return {"schedule_id": schedule_id, "analysis": result}
 
+class BatchCompareItem(BaseModel):
+    schedule_id: str
+    project_handle: Optional[str] = None
+
+class BatchCompareRequest(BaseModel):
+    schedules: List[BatchCompareItem]
+
+MAX_BATCH_SCHEDULES = int(os.environ.get("CONSTRUCT_MAX_BATCH_SCHEDULES", "1000"))
+
+def _group_by_database(items: list):
+    """Resolve each item; returns ({db_url: (engine, [schedule_id])}, per-item db_url or error)."""
+    groups = {}
+    routes = []
+    for item in items:
+        try:
+            engine, _ = resolve_project(item.project_handle, item.schedule_id)
+        except HTTPException as e:
+            routes.append({"error": e.detail})
+            continue
+        db_url = outbox.db_url_of(engine)
+        schedule_ids = groups.setdefault(db_url, (engine, []))[1]
+        if item.schedule_id not in schedule_ids:
+            schedule_ids.append(item.schedule_id)
+        routes.append(db_url)
+    return groups, routes
+
+@app.post("/compare-schedules/batch")
+async def compare_schedules_batch(request: BatchCompareRequest):
+    """
+    Progress summaries for many schedules at once: one query per project DB, with the
+    DBs queried in parallel. Items are routed like /compare-schedules.
+    """
+    if len(request.schedules) > MAX_BATCH_SCHEDULES:
+        raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_SCHEDULES} schedules per batch")
+    groups, routes = await executors.run_io(_group_by_database, request.schedules)
+    db_urls = list(groups)
+    outcomes = await asyncio.gather(
+        *(executors.run_io(ConstructionAgent(groups[url][0]).summarize_progress, groups[url][1]) for url in db_urls),
+        return_exceptions=True,
+    )
+    summaries = {}
+    for url, outcome in zip(db_urls, outcomes):
+        if isinstance(outcome, Exception):
+            outcome = {schedule_id: {"error": str(outcome)} for schedule_id in groups[url][1]}
+        summaries[url] = outcome
+    results = []
+    for item, route in zip(request.schedules, routes):
+        summary = route if isinstance(route, dict) else summaries[route][item.schedule_id]
+        results.append({"schedule_id": item.schedule_id, "project_handle": item.project_handle, **summary})
+    return {"results": results, "databases": len(db_urls)}
+
 @app.post("/agent-analyze/")
-def agent_analyze(schedule_id: str, prompt: str):
-    result = run_llm_agent(schedule_id, prompt)
+async def agent_analyze(schedule_id: str, prompt: str):
+    # The agent's tools find the schedule's project DB through the project registry.
+    result = await arun_llm_agent(schedule_id, prompt)
     return {"schedule_id": schedule_id, "analysis": result}
 
+def _sse(event: dict) -> str:
+    return f"event: {event['event']}\ndata: {json.dumps(event, default=str)}\n\n"
+
+@app.get("/agent-analyze/stream")
+async def agent_analyze_stream(schedule_id: str, prompt: str):
+    """
+    /agent-analyze/ as Server-Sent Events: the plan, each step and its result, the
+    final answer token by token, then "done" with the full analysis. Failures end
+    the stream with an "error" event.
+    """
+    async def events():
+        try:
+            async for event in astream_llm_agent(schedule_id, prompt):
+                yield _sse(event)
+        except Exception as e:
+            print(f"debug: agent stream for {schedule_id} failed: {e}")
+            yield _sse({"event": "error", "detail": str(e)})
+
+    return StreamingResponse(events(), media_type="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",  # keep reverse proxies from buffering the stream
+    })
+
 @app.post("/run-scheduler/")
-def run_scheduler(schedule_id: str):
-    engine = init_db()
+def run_scheduler(schedule_id: str, timeout: float = None, memory_limit_mb: int = None, mode: str = "single",
+                  project_handle: str = None):
+    engine, _ = resolve_project(project_handle, schedule_id)
     with engine.connect() as conn:
+        # The whole-schedule row; per-chunk rows (chunked mode) carry a chunk name.
         row = conn.execute(
-            text("SELECT * FROM pddl_mappings WHERE schedule_id = :schedule_id"),
+            text("SELECT * FROM pddl_mappings WHERE schedule_id = :schedule_id AND chunk IS NULL"),
             {"schedule_id": schedule_id}
         ).fetchone()
     if row is None:
         return {"error": f"No PDDL mapping found for schedule {schedule_id}"}
     
     mapping = row._mapping
-    result = run_optic(mapping["domain_file"], mapping["problem_file"])
-    return {"status": "success", "result": result}
\ No newline at end of file
+    if mode not in PLANNER_MODES:
+        raise HTTPException(status_code=400, detail=f"Unknown planner mode: {mode}")
+    job = planner_service.submit(
+        schedule_id,
+        engine,
+        mapping,
+        timeout=timeout,
+        memory_limit_mb=memory_limit_mb,
+        mode=mode
+    )
+    return {"status": "submitted", "job_id": job.job_id}
+
+@app.get("/scheduler-jobs/{job_id}")
+def scheduler_job_status(job_id: str):
+    status = planner_service.status(job_id)
+    if status is None:
+        raise HTTPException(status_code=404, detail=f"Unknown planner job {job_id}")
+    return status
+
+@app.get("/scheduler-jobs/{job_id}/result")
+def scheduler_job_result(job_id: str, wait: float = 0):
+    result = planner_service.result(job_id, timeout=wait)
+    if result is None:
+        raise HTTPException(status_code=404, detail=f"Unknown planner job {job_id}")
+    return result
+
+@app.delete("/scheduler-jobs/{job_id}")
+def cancel_scheduler_job(job_id: str):
+    if planner_service.status(job_id) is None:
+        raise HTTPException(status_code=404, detail=f"Unknown planner job {job_id}")
+    return {"job_id": job_id, "cancelled": planner_service.cancel(job_id)}
+
+@app.get("/planner-cache/stats")
+def planner_cache_stats():
+    return planner_cache.stats()
+
+@app.get("/llm-cache/stats")
+def llm_cache_stats():
+    return llm_cache.stats()
+
+@app.get("/plan-cache/stats")
+def plan_cache_stats():
+    return plan_cache.stats()
+
+def _collect_cache_and_event_metrics():
+    samples = []
+    for cache_name, cache in (("llm", llm_cache), ("planner", planner_cache), ("plan", plan_cache)):
+        stats = cache.stats()
+        samples.append(("construct_cache_requests_total", "counter", {"cache": cache_name, "result": "hit"}, stats["hits"]))
+        samples.append(("construct_cache_requests_total", "counter", {"cache": cache_name, "result": "miss"}, stats["misses"]))
+    for name, value in event_manager.metrics().items():
+        if name in ("debouncing", "queued"):
+            samples.append(("construct_events_pending", "gauge", {"stage": name}, value))
+        else:
+            samples.append(("construct_events_total", "counter", {"counter": name}, value))
+    return samples
+
+metrics.add_collector(_collect_cache_and_event_metrics)
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def prometheus_metrics():
+    """Counters and latency histograms in the Prometheus text format."""
+    return PlainTextResponse(metrics.render_prometheus(), media_type="text/plain; version=0.0.4")
+
+TRACE_FORMATS = {"chrome": chrome_trace, "speedscope": speedscope}
+
+@app.get("/traces")
+def list_traces():
+    """Recent traces, most recent first."""
+    return tracer.traces()
+
+@app.get("/traces/{trace_id}")
+def export_trace(trace_id: str, format: str = "chrome"):
+    """
+    The spans of one trace (and profiler samples, if the profiler ran) as Chrome trace
+    JSON (chrome://tracing, Perfetto) or speedscope JSON.
+    """
+    if format not in TRACE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown format {format}; use one of {', '.join(TRACE_FORMATS)}")
+    trace = tracer.get(trace_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail=f"Unknown trace {trace_id}")
+    return TRACE_FORMATS[format](trace, trace_id)
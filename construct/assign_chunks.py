@@ -1,5 +1,9 @@
 from datetime import datetime, timedelta
+from construct.metrics import metrics
+from construct.tracing import tracer
 
+@tracer.traced("assign_chunks")
+@metrics.instrument("construct_stage_seconds", stage="assign_chunks")
 def assign_chunks(tasks: list, chunk_length_days: int) -> list:
     """
     Assign a chunk identifier to each task based on the overall schedule's baseline timespan.
@@ -87,5 +91,6 @@ def assign_chunks(tasks: list, chunk_length_days: int) -> list:
         print(f"Task {task.get('task_id', 'N/A')}: start={start_dt}, finish={finish_dt}, midpoint={mid_dt} => chunk_{chunk_index}")
     
     unique_chunks = sorted({task["chunk"] for task in tasks}, key=lambda x: int(x.split("_")[1]))
+    metrics.inc("construct_tasks_processed_total", len(tasks), stage="assign_chunks")
     print("Unique chunks assigned:", unique_chunks)
     return unique_chunks
\ No newline at end of file
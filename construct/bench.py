@@ -0,0 +1,209 @@
+# construct/bench.py
+"""
+End-to-end pipeline benchmark on synthetic schedules.
+
+For each size, a fresh project database is filled from generate_schedule() and every
+pipeline stage is timed on its own:
+
+    generate      build the synthetic schedule in memory
+    write_files   write target and in-progress workbooks (Excel up to excel_max_tasks, else CSV)
+    parse         parse_schedule_file on both workbooks
+    ingest        write_schedule_data for both schedules (plus dependency edges)
+    assign_chunks assign_chunks over the schedule's tasks
+    pddl          domain and current-chunk problem generation (the ingest event's work)
+    analyze       ConstructionAgent.analyze_progress
+    summarize     ConstructionAgent.summarize_progress (the batch endpoint's query)
+    schedule      heuristic scheduler over the dependency graph
+
+The first four stages load the schedule and always run; the others can be selected.
+Results are written as JSON; pass a previous results file as baseline to print the
+change per stage.
+"""
+import contextlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+
+DEFAULT_SIZES = [1_000, 10_000, 100_000, 1_000_000]
+LOAD_STAGES = ["generate", "write_files", "parse", "ingest"]
+STAGES = LOAD_STAGES + ["assign_chunks", "pddl", "analyze", "summarize", "schedule"]
+
+BENCH_CONFIG = {
+    "output_dir": os.environ.get("CONSTRUCT_BENCH_DIR", os.path.join("gen", "bench")),
+    "excel_max_tasks": int(os.environ.get("CONSTRUCT_BENCH_EXCEL_MAX_TASKS", "10000")),
+    "chunk_length_days": 28,
+}
+
+def _git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True, timeout=5,
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+        ).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+_devnull = None
+
+@contextlib.contextmanager
+def _quiet(verbose: bool):
+    """
+    The pipeline prints per task; keep that off the terminal unless asked for. The
+    sink stays open: SQL echo logging binds to whatever stdout was at engine creation.
+    """
+    global _devnull
+    if verbose:
+        yield
+        return
+    if _devnull is None:
+        _devnull = open(os.devnull, "w")
+    with contextlib.redirect_stdout(_devnull):
+        yield
+
+class _Run:
+    """Times the stages of one size; a failed stage is recorded and the rest still run."""
+    def __init__(self, n_tasks: int, stages: list, verbose: bool):
+        self.n_tasks = n_tasks
+        self.stages = stages
+        self.verbose = verbose
+        self.results = []
+
+    def stage(self, name: str, fn, *args, **kwargs):
+        if name not in self.stages and name not in LOAD_STAGES:
+            return None
+        started = time.perf_counter()
+        result = None
+        entry = {"tasks": self.n_tasks, "stage": name}
+        try:
+            with _quiet(self.verbose):
+                result = fn(*args, **kwargs)
+        except Exception as e:
+            entry["error"] = f"{type(e).__name__}: {e}"
+        entry["seconds"] = round(time.perf_counter() - started, 4)
+        self.results.append(entry)
+        status = entry.get("error") or f"{entry['seconds']:.3f}s"
+        print(f"  {name:<14} {status}", file=sys.stderr)
+        return result
+
+def bench_size(n_tasks: int, workdir: str, stages: list = None, seed: int = 0,
+               excel_max_tasks: int = None, verbose: bool = False, **generator_options) -> list:
+    """Run the pipeline once at n_tasks; returns one {"tasks", "stage", "seconds"[, "error"]} per stage."""
+    from construct.database import init_db
+    from construct.synthetic import generate_schedule, write_excel, write_csv, write_dependencies
+    from construct.ingestion import parse_schedule_file, write_schedule_data
+    from construct.project_management import set_current_in_progress_date
+    from construct.assign_chunks import assign_chunks
+    from construct.pddl_generation import generate_domain_for_target, generate_pddl_chunks_for_schedule
+    from construct.agent import ConstructionAgent
+    from construct.heuristic_scheduler import load_schedule_graph, list_schedule
+
+    stages = stages or STAGES
+    excel_max_tasks = BENCH_CONFIG["excel_max_tasks"] if excel_max_tasks is None else excel_max_tasks
+    schedule_id = f"BENCH{n_tasks}"
+    folder = os.path.join(workdir, f"tasks_{n_tasks}")
+    os.makedirs(folder, exist_ok=True)
+    run = _Run(n_tasks, stages, verbose)
+    print(f"{n_tasks} tasks:", file=sys.stderr)
+
+    with _quiet(verbose):
+        engine = init_db(f"sqlite:///{os.path.join(folder, 'bench.db')}")
+    schedule = run.stage("generate", generate_schedule, n_tasks, seed=seed, **generator_options)
+    writer = write_excel if n_tasks <= excel_max_tasks else write_csv
+    paths = schedule and run.stage("write_files", writer, schedule, folder)
+    parsed = paths and run.stage("parse", lambda: {
+        schedule_type: parse_schedule_file(path, schedule_id, schedule_type)
+        for schedule_type, path in paths.items()
+    })
+    if not parsed:
+        return run.results
+
+    def ingest():
+        for schedule_type, rows in parsed.items():
+            write_schedule_data(rows, paths[schedule_type], schedule_id, schedule_type, engine,
+                                auto_generate_pddl=False)
+        write_dependencies(schedule, engine, schedule_id)
+        set_current_in_progress_date(engine, schedule_id, schedule["status_date"])
+
+    run.stage("ingest", ingest)
+    del schedule, parsed
+
+    agent = ConstructionAgent(engine)
+    run.stage("assign_chunks", lambda: assign_chunks(
+        agent.fetch_tasks(schedule_id, "target"), BENCH_CONFIG["chunk_length_days"]
+    ))
+    pddl_dir = os.path.join(folder, "pddl")
+    run.stage("pddl", lambda: (
+        generate_domain_for_target(schedule_id, engine, output_dir=pddl_dir),
+        generate_pddl_chunks_for_schedule(schedule_id, engine, BENCH_CONFIG["chunk_length_days"], output_dir=pddl_dir),
+    ))
+    run.stage("analyze", agent.analyze_progress, schedule_id)
+    run.stage("summarize", agent.summarize_progress, [schedule_id])
+    run.stage("schedule", lambda: list_schedule(*load_schedule_graph(engine, schedule_id)))
+    engine.dispose()
+    return run.results
+
+def compare(results: list, baseline: list) -> list:
+    """(tasks, stage, seconds, baseline seconds, ratio) for stages timed in both runs."""
+    before = {(r["tasks"], r["stage"]): r["seconds"] for r in baseline if "error" not in r}
+    rows = []
+    for r in results:
+        key = (r["tasks"], r["stage"])
+        if "error" in r or key not in before:
+            continue
+        ratio = r["seconds"] / before[key] if before[key] else None
+        rows.append((r["tasks"], r["stage"], r["seconds"], before[key], ratio))
+    return rows
+
+def run_bench(sizes: list = None, stages: list = None, seed: int = 0, output: str = None,
+              baseline: str = None, workdir: str = None, excel_max_tasks: int = None, verbose: bool = False,
+              **generator_options) -> dict:
+    """Benchmark every size and write the results JSON; returns the report."""
+    sizes = sizes or DEFAULT_SIZES
+    unknown = set(stages or []) - set(STAGES)
+    if unknown:
+        raise ValueError(f"Unknown stages: {', '.join(sorted(unknown))}")
+    workdir = workdir or tempfile.mkdtemp(prefix="construct_bench_")
+    report = {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "git_commit": _git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": {"sizes": sizes, "stages": stages or STAGES, "seed": seed,
+                   "excel_max_tasks": BENCH_CONFIG["excel_max_tasks"] if excel_max_tasks is None else excel_max_tasks,
+                   **generator_options},
+        "results": [],
+    }
+    for n_tasks in sizes:
+        report["results"].extend(bench_size(n_tasks, workdir, stages, seed=seed, excel_max_tasks=excel_max_tasks,
+                                            verbose=verbose, **generator_options))
+
+    if output is None:
+        os.makedirs(BENCH_CONFIG["output_dir"], exist_ok=True)
+        stamp = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S")
+        output = os.path.join(BENCH_CONFIG["output_dir"], f"bench_{stamp}.json")
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    report["output"] = output
+
+    print(f"\n{'tasks':>9}  {'stage':<14}{'seconds':>10}", end="")
+    changes = {}
+    if baseline:
+        with open(baseline, "r") as f:
+            changes = {(t, s): (b, ratio) for t, s, _, b, ratio in compare(report["results"], json.load(f)["results"])}
+        print(f"{'baseline':>10}{'change':>9}", end="")
+    print()
+    for r in report["results"]:
+        line = f"{r['tasks']:>9}  {r['stage']:<14}"
+        line += f"{'error':>10}" if "error" in r else f"{r['seconds']:>10.3f}"
+        if (r["tasks"], r["stage"]) in changes:
+            before, ratio = changes[(r["tasks"], r["stage"])]
+            line += f"{before:>10.3f}" + (f"{(ratio - 1) * 100:>+8.0f}%" if ratio is not None else "")
+        print(line)
+    print(f"\nresults: {output}")
+    return report
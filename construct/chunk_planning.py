@@ -0,0 +1,183 @@
+# construct/chunk_planning.py
+import os
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from sqlalchemy import select, insert, update
+from construct.database import tasks_table, pddl_mappings_table
+from construct.db_writer import write
+from construct.assign_chunks import assign_chunks
+from construct.pddl_generation import generate_domain, generate_problem_for_chunk
+from construct.utils import compute_duration
+from construct.plan_parser import PlanStep, PlanCollector, plan_makespan
+from construct.heuristic_scheduler import load_schedule_graph, list_schedule
+from construct.optimized_schedule import OPTIMIZED_SCHEDULE_TYPE, build_optimized_result, get_plan_origin
+from construct.scheduler import run_planner, PlannerTimeout, PLANNER_PROCESS_CONFIG
+from construct.metrics import metrics
+
+def _chunk_index(chunk: str) -> int:
+    return int(chunk.split("_")[1])
+
+def _write_if_changed(path: str, content: str):
+    # Unchanged files keep their mtime, and the planner cache key stays stable.
+    if os.path.isfile(path):
+        with open(path, "r") as f:
+            if f.read() == content:
+                return
+    with open(path, "w") as f:
+        f.write(content)
+    metrics.inc("construct_bytes_written_total", len(content), kind="pddl")
+
+def generate_all_chunk_problems(schedule_id: str, engine, chunk_length_days: int = 28, output_dir: str = None) -> dict:
+    """
+    Write the domain and one problem file per chunk, and record a pddl_mappings row per chunk.
+    Each chunk's problem starts from the final state of its predecessors (all their tasks
+    done) and has that chunk's tasks as its goal.
+    Returns {"domain": path, "problems": {chunk: path}, "tasks": {chunk: [task_id, ...]}}.
+    """
+    if output_dir is None:
+        output_dir = os.path.join("gen", f"schedule_{schedule_id}")
+    os.makedirs(output_dir, exist_ok=True)
+
+    with engine.connect() as conn:
+        task_rows = conn.execute(
+            select(tasks_table)
+            .where(tasks_table.c.schedule_id == schedule_id)
+            .where(tasks_table.c.schedule_type != OPTIMIZED_SCHEDULE_TYPE)
+        ).fetchall()
+    tasks = [dict(r._mapping) for r in task_rows]
+    for t in tasks:
+        if not t.get("duration"):
+            if t.get("bl_start") and t.get("bl_finish"):
+                t["duration"] = compute_duration(t["bl_start"], t["bl_finish"])
+            else:
+                t["duration"] = 1
+    chunks = assign_chunks(tasks, chunk_length_days)
+    # A task's target and in-progress rows can fall into different chunks by their dates;
+    # each task is planned once, in the chunk of its target row.
+    owner = {}
+    for t in sorted(tasks, key=lambda t: t["schedule_type"] != "target"):
+        owner.setdefault(t["task_id"], t["chunk"])
+    for t in tasks:
+        t["chunk"] = owner[t["task_id"]]
+    used = set(owner.values())
+    chunks = [c for c in chunks if c in used]
+
+    domain_file = os.path.join(output_dir, "domain.pddl")
+    _write_if_changed(domain_file, generate_domain(schedule_id, engine))
+
+    problems = {}
+    # Target and in-progress rows share task ids; keep each id once.
+    chunk_tasks = {c: {} for c in chunks}
+    for t in tasks:
+        chunk_tasks[t["chunk"]][t["task_id"]] = None
+    chunk_tasks = {c: list(ids) for c, ids in chunk_tasks.items()}
+    for chunk in chunks:
+        problem_file = os.path.join(output_dir, f"problem_{chunk}.pddl")
+        _write_if_changed(problem_file, generate_problem_for_chunk(schedule_id, engine, tasks, chunks, chunk))
+        problems[chunk] = problem_file
+
+    now = datetime.now(timezone.utc).isoformat()
+    def _upsert(conn):
+        existing = {
+            r.chunk for r in conn.execute(
+                select(pddl_mappings_table.c.chunk)
+                .where(pddl_mappings_table.c.schedule_id == schedule_id)
+                .where(pddl_mappings_table.c.chunk.is_not(None))
+            )
+        }
+        for chunk, problem_file in problems.items():
+            values = {"domain_file": domain_file, "problem_file": problem_file, "created_at": now}
+            if chunk in existing:
+                conn.execute(
+                    update(pddl_mappings_table)
+                    .where(pddl_mappings_table.c.schedule_id == schedule_id)
+                    .where(pddl_mappings_table.c.chunk == chunk)
+                    .values(**values)
+                )
+            else:
+                conn.execute(insert(pddl_mappings_table), {"schedule_id": schedule_id, "chunk": chunk, **values})
+    write(engine, _upsert)
+    return {"domain": domain_file, "problems": problems, "tasks": chunk_tasks}
+
+def _solve_chunk(chunk: str, domain_file: str, problem_file: str, task_ids: list, graph,
+                 engine, timeout: float, memory_limit_mb: int, on_start) -> dict:
+    """
+    Solve one chunk with OPTIC, falling back to the list scheduler on the chunk's tasks.
+    Steps are offsets from the chunk's own start.
+    """
+    wanted = {t.lower(): t for t in task_ids}
+    plan = PlanCollector()
+    try:
+        run_planner(domain_file, problem_file, timeout=timeout, memory_limit_mb=memory_limit_mb,
+                    on_start=on_start, engine=engine, on_line=plan.feed)
+        steps = [
+            PlanStep(wanted[s.task_id.lower()], s.start, s.duration)
+            for s in plan.steps
+            if s.task_id.lower() in wanted
+        ]
+        planner = "optic"
+    except (FileNotFoundError, PlannerTimeout, subprocess.CalledProcessError) as e:
+        print(f"debug: chunk {chunk} falling back to heuristic scheduler: {e}")
+        tasks, dependencies, completed = graph
+        subset = {t: tasks[t] for t in task_ids if t in tasks}
+        steps = list_schedule(subset, dependencies, completed)
+        planner = "heuristic"
+    return {"chunk": chunk, "planner": planner, "steps": steps, "makespan": plan_makespan(steps)}
+
+def stitch_chunk_plans(chunk_results: list) -> tuple:
+    """
+    Lay chunk plans end to end: each chunk starts at the accumulated makespan of the
+    chunks before it. Returns (steps, per-chunk summaries).
+    """
+    offset = 0.0
+    steps = []
+    summary = []
+    for result in sorted(chunk_results, key=lambda r: _chunk_index(r["chunk"])):
+        steps.extend(PlanStep(s.task_id, s.start + offset, s.duration) for s in result["steps"])
+        summary.append({
+            "chunk": result["chunk"],
+            "planner": result["planner"],
+            "steps": len(result["steps"]),
+            "makespan": result["makespan"],
+            "offset": offset,
+        })
+        offset += result["makespan"]
+    return steps, summary
+
+def run_chunked(schedule_id: str, engine, chunk_length_days: int = 28, output_dir: str = None,
+                timeout: float = None, memory_limit_mb: int = None, max_workers: int = None,
+                on_start=None) -> dict:
+    """
+    Plan every chunk of a schedule concurrently and stitch the chunk plans into one
+    project-wide optimized schedule.
+
+    A chunk is warm-started from its predecessor: its initial state is the predecessor's
+    final state (every earlier task done, encoded in the chunk's problem), and its plan
+    starts at the predecessor's finishing makespan. Because the final state is fixed by
+    the predecessor's goal, the chunks can be solved in parallel and the makespan offsets
+    applied when stitching, so solve time scales with cores rather than project length.
+    """
+    files = generate_all_chunk_problems(schedule_id, engine, chunk_length_days, output_dir)
+    if output_dir is None:
+        output_dir = os.path.dirname(os.path.abspath(files["domain"]))
+    graph = load_schedule_graph(engine, schedule_id)
+    # Each thread runs one OPTIC process; run_planner also takes a slot from the shared
+    # planner process budget, so concurrent chunked jobs cannot exceed it together.
+    max_workers = max_workers or PLANNER_PROCESS_CONFIG["max_processes"]
+
+    with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="chunk-planner") as pool:
+        futures = [
+            pool.submit(
+                _solve_chunk, chunk, files["domain"], problem_file, files["tasks"][chunk], graph,
+                engine, timeout, memory_limit_mb, on_start,
+            )
+            for chunk, problem_file in files["problems"].items()
+        ]
+        chunk_results = [f.result() for f in futures]
+
+    steps, summary = stitch_chunk_plans(chunk_results)
+    origin = get_plan_origin(engine, schedule_id)
+    result = build_optimized_result(engine, schedule_id, steps, origin, output_dir, planner="optic-chunked")
+    result["chunks"] = summary
+    return result
@@ -1,12 +1,13 @@
 # construct/database.py
 import os
 from sqlalchemy import (
-    create_engine, Table, Column, Integer, String, MetaData, ForeignKey, Float
+    create_engine, Table, Column, Integer, String, MetaData, ForeignKey, Float, inspect, text, event
 )
+from sqlalchemy.exc import OperationalError
+from construct.db_writer import file_lock, lock_path_for
 
 metadata = MetaData()
 gen_folder = "gen"
-os.makedirs(gen_folder, exist_ok=True)
 
 projects_table = Table(
     "projects",
@@ -19,6 +20,7 @@ projects_table = Table(
     Column("project_start_date", String, nullable=True),
     Column("project_end_date", String, nullable=True),
     Column("current_in_progress_date", String, nullable=True),
+    Column("data_version", Integer, nullable=True),  # bumped on every write; drives ETags
 )
 
 tasks_table = Table(
@@ -70,6 +72,20 @@ analysis_history_table = Table(
     Column("timestamp", String),
 )
 
+llm_response_cache_table = Table(
+    "llm_response_cache",
+    metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("cache_key", String, unique=True),  # sha256 of model, temperature and messages
+    Column("model", String),
+    Column("temperature", Float),
+    Column("response", String),
+    Column("size_bytes", Integer),
+    Column("hits", Integer),
+    Column("created_at", String),
+    Column("last_accessed", String),
+)
+
 # NEW: Define the events_table so that all modules can import it.
 events_table = Table(
     "events",
@@ -79,13 +95,92 @@ events_table = Table(
     Column("event_type", String),
     Column("event_details", String),
     Column("timestamp", String),
+    # Outbox columns; plain log rows leave these empty (see construct/outbox.py).
+    Column("event_id", String, nullable=True, index=True),
+    Column("payload", String, nullable=True),  # JSON, serializable keys only
+    Column("status", String, nullable=True),   # "pending", "claimed", "done" or "failed"
+    Column("attempts", Integer, nullable=True),
+    Column("last_error", String, nullable=True),
+    Column("processed_at", String, nullable=True),
+    Column("owner", String, nullable=True),        # process dispatching a claimed event
+    Column("lease_until", String, nullable=True),  # after this another process may replay it
+)
+
+planner_cache_table = Table(
+    "planner_cache",
+    metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("cache_key", String, unique=True),
+    Column("planner_args", String),
+    Column("output", String),
+    Column("size_bytes", Integer),
+    Column("hits", Integer),
+    Column("created_at", String),
+    Column("last_accessed", String),
 )
 
+planner_portfolio_runs_table = Table(
+    "planner_portfolio_runs",
+    metadata,
+    Column("id", Integer, primary_key=True, autoincrement=True),
+    Column("schedule_id", String),
+    Column("config_name", String),  # the portfolio configuration that won
+    Column("makespan", Float),
+    Column("elapsed_seconds", Float),
+    Column("created_at", String),
+)
+
+def default_db_url() -> str:
+    db_path = os.path.abspath(os.path.join(gen_folder, "construct.db"))
+    return f"sqlite:///{db_path}"
+
 def init_db(db_url: str = None):
     if not db_url:
-        db_path = os.path.abspath(os.path.join(gen_folder, "construct.db"))
-        db_url = f"sqlite:///{db_path}"
+        db_url = default_db_url()
     print(f"debug: initializing db at {db_url}")
     engine = create_engine(db_url, echo=True)
+    if engine.dialect.name == "sqlite":
+        event.listen(engine, "connect", _sqlite_pragmas)
+        database = engine.url.database
+        if database and database != ":memory:":
+            # Created here rather than at import, so importing the package writes nothing.
+            os.makedirs(os.path.dirname(os.path.abspath(database)), exist_ok=True)
     metadata.create_all(engine)
-    return engine
\ No newline at end of file
+    add_missing_columns(engine)
+    return engine
+
+SQLITE_BUSY_TIMEOUT_MS = int(os.environ.get("CONSTRUCT_SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+def _sqlite_pragmas(dbapi_connection, connection_record):
+    # WAL lets readers proceed while the single writer (construct/db_writer.py) commits.
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.close()
+
+def add_missing_columns(engine):
+    """
+    create_all() only creates missing tables; add columns introduced since a project
+    database was created so older .cproj databases keep working. Runs under the
+    database's write lock and re-reads the columns there, so worker processes starting
+    together against an old database do not race each other's ALTER TABLE.
+    """
+    with file_lock(lock_path_for(engine)), engine.begin() as conn:
+        inspector = inspect(conn)
+        for table in metadata.sorted_tables:
+            if not inspector.has_table(table.name):
+                continue
+            existing = {c["name"] for c in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name in existing:
+                    continue
+                col_type = column.type.compile(dialect=engine.dialect)
+                print(f"debug: adding column {table.name}.{column.name}")
+                try:
+                    with conn.begin_nested():
+                        conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN "{column.name}" {col_type}'))
+                except OperationalError as e:
+                    # Added by a process that does not take our lock; nothing left to do.
+                    if "duplicate column" not in str(e).lower():
+                        raise
@@ -0,0 +1,159 @@
+# construct/db_writer.py
+"""
+Single-writer access to project SQLite files.
+
+All writes to a database go through one DatabaseWriter: a thread that takes write jobs
+(callables receiving a Connection) from a queue and commits them in batches, holding a
+cross-process file lock for the duration of each transaction so several API worker
+processes on one host take turns instead of failing with "database is locked". Lock
+errors that still get through are retried with exponential backoff.
+
+Readers are not involved: init_db() puts file databases in WAL mode, where readers see
+the last committed state while a write is in progress.
+"""
+import contextvars
+import functools
+import os
+import queue
+import random
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+from sqlalchemy.exc import OperationalError
+from construct.metrics import metrics
+from construct.tracing import tracer
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows; fall back to in-process locking only
+    fcntl = None
+
+WRITER_CONFIG = {
+    "max_batch": int(os.environ.get("CONSTRUCT_WRITE_BATCH", "32")),
+    "max_retries": int(os.environ.get("CONSTRUCT_WRITE_RETRIES", "6")),
+    "backoff_seconds": float(os.environ.get("CONSTRUCT_WRITE_BACKOFF", "0.05")),
+}
+
+def is_lock_error(error: Exception) -> bool:
+    message = str(error).lower()
+    return isinstance(error, OperationalError) and ("locked" in message or "busy" in message)
+
+def lock_path_for(engine):
+    """Path of the cross-process lock file for a SQLite engine (None for in-memory DBs)."""
+    database = engine.url.database
+    if engine.dialect.name != "sqlite" or not database or database == ":memory:":
+        return None
+    return os.path.abspath(database) + ".write.lock"
+
+@contextmanager
+def file_lock(path: str):
+    if path is None or fcntl is None:
+        yield
+        return
+    with open(path, "a") as f:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+class DatabaseWriter:
+    def __init__(self, engine, max_batch: int = 32, max_retries: int = 6, backoff_seconds: float = 0.05):
+        self.engine = engine
+        self.lock_path = lock_path_for(engine)
+        self.max_batch = max_batch
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._loop, name=f"db-writer-{engine.url.database}", daemon=True)
+        self._thread.start()
+
+    def submit(self, fn) -> Future:
+        """Queue fn(conn) to run inside a write transaction; the Future gets its return value."""
+        if threading.current_thread() is self._thread:
+            raise RuntimeError("Write jobs must use the connection they are given, not submit more writes")
+        future = Future()
+        # The job runs in the submitter's context, so its span joins the submitter's trace.
+        job = functools.partial(contextvars.copy_context().run, _traced_job, fn)
+        self._queue.put((job, future))
+        return future
+
+    def write(self, fn, timeout: float = None):
+        """Run fn(conn) in a write transaction and return its result (or raise its error)."""
+        return self.submit(fn).result(timeout)
+
+    def _loop(self):
+        while True:
+            batch = [self._queue.get()]
+            while len(batch) < self.max_batch:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._run_batch(batch)
+
+    def _run_batch(self, batch: list):
+        pending = [(fn, future) for fn, future in batch if future.set_running_or_notify_cancel()]
+        with metrics.timed("construct_db_write_seconds"):
+            self._commit(pending)
+        metrics.inc("construct_db_write_jobs_total", len(pending))
+
+    def _commit(self, pending: list):
+        if len(pending) > 1:
+            try:
+                results = self._with_retry(lambda conn: [fn(conn) for fn, _ in pending])
+            except Exception:
+                # Something in the batch failed and it was rolled back: rerun each job
+                # alone so one bad write only fails its own caller.
+                pass
+            else:
+                for (_, future), result in zip(pending, results):
+                    future.set_result(result)
+                return
+        for fn, future in pending:
+            try:
+                future.set_result(self._with_retry(fn))
+            except Exception as e:
+                future.set_exception(e)
+
+    def _with_retry(self, fn):
+        delay = self.backoff_seconds
+        for attempt in range(self.max_retries + 1):
+            try:
+                with file_lock(self.lock_path):
+                    with self.engine.begin() as conn:
+                        return fn(conn)
+            except OperationalError as e:
+                if not is_lock_error(e) or attempt == self.max_retries:
+                    raise
+                print(f"debug: database locked, retrying write in {delay:.2f}s")
+                metrics.inc("construct_db_lock_retries_total")
+                time.sleep(delay * (1 + random.random()))
+                delay *= 2
+
+def _traced_job(fn, conn):
+    with tracer.span("db.write_job", job=getattr(fn, "__qualname__", repr(fn))):
+        return fn(conn)
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+def get_writer(engine) -> DatabaseWriter:
+    """The single writer for an engine's database, started on first use."""
+    key = engine.url.render_as_string(hide_password=False)
+    with _writers_lock:
+        writer = _writers.get(key)
+        if writer is None:
+            writer = DatabaseWriter(
+                engine,
+                max_batch=WRITER_CONFIG["max_batch"],
+                max_retries=WRITER_CONFIG["max_retries"],
+                backoff_seconds=WRITER_CONFIG["backoff_seconds"],
+            )
+            _writers[key] = writer
+        return writer
+
+def write(engine, fn, timeout: float = None):
+    """Run fn(conn) through the engine's single writer."""
+    return get_writer(engine).write(fn, timeout)
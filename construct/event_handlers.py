@@ -1,23 +1,43 @@
+import os
 from construct.eventing import event_manager, Event
+from construct.outbox import engine_for
+from construct.executors import call_cpu
 from construct.pddl_generation import generate_domain_for_target, generate_pddl_chunks_for_schedule
 
+def build_pddl_artifacts(schedule_id: str, schedule_type: str, db_url: str, project_folder: str = None):
+    """Regenerate the PDDL for an ingested schedule. Module-level so it can run in the process pool."""
+    engine = engine_for(db_url)
+    if schedule_type == "target":
+        # When a target schedule is ingested, just generate the domain.
+        generate_domain_for_target(schedule_id, engine, output_dir=project_folder)
+        print(f"Domain PDDL generated for target schedule {schedule_id}.")
+    elif schedule_type == "in-progress":
+        # In-progress ingestions update the problem (chunk) files.
+        generate_pddl_chunks_for_schedule(schedule_id, engine, chunk_length_days=28, output_dir=project_folder)
+        print(f"Problem chunks updated for in-progress schedule {schedule_id}.")
+
 def schedule_ingested_handler(event: Event):
     payload = event.payload
-    schedule_id = payload.get("schedule_id")
-    schedule_type = payload.get("schedule_type")
-    engine = payload.get("engine")
-    project_folder = payload.get("project_folder")
-    auto_generate = payload.get("auto_generate_pddl", False)
-
-    if auto_generate:
-        if schedule_type == "target":
-            # When a target schedule is ingested, just generate the domain.
-            generate_domain_for_target(schedule_id, engine, output_dir=project_folder)
-            print(f"Domain PDDL generated for target schedule {schedule_id}.")
-        elif schedule_type == "in-progress":
-            # In-progress ingestions update the problem (chunk) files.
-            generate_pddl_chunks_for_schedule(schedule_id, engine, chunk_length_days=28, output_dir=project_folder)
-            print(f"Problem chunks updated for in-progress schedule {schedule_id}.")
+    if not payload.get("auto_generate_pddl", False):
+        return
+    args = (payload.get("schedule_id"), payload.get("schedule_type"), payload["db_url"], payload.get("project_folder"))
+    if payload["db_url"] in ("sqlite://", "sqlite:///:memory:"):
+        # An in-memory database only exists in this process.
+        build_pddl_artifacts(*args)
+    else:
+        # PDDL generation is CPU-heavy; keep it off the event worker's GIL.
+        call_cpu(build_pddl_artifacts, *args)
 
 # Register the handler
-event_manager.add_listener("schedule_ingested", schedule_ingested_handler)
\ No newline at end of file
+event_manager.add_listener("schedule_ingested", schedule_ingested_handler)
+
+# Bulk uploads of the same schedule within the window collapse into one PDDL rebuild.
+# Target and in-progress ingests stay separate since they build different artifacts, and
+# so do projects (databases) that happen to use the same schedule_id.
+SCHEDULE_INGESTED_COALESCE_SECONDS = float(os.environ.get("CONSTRUCT_EVENT_COALESCE_SECONDS", "2.0"))
+SCHEDULE_INGESTED_KEY_FIELDS = ("db_url", "schedule_id", "schedule_type", "project_folder")
+event_manager.coalesce(
+    "schedule_ingested",
+    key_fields=SCHEDULE_INGESTED_KEY_FIELDS,
+    window=SCHEDULE_INGESTED_COALESCE_SECONDS,
+)
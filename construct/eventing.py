@@ -1,11 +1,108 @@
+import heapq
+import itertools
+import queue
+import threading
+import time
+import traceback
+import uuid
+from collections import OrderedDict
+from datetime import datetime, timezone
+from construct.metrics import metrics
+from construct.tracing import tracer
+
 class Event:
-    def __init__(self, event_type: str, payload: dict = None):
+    def __init__(self, event_type: str, payload: dict = None, event_id: str = None):
         self.event_type = event_type
         self.payload = payload or {}
+        self.event_id = event_id or uuid.uuid4().hex
+
+class EventQueueFull(Exception):
+    """Raised when the dispatch queue stays full for longer than the emit timeout."""
+
+class EventHandle:
+    """
+    Tracks the dispatch of one event to its listeners.
+    status goes pending -> running -> done; listener failures are collected in
+    `errors` instead of propagating, so one bad listener cannot stop the others.
+    """
+    def __init__(self, event: Event):
+        self.event = event
+        self.status = "pending"
+        self.errors = []
+        self.coalesced = 0  # later emits merged into this dispatch
+        self.emitted_at = datetime.now(timezone.utc).isoformat()
+        self.finished_at = None
+        self._done = threading.Event()
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    @property
+    def event_id(self) -> str:
+        return self.event.event_id
+
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: float = None) -> bool:
+        return self._done.wait(timeout)
+
+    def add_done_callback(self, fn):
+        """Call fn(handle) once dispatch finishes (immediately if it already has)."""
+        with self._lock:
+            if not self._done.is_set():
+                self._callbacks.append(fn)
+                return
+        fn(self)
+
+    def _finish(self):
+        with self._lock:
+            self.status = "done"
+            self.finished_at = datetime.now(timezone.utc).isoformat()
+            self._done.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for fn in callbacks:
+            fn(self)
+
+    def to_dict(self) -> dict:
+        return {
+            "event_id": self.event_id,
+            "event_type": self.event.event_type,
+            "status": self.status,
+            "errors": list(self.errors),
+            "coalesced": self.coalesced,
+            "trace_id": self.event.payload.get("trace_id"),
+            "emitted_at": self.emitted_at,
+            "finished_at": self.finished_at,
+        }
 
 class EventManager:
-    def __init__(self):
+    """
+    Dispatches events to listeners.
+    By default listeners run inline in emit(). After start(), events go onto a bounded
+    queue drained by worker threads; emit() returns as soon as the event is queued and
+    blocks (backpressure) while the queue is full.
+
+    Event types registered with coalesce() are debounced in queued mode: an event is held
+    for `window` seconds, and further events with the same key arriving meanwhile are merged
+    into it (latest payload wins, the window restarts, capped at max_delay), so the listeners
+    run once. Every emitter gets the same handle back.
+    """
+    def __init__(self, max_handles: int = 1000):
         self.listeners = {}
+        self.max_handles = max_handles
+        self._handles = OrderedDict()
+        self._handles_lock = threading.Lock()
+        self._queue = None
+        self._workers = []
+        self._put_timeout = None
+        self._coalesce_rules = {}
+        self._pending = {}          # coalesce key -> [handle, due, latest_due]
+        self._timers = []           # heap of (due, seq, key)
+        self._seq = itertools.count()
+        self._pending_cond = threading.Condition()
+        self._debouncer = None
+        self._counters = {"emitted": 0, "dispatched": 0, "coalesced": 0, "listener_errors": 0}
+        self._counters_lock = threading.Lock()
 
     def add_listener(self, event_type: str, listener):
         if event_type not in self.listeners:
@@ -16,9 +113,190 @@ class EventManager:
         if event_type in self.listeners:
             self.listeners[event_type].remove(listener)
 
-    def emit(self, event: Event):
-        for listener in self.listeners.get(event.event_type, []):
-            listener(event)
+    def coalesce(self, event_type: str, key_fields=("schedule_id",), window: float = 2.0, max_delay: float = None):
+        """
+        Merge events of `event_type` whose payloads agree on `key_fields` and arrive within
+        `window` seconds of each other. max_delay (default 5 * window) bounds how long a
+        steady stream of events can postpone dispatch. A window of 0 disables coalescing.
+        """
+        if window <= 0:
+            self._coalesce_rules.pop(event_type, None)
+            return
+        self._coalesce_rules[event_type] = (tuple(key_fields), window, max_delay or 5 * window)
+
+    def _count(self, name: str, n: int = 1):
+        with self._counters_lock:
+            self._counters[name] += n
+
+    def metrics(self) -> dict:
+        with self._counters_lock:
+            data = dict(self._counters)
+        with self._pending_cond:
+            data["debouncing"] = len(self._pending)
+        data["queued"] = self.pending_count()
+        return data
+
+    @property
+    def async_mode(self) -> bool:
+        return bool(self._workers)
+
+    def start(self, workers: int = 2, queue_size: int = 100, put_timeout: float = 30.0):
+        """
+        Switch to queued dispatch with `workers` threads and a queue of `queue_size` events.
+        put_timeout bounds how long emit() waits on a full queue before raising EventQueueFull.
+        """
+        if self._workers or workers <= 0:
+            return
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._put_timeout = put_timeout
+        for i in range(workers):
+            worker = threading.Thread(
+                target=self._worker_loop, args=(self._queue,), name=f"event-worker-{i}", daemon=True
+            )
+            worker.start()
+            self._workers.append(worker)
+        self._debouncer = threading.Thread(target=self._debounce_loop, name="event-debouncer", daemon=True)
+        self._debouncer.start()
+
+    def stop(self, wait: bool = True):
+        """Flush debounced events, drain the queue (if wait) and go back to inline dispatch."""
+        if not self._workers:
+            return
+        with self._pending_cond:
+            workers, self._workers = self._workers, []
+            flushed = [entry[0] for entry in self._pending.values()]
+            self._pending.clear()
+            self._timers.clear()
+            self._pending_cond.notify_all()
+        # The debouncer may be handing over an event it already took off _pending; let it
+        # finish (the workers are still draining) before the queue goes away.
+        self._debouncer.join()
+        self._debouncer = None
+        q, self._queue = self._queue, None
+        for handle in flushed:
+            q.put(handle)
+        for _ in workers:
+            q.put(None)
+        if wait:
+            for worker in workers:
+                worker.join()
+
+    def emit(self, event: Event) -> EventHandle:
+        tracer.inject(event.payload)
+        self._count("emitted")
+        rule = self._coalesce_rules.get(event.event_type)
+        if rule and self.async_mode:
+            return self._emit_coalesced(event, rule)
+        handle = self._register(event)
+        if not self.async_mode:
+            self._dispatch(handle)
+            return handle
+        self._enqueue(handle)
+        return handle
+
+    def _register(self, event: Event) -> EventHandle:
+        handle = EventHandle(event)
+        with self._handles_lock:
+            self._handles[event.event_id] = handle
+            while len(self._handles) > self.max_handles:
+                oldest_id, oldest = next(iter(self._handles.items()))
+                if not oldest.done():
+                    break
+                del self._handles[oldest_id]
+        return handle
+
+    def _enqueue(self, handle: EventHandle):
+        try:
+            self._queue.put(handle, timeout=self._put_timeout)
+        except queue.Full:
+            with self._handles_lock:
+                self._handles.pop(handle.event_id, None)
+            raise EventQueueFull(f"Event queue full; could not dispatch {handle.event.event_type}")
+
+    def _emit_coalesced(self, event: Event, rule) -> EventHandle:
+        key_fields, window, max_delay = rule
+        key = (event.event_type,) + tuple(event.payload.get(k) for k in key_fields)
+        now = time.monotonic()
+        with self._pending_cond:
+            entry = self._pending.get(key)
+            if entry is not None:
+                handle = entry[0]
+                handle.event.payload = event.payload
+                handle.coalesced += 1
+                entry[1] = min(now + window, entry[2])
+                self._count("coalesced")
+                return handle
+            handle = self._register(event)
+            self._pending[key] = [handle, now + window, now + max_delay]
+            heapq.heappush(self._timers, (now + window, next(self._seq), key))
+            self._pending_cond.notify()
+        return handle
+
+    def _debounce_loop(self):
+        while True:
+            with self._pending_cond:
+                if not self._workers:
+                    return
+                if not self._timers:
+                    self._pending_cond.wait()
+                    continue
+                due, _, key = self._timers[0]
+                delay = due - time.monotonic()
+                if delay > 0:
+                    self._pending_cond.wait(delay)
+                    continue
+                heapq.heappop(self._timers)
+                entry = self._pending.get(key)
+                if entry is None:
+                    continue
+                if entry[1] > due:
+                    # Another event arrived and pushed the window out; re-arm.
+                    heapq.heappush(self._timers, (entry[1], next(self._seq), key))
+                    continue
+                del self._pending[key]
+                handle = entry[0]
+            try:
+                self._enqueue(handle)
+            except EventQueueFull as e:
+                handle.errors.append(str(e))
+                handle._finish()
+
+    def get_handle(self, event_id: str):
+        with self._handles_lock:
+            return self._handles.get(event_id)
+
+    def pending_count(self) -> int:
+        return self._queue.qsize() if self._queue is not None else 0
+
+    def _worker_loop(self, q: queue.Queue):
+        while True:
+            handle = q.get()
+            try:
+                if handle is None:
+                    return
+                self._dispatch(handle)
+            finally:
+                q.task_done()
+
+    def _dispatch(self, handle: EventHandle):
+        handle.status = "running"
+        event = handle.event
+        # Continue the trace of whoever emitted the event (carried in the payload).
+        with tracer.continue_trace(event.payload.get("trace_id"), event.payload.get("parent_span_id")):
+            with tracer.span("event.dispatch", event_type=event.event_type, event_id=event.event_id,
+                             coalesced=handle.coalesced), \
+                    metrics.timed("construct_event_dispatch_seconds", event_type=event.event_type):
+                for listener in list(self.listeners.get(event.event_type, [])):
+                    name = getattr(listener, "__name__", repr(listener))
+                    try:
+                        with tracer.span(f"listener.{name}"):
+                            listener(event)
+                    except Exception as e:
+                        handle.errors.append(f"{name}: {type(e).__name__}: {e}")
+                        self._count("listener_errors")
+                        traceback.print_exc()
+        self._count("dispatched")
+        handle._finish()
 
 # Global event manager instance we can reuse throughout the system.
-event_manager = EventManager()
\ No newline at end of file
+event_manager = EventManager()
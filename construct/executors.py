@@ -0,0 +1,94 @@
+# construct/executors.py
+"""
+Shared worker pools for the API.
+
+CPU-bound work (Excel parsing, PDDL generation, progress comparison) goes to a process
+pool so it does not hold the GIL of the server process; blocking I/O (SQLite, file
+access) goes to a sized thread pool instead of the server's default one. Functions sent
+to the process pool must be module-level and take/return picklable values.
+
+Set CONSTRUCT_CPU_WORKERS=0 to run CPU work on the I/O threads instead (useful when
+processes cannot be spawned).
+
+Both pools carry the caller's trace (construct.tracing): I/O work runs in a copy of the
+caller's context, CPU work under run_traced(), which sends the worker's spans back.
+"""
+import asyncio
+import contextvars
+import functools
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from construct.metrics import metrics
+from construct.tracing import tracer, run_traced
+
+EXECUTOR_CONFIG = {
+    "cpu_workers": int(os.environ.get("CONSTRUCT_CPU_WORKERS", str(os.cpu_count() or 1))),
+    "io_workers": int(os.environ.get("CONSTRUCT_IO_WORKERS", "16")),
+}
+
+_cpu_pool = None
+_io_pool = None
+_lock = threading.Lock()
+
+def cpu_pool():
+    global _cpu_pool
+    if EXECUTOR_CONFIG["cpu_workers"] <= 0:
+        return io_pool()
+    with _lock:
+        if _cpu_pool is None:
+            # spawn: forking a process that runs threads (event workers, planners) is unsafe.
+            _cpu_pool = ProcessPoolExecutor(
+                max_workers=EXECUTOR_CONFIG["cpu_workers"],
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _cpu_pool
+
+def io_pool():
+    global _io_pool
+    with _lock:
+        if _io_pool is None:
+            _io_pool = ThreadPoolExecutor(max_workers=EXECUTOR_CONFIG["io_workers"], thread_name_prefix="io")
+        return _io_pool
+
+def _cpu_call(fn, args: tuple, kwargs: dict):
+    """The callable to send to the CPU pool, and whether it returns (result, spans)."""
+    context = tracer.context()
+    if context is None:
+        return functools.partial(fn, *args, **kwargs), False
+    return functools.partial(run_traced, context, fn, args, kwargs), True
+
+def _cpu_result(result, traced: bool):
+    if not traced:
+        return result
+    result, spans = result
+    tracer.add_spans(spans)
+    return result
+
+async def run_cpu(fn, *args, **kwargs):
+    """Await fn(*args, **kwargs) on the process pool."""
+    loop = asyncio.get_running_loop()
+    call, traced = _cpu_call(fn, args, kwargs)
+    with metrics.timed("construct_cpu_task_seconds", function=fn.__name__):
+        return _cpu_result(await loop.run_in_executor(cpu_pool(), call), traced)
+
+def call_cpu(fn, *args, **kwargs):
+    """Run fn(*args, **kwargs) on the process pool and wait; for worker threads, not the event loop."""
+    call, traced = _cpu_call(fn, args, kwargs)
+    with metrics.timed("construct_cpu_task_seconds", function=fn.__name__):
+        return _cpu_result(cpu_pool().submit(call).result(), traced)
+
+async def run_io(fn, *args, **kwargs):
+    """Await fn(*args, **kwargs) on the I/O thread pool."""
+    loop = asyncio.get_running_loop()
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(io_pool(), functools.partial(context.run, fn, *args, **kwargs))
+
+def shutdown(wait: bool = True):
+    global _cpu_pool, _io_pool
+    with _lock:
+        pools = [p for p in (_cpu_pool, _io_pool) if p is not None]
+        _cpu_pool = _io_pool = None
+    for pool in pools:
+        pool.shutdown(wait=wait)
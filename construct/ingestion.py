@@ -1,22 +1,30 @@
 import os
-import pandas as pd
-import numpy as np
 from datetime import datetime
 from sqlalchemy import select, update, delete, insert
 from construct.database import projects_table, tasks_table, pddl_mappings_table, events_table
 from construct.models import ScheduleData
-from construct.eventing import event_manager, Event
+from construct import outbox
+from construct.db_writer import write
 from construct.utils import compute_duration
+from construct.project_management import next_data_version
+from construct.metrics import metrics
+from construct.tracing import tracer
 
-def ingest_schedule_data(
-    file_path: str,
-    schedule_id: str,
-    schedule_type: str,
-    engine,
-    auto_generate_pddl: bool = True,
-    project_folder: str = None
-):
-    df = pd.read_excel(file_path)
+@tracer.traced("ingest.parse")
+@metrics.instrument("construct_stage_seconds", stage="parse")
+def parse_schedule_file(file_path: str, schedule_id: str, schedule_type: str) -> dict:
+    """
+    Read a schedule workbook (.xlsx, or .csv with the same columns) into task rows
+    ready for insertion. CPU-bound and free of DB access, so it can run in the process
+    pool; the result is plain picklable data: {"project_name": str, "task_rows": [dict, ...]}.
+    """
+    # Imported here: pandas is only needed to parse, and mostly in pool workers.
+    import numpy as np
+    import pandas as pd
+    if file_path.lower().endswith(".csv"):
+        df = pd.read_csv(file_path)
+    else:
+        df = pd.read_excel(file_path)
     project_name = df.iloc[0].get("project_name", "Unknown") if not df.empty else "Unknown"
     
     # Process datetime columns.
@@ -30,8 +38,77 @@ def ingest_schedule_data(
     print(df[['bl_start', 'bl_finish']].head())
 
     df = df.replace({np.nan: None})
+
+    # Build task rows from the Excel rows.
+    task_rows = []
+    for _, row in df.iterrows():
+        if not row.get("task_id"):
+            continue
+        if schedule_type == "target":
+            bl_start = row.get("bl_start") # or row.get("start_date")
+            bl_finish = row.get("bl_finish") #or row.get("end_date")
+            task_dict = {
+                "schedule_id": schedule_id,
+                "schedule_type": schedule_type,
+                "task_id": str(row.get("task_id")),
+                "task_name": row.get("task_name"),
+                "wbs_value": row.get("wbs_value"),
+                "parent_id": str(row.get("parent_id")) if row.get("parent_id") else None,
+                "p6_wbs_guid": row.get("p6_wbs_guid"),
+                "percent_done": row.get("percent_done"),
+                "bl_start": bl_start,
+                "bl_finish": bl_finish,
+                "duration": row.get("duration") or compute_duration(row.get("bl_start"), row.get("bl_finish")),
+                "status": row.get("status"),
+            }
+        else:
+            task_dict = {
+                "schedule_id": schedule_id,
+                "schedule_type": schedule_type,
+                "task_id": str(row.get("task_id")),
+                "task_name": row.get("task_name"),
+                "wbs_value": row.get("wbs_value"),
+                "parent_id": str(row.get("parent_id")) if row.get("parent_id") else None,
+                "p6_wbs_guid": row.get("p6_wbs_guid"),
+                "percent_done": row.get("percent_done"),
+                "start_date": row.get("start_date"),
+                "end_date": row.get("end_date"),
+                "duration": row.get("duration") or compute_duration(row.get("bl_start"), row.get("bl_finish")),                    "status": row.get("status"),
+            }
+        task_rows.append(task_dict)
+
+    metrics.inc("construct_tasks_processed_total", len(task_rows), stage="parse")
+    return {"project_name": project_name, "task_rows": task_rows}
+
+def ingest_schedule_data(
+    file_path: str,
+    schedule_id: str,
+    schedule_type: str,
+    engine,
+    auto_generate_pddl: bool = True,
+    project_folder: str = None
+):
+    parsed = parse_schedule_file(file_path, schedule_id, schedule_type)
+    return write_schedule_data(
+        parsed, file_path, schedule_id, schedule_type, engine,
+        auto_generate_pddl=auto_generate_pddl, project_folder=project_folder
+    )
+
+def write_schedule_data(
+    parsed: dict,
+    file_path: str,
+    schedule_id: str,
+    schedule_type: str,
+    engine,
+    auto_generate_pddl: bool = True,
+    project_folder: str = None
+):
+    """Replace the schedule's rows with the output of parse_schedule_file and emit schedule_ingested."""
+    project_name = parsed["project_name"]
+    task_rows = parsed["task_rows"]
+    db_url = outbox.register_engine(engine)
     
-    with engine.begin() as conn:
+    def _write(conn):
         # Upsert project record.
         existing = conn.execute(
             select(projects_table.c.id)
@@ -43,7 +120,7 @@ def ingest_schedule_data(
                 update(projects_table)
                 .where(projects_table.c.schedule_id == schedule_id)
                 .where(projects_table.c.schedule_type == schedule_type)
-                .values(project_name=project_name)
+                .values(project_name=project_name, data_version=next_data_version())
             )
         else:
             conn.execute(
@@ -52,7 +129,8 @@ def ingest_schedule_data(
                     "schedule_id": schedule_id,
                     "schedule_type": schedule_type,
                     "project_name": project_name,
-                    "created_at": datetime.utcnow().isoformat()
+                    "created_at": datetime.utcnow().isoformat(),
+                    "data_version": 1
                 }
             )
         # Remove old tasks.
@@ -62,44 +140,6 @@ def ingest_schedule_data(
             .where(tasks_table.c.schedule_type == schedule_type)
         )
     
-        # Insert tasks from the Excel rows.
-        task_rows = []
-        for _, row in df.iterrows():
-            if not row.get("task_id"):
-                continue
-            if schedule_type == "target":
-                bl_start = row.get("bl_start") # or row.get("start_date")
-                bl_finish = row.get("bl_finish") #or row.get("end_date")
-                task_dict = {
-                    "schedule_id": schedule_id,
-                    "schedule_type": schedule_type,
-                    "task_id": str(row.get("task_id")),
-                    "task_name": row.get("task_name"),
-                    "wbs_value": row.get("wbs_value"),
-                    "parent_id": str(row.get("parent_id")) if row.get("parent_id") else None,
-                    "p6_wbs_guid": row.get("p6_wbs_guid"),
-                    "percent_done": row.get("percent_done"),
-                    "bl_start": bl_start,
-                    "bl_finish": bl_finish,
-                    "duration": row.get("duration") or compute_duration(row.get("bl_start"), row.get("bl_finish")),
-                    "status": row.get("status"),
-                }
-            else:
-                task_dict = {
-                    "schedule_id": schedule_id,
-                    "schedule_type": schedule_type,
-                    "task_id": str(row.get("task_id")),
-                    "task_name": row.get("task_name"),
-                    "wbs_value": row.get("wbs_value"),
-                    "parent_id": str(row.get("parent_id")) if row.get("parent_id") else None,
-                    "p6_wbs_guid": row.get("p6_wbs_guid"),
-                    "percent_done": row.get("percent_done"),
-                    "start_date": row.get("start_date"),
-                    "end_date": row.get("end_date"),
-                    "duration": row.get("duration") or compute_duration(row.get("bl_start"), row.get("bl_finish")),                    "status": row.get("status"),
-                }
-            task_rows.append(task_dict)
-    
         if task_rows:
             conn.execute(tasks_table.insert(), task_rows)
         
@@ -114,16 +154,35 @@ def ingest_schedule_data(
                     "timestamp": datetime.utcnow().isoformat()
                 }
             )
+
+        outbox_event = None
+        if auto_generate_pddl:
+            outbox_event = outbox.enqueue_event(
+                conn,
+                "schedule_ingested",
+                {
+                    "schedule_id": schedule_id,
+                    "schedule_type": schedule_type,
+                    "db_url": db_url,
+                    "project_folder": project_folder,
+                    "auto_generate_pddl": auto_generate_pddl
+                },
+                schedule_id=schedule_id,
+                details=f"Build PDDL artifacts for {schedule_type} schedule from {file_path}",
+            )
+        return outbox_event
+
+    # One transaction through the DB's single writer, so concurrent ingests queue up
+    # instead of failing with "database is locked".
+    with tracer.span("ingest.write", schedule_id=schedule_id, schedule_type=schedule_type, tasks=len(task_rows)), \
+            metrics.timed("construct_stage_seconds", stage="ingest_write"):
+        outbox_event = write(engine, _write)
+    metrics.inc("construct_tasks_processed_total", len(task_rows), stage="ingest_write")
+
+    # The downstream PDDL build is dispatched after the commit above; the outbox row was
+    # written in the same transaction, so it is replayed if we die before it completes.
+    event_id = None
+    if outbox_event is not None:
+        event_id = outbox.publish(outbox_event, db_url).event_id
     
-    # Instead of directly calling PDDL generation here, emit an event.
-    if auto_generate_pddl:
-        event = Event("schedule_ingested", {
-            "schedule_id": schedule_id,
-            "schedule_type": schedule_type,
-            "engine": engine,
-            "project_folder": project_folder,
-            "auto_generate_pddl": auto_generate_pddl
-        })
-        event_manager.emit(event)
-    
-    return ScheduleData(schedule_id=schedule_id, tasks=[])
\ No newline at end of file
+    return ScheduleData(schedule_id=schedule_id, tasks=[], event_id=event_id)
\ No newline at end of file
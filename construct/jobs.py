@@ -0,0 +1,164 @@
+# construct/jobs.py
+import contextvars
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+
+FINISHED_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+class Job:
+    def __init__(self, kind: str, meta: dict = None):
+        self.job_id = uuid.uuid4().hex
+        self.kind = kind
+        self.meta = meta or {}
+        self.status = QUEUED
+        self.result = None
+        self.error = None
+        self.created_at = _now()
+        self.started_at = None
+        self.finished_at = None
+        self._future = None
+        self._cancel_hook = None
+        self._done = threading.Event()
+        self._lock = threading.Lock()
+
+    def set_cancel_hook(self, hook):
+        """
+        Register a callable that aborts the running work (e.g. kills a subprocess).
+        If the job was cancelled before the hook was registered, it fires immediately.
+        """
+        with self._lock:
+            self._cancel_hook = hook
+            cancelled = self.status == CANCELLED
+        if cancelled:
+            hook()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.status == CANCELLED
+
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: float = None) -> bool:
+        return self._done.wait(timeout)
+
+    def _cancel(self) -> bool:
+        # Flip to CANCELLED and grab the hook under one lock, so a hook registered
+        # concurrently is either seen here or fired by set_cancel_hook.
+        with self._lock:
+            if self.status in FINISHED_STATES:
+                return False
+            self.status = CANCELLED
+            self.finished_at = _now()
+            hook = self._cancel_hook
+        self._done.set()
+        if hook is not None:
+            hook()
+        return True
+
+    def _finish(self, status: str, result=None, error: str = None):
+        with self._lock:
+            if self.status in FINISHED_STATES:
+                return
+            self.status = status
+            self.result = result
+            self.error = error
+            self.finished_at = _now()
+        self._done.set()
+
+    def to_dict(self, include_result: bool = False) -> dict:
+        data = {
+            "job_id": self.job_id,
+            "kind": self.kind,
+            "status": self.status,
+            "meta": self.meta,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if self.error:
+            data["error"] = self.error
+        if include_result:
+            data["result"] = self.result
+        return data
+
+class JobRegistry:
+    """
+    Runs callables on a bounded worker pool and keeps track of their status.
+    The callable receives the Job as its first argument so it can register a
+    cancel hook or check whether it has been cancelled.
+    Finished jobs are retained (oldest evicted first) up to max_retained.
+    """
+    def __init__(self, max_workers: int, name: str = "jobs", max_retained: int = 1000):
+        self.max_workers = max_workers
+        self.max_retained = max_retained
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=name)
+        self._jobs = OrderedDict()
+        self._lock = threading.Lock()
+
+    def submit(self, kind: str, fn, *args, meta: dict = None, **kwargs) -> Job:
+        job = Job(kind, meta)
+        with self._lock:
+            self._jobs[job.job_id] = job
+            self._evict()
+        # Run in the submitter's context so the job's spans join the request's trace.
+        context = contextvars.copy_context()
+        job._future = self._executor.submit(context.run, self._run, job, fn, args, kwargs)
+        return job
+
+    def _run(self, job: Job, fn, args, kwargs):
+        with job._lock:
+            if job.status != QUEUED:
+                return
+            job.status = RUNNING
+            job.started_at = _now()
+        try:
+            result = fn(job, *args, **kwargs)
+        except Exception as e:
+            job._finish(FAILED, error=f"{type(e).__name__}: {e}")
+        else:
+            job._finish(SUCCEEDED, result=result)
+
+    def get(self, job_id: str):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id: str) -> bool:
+        job = self.get(job_id)
+        if job is None or not job._cancel():
+            return False
+        if job._future is not None:
+            job._future.cancel()
+        return True
+
+    def list(self) -> list:
+        with self._lock:
+            return list(self._jobs.values())
+
+    def _evict(self):
+        # Drop the oldest finished jobs once we are over the retention limit.
+        if len(self._jobs) <= self.max_retained:
+            return
+        for job_id in list(self._jobs):
+            if len(self._jobs) <= self.max_retained:
+                break
+            if self._jobs[job_id].done():
+                del self._jobs[job_id]
+
+    def shutdown(self, wait: bool = False):
+        for job in self.list():
+            if not job.done():
+                self.cancel(job.job_id)
+        self._executor.shutdown(wait=wait)
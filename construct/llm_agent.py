@@ -1,23 +1,54 @@
+import asyncio
+import functools
 import json
+import os
 import time
 import threading
+import weakref
 from datetime import datetime
 from sqlalchemy import Table, Column, Integer, String, MetaData
-from construct.database import init_db, analysis_history_table
+from construct.database import analysis_history_table
+from construct.db_writer import write
+from construct.registry import project_registry
 from construct.agent import ConstructionAgent
-from langchain.chat_models import ChatOpenAI
-from langchain.schema import AIMessage, HumanMessage, SystemMessage
+from construct.executors import run_io, io_pool
+from construct.llm_cache import llm_cache, llm_cache_key
+from construct.plan_cache import plan_cache
+from construct.metrics import metrics
+from construct.tracing import tracer
+from construct.tokens import estimate_tokens, estimate_message_tokens, chunk_token_budget, COMPLETION_RESERVE_TOKENS
 
 metadata = MetaData()
 
+# langchain, openai and aiohttp take most of a second to import; they load on the
+# first LLM call instead of with the API.
+ChatOpenAI = None
+
+def _chat_openai_class():
+    global ChatOpenAI
+    if ChatOpenAI is None:
+        from langchain.chat_models import ChatOpenAI as chat_openai
+        ChatOpenAI = chat_openai
+    return ChatOpenAI
+
 # --- Token Bucket Implementation for Rate Limiting ---
 class TokenBucket:
+    """
+    Provider token budget: `capacity` tokens, refilled at `refill_rate` per second.
+    Calls debit their estimated tokens up front and reconcile() with the reported usage
+    afterwards. Waiters sleep exactly until enough tokens have refilled and are woken
+    early when tokens are credited back, in threads (consume) and on event loops
+    (aconsume) alike. A debit larger than the capacity is clamped to it, or it could
+    never be satisfied.
+    """
     def __init__(self, capacity, refill_rate):
         self.capacity = capacity
         self.tokens = capacity
         self.refill_rate = refill_rate
         self.last_refill = time.monotonic()
         self.lock = threading.Lock()
+        self._cond = threading.Condition(self.lock)
+        self._async_waiters = set()  # (loop, future) pairs parked in aconsume
 
     def _refill(self):
         now = time.monotonic()
@@ -27,33 +58,135 @@ class TokenBucket:
             self.tokens = min(self.capacity, self.tokens + new_tokens)
             self.last_refill = now
 
+    def _try_take(self, tokens) -> float:
+        # Caller holds the lock. Returns 0 when taken, else seconds until it could be.
+        self._refill()
+        if self.tokens >= tokens:
+            self.tokens -= tokens
+            return 0.0
+        return (tokens - self.tokens) / self.refill_rate
+
     def consume(self, tokens=1):
+        tokens = min(tokens, self.capacity)
+        with self._cond:
+            while True:
+                delay = self._try_take(tokens)
+                if not delay:
+                    return
+                self._cond.wait(delay)
+
+    async def aconsume(self, tokens=1):
+        tokens = min(tokens, self.capacity)
+        loop = asyncio.get_running_loop()
         while True:
             with self.lock:
-                self._refill()
-                if self.tokens >= tokens:
-                    self.tokens -= tokens
+                delay = self._try_take(tokens)
+                if not delay:
                     return
-            time.sleep(0.1)
+                waiter = (loop, loop.create_future())
+                self._async_waiters.add(waiter)
+            try:
+                await asyncio.wait_for(waiter[1], delay)
+            except asyncio.TimeoutError:
+                pass
+            finally:
+                with self.lock:
+                    self._async_waiters.discard(waiter)
+
+    def credit(self, tokens):
+        """Return tokens (e.g. an over-estimate) and wake everyone waiting."""
+        with self._cond:
+            self._refill()
+            self.tokens = min(self.capacity, self.tokens + tokens)
+            self._cond.notify_all()
+            waiters = list(self._async_waiters)
+        for loop, future in waiters:
+            loop.call_soon_threadsafe(lambda f=future: f.done() or f.set_result(None))
+
+    def debit(self, tokens):
+        """Take tokens without waiting (usage beyond the estimate); may go negative."""
+        with self.lock:
+            self._refill()
+            self.tokens -= tokens
+
+    def reconcile(self, estimated, actual):
+        if actual > estimated:
+            self.debit(actual - estimated)
+        elif actual < estimated:
+            self.credit(estimated - actual)
 
 RATE_LIMIT_CONFIG = {
-    "bucket_capacity": 10000,
-    "refill_rate": 5000,
+    "bucket_capacity": int(os.environ.get("CONSTRUCT_LLM_TOKEN_CAPACITY", "10000")),
+    "refill_rate": float(os.environ.get("CONSTRUCT_LLM_TOKENS_PER_SECOND", "5000")),
 }
 token_bucket = TokenBucket(RATE_LIMIT_CONFIG["bucket_capacity"], RATE_LIMIT_CONFIG["refill_rate"])
 
-MAX_CHUNK_CHARS = 3000
+LLM_MODEL = "gpt-4"
+LLM_TEMPERATURE = 0
+
+SUMMARY_CONFIG = {
+    # Chunk summaries in flight at once; every call still goes through token_bucket.
+    "max_concurrency": int(os.environ.get("CONSTRUCT_LLM_CONCURRENCY", "4")),
+}
+
+LLM_CLIENT_CONFIG = {
+    # Open connections to the API per event loop, shared by all calls on that loop.
+    "max_connections": int(os.environ.get("CONSTRUCT_LLM_MAX_CONNECTIONS", "20")),
+}
+
+_clients = {}
+_clients_lock = threading.Lock()
+_sessions = weakref.WeakKeyDictionary()  # event loop -> aiohttp.ClientSession
+
+def _chat_client(streaming: bool = False):
+    """The shared ChatOpenAI client for the current model settings."""
+    key = (LLM_MODEL, LLM_TEMPERATURE, COMPLETION_RESERVE_TOKENS, streaming)
+    with _clients_lock:
+        client = _clients.get(key)
+        if client is None:
+            client = _chat_openai_class()(model_name=LLM_MODEL, temperature=LLM_TEMPERATURE,
+                                max_tokens=COMPLETION_RESERVE_TOKENS, streaming=streaming)
+            _clients[key] = client
+        return client
+
+def _use_shared_session():
+    """
+    Point the openai library at this loop's pooled HTTP session. Without one it opens
+    (and TLS-handshakes) a new connection for every request.
+    """
+    import aiohttp
+    import openai
+    loop = asyncio.get_running_loop()
+    session = _sessions.get(loop)
+    if session is None or session.closed:
+        session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=LLM_CLIENT_CONFIG["max_connections"]))
+        _sessions[loop] = session
+    openai.aiosession.set(session)
+
+async def aclose_http_session():
+    """Close the current loop's pooled session (on shutdown, or before the loop closes)."""
+    session = _sessions.pop(asyncio.get_running_loop(), None)
+    if session is not None:
+        await session.close()
+
+def _run(coro):
+    """asyncio.run for the sync wrappers, closing the loop's HTTP session afterwards."""
+    async def main():
+        try:
+            return await coro
+        finally:
+            await aclose_http_session()
+    return asyncio.run(main())
 
 def store_analysis(engine, schedule_id: str, analysis_text: str):
-    with engine.begin() as conn:
-        conn.execute(
-            analysis_history_table.insert(),
-            {
-                "schedule_id": schedule_id,
-                "analysis_text": analysis_text,
-                "timestamp": datetime.utcnow().isoformat()
-            }
-        )
+    write(engine, lambda conn: conn.execute(
+        analysis_history_table.insert(),
+        {
+            "schedule_id": schedule_id,
+            "analysis_text": analysis_text,
+            "timestamp": datetime.utcnow().isoformat()
+        }
+    ))
 
 def format_tasks_table(tasks: list) -> str:
     if not tasks:
@@ -65,7 +198,7 @@ def format_tasks_table(tasks: list) -> str:
     return table_md
 
 def compare_schedules_tool(schedule_id: str) -> str:
-    engine = init_db()
+    engine = project_registry.engine_for_schedule(schedule_id)
     agent = ConstructionAgent(engine)
     result = agent.analyze_progress(schedule_id)
     if "error" in result:
@@ -75,109 +208,406 @@ def compare_schedules_tool(schedule_id: str) -> str:
         return f"No major deviations for schedule {schedule_id}"
     return "\n".join(insights)
 
-def chunk_text(text: str, max_chars: int = MAX_CHUNK_CHARS) -> list:
-    if len(text) <= max_chars:
+# Pre-aggregation tools: fixed-size summaries the planner can ask for instead of raw
+# task lists, so the prompt stays bounded however large the schedule is.
+AGGREGATE_CONFIG = {
+    "top_k": int(os.environ.get("CONSTRUCT_AGENT_TOP_K", "10")),
+    "max_rows": int(os.environ.get("CONSTRUCT_AGENT_MAX_ROWS", "25")),
+}
+
+def top_variances_tool(schedule_id: str, k: int = None) -> str:
+    try:
+        k = int(k)  # planner output; may be missing or a string
+    except (TypeError, ValueError):
+        k = AGGREGATE_CONFIG["top_k"]
+    engine = project_registry.engine_for_schedule(schedule_id)
+    result = ConstructionAgent(engine).top_variances(schedule_id, max(1, min(k, AGGREGATE_CONFIG["max_rows"])))
+    if "error" in result:
+        return f"ERROR: {result['error']}"
+    if not result["tasks"]:
+        return f"No tasks behind schedule for {schedule_id}"
+    lines = [f"{result['behind']} tasks behind schedule; worst {len(result['tasks'])}:",
+             "task_id | task_name | wbs | progress | expected | variance",
+             "--- | --- | --- | --- | --- | ---"]
+    for r in result["tasks"]:
+        lines.append(f"{r['task_id']} | {r['task_name']} | {r['wbs_value'] or ''} | {r['progress']} | {r['expected']} | {r['variance']}")
+    return "\n".join(lines)
+
+def wbs_rollup_tool(schedule_id: str) -> str:
+    engine = project_registry.engine_for_schedule(schedule_id)
+    result = ConstructionAgent(engine).wbs_rollup(schedule_id)
+    if "error" in result:
+        return f"ERROR: {result['error']}"
+    groups = sorted(result["wbs"], key=lambda g: g["avg_progress"] - g["avg_expected"])
+    shown = groups[:AGGREGATE_CONFIG["max_rows"]]
+    lines = ["wbs | tasks | behind | ahead | avg progress | avg expected | worst task (variance)",
+             "--- | --- | --- | --- | --- | --- | ---"]
+    for g in shown:
+        worst = f"{g['worst_task']} ({g['worst_variance']})" if g["worst_task"] else ""
+        lines.append(f"{g['wbs_value']} | {g['tasks']} | {g['behind']} | {g['ahead']} | "
+                     f"{g['avg_progress']} | {g['avg_expected']} | {worst}")
+    if len(groups) > len(shown):
+        lines.append(f"... {len(groups) - len(shown)} more WBS groups, all closer to plan")
+    return "\n".join(lines)
+
+def status_counts_tool(schedule_id: str) -> str:
+    engine = project_registry.engine_for_schedule(schedule_id)
+    result = ConstructionAgent(engine).status_counts(schedule_id)
+    if "error" in result:
+        return f"ERROR: {result['error']}"
+    statuses = ", ".join(f"{status}: {count}" for status, count in sorted(result["by_status"].items()))
+    return (f"Tasks by status: {statuses}\n"
+            f"Against plan: {result['behind']} behind, {result['ahead']} ahead, {result['on_track']} on track")
+
+PLAN_ACTIONS = {
+    "status_counts": "task counts by status and behind/ahead/on track",
+    "top_variances": "the tasks furthest behind plan (optional integer 'k')",
+    "wbs_rollup": "progress vs. plan rolled up per WBS",
+    "analyze_progress": "one line for every task off plan (long on large schedules)",
+    "fetch_table": "the full target task table (long on large schedules)",
+    "summarize": "summarize the results so far",
+    "finalize": "answer the query from the results so far",
+}
+
+def chunk_text(text: str, max_tokens: int = None, model: str = None) -> list:
+    """Split text on line boundaries into chunks of at most max_tokens (default: the model's chunk budget)."""
+    model = model or LLM_MODEL
+    max_tokens = max_tokens or chunk_token_budget(model)
+    if estimate_tokens(text, model) <= max_tokens:
         return [text]
     lines = text.split('\n')
     chunks = []
     current_chunk = []
     current_length = 0
     for line in lines:
-        if current_length + len(line) + 1 > max_chars:
+        line_tokens = estimate_tokens(line, model) + 1
+        if current_chunk and current_length + line_tokens > max_tokens:
             chunks.append("\n".join(current_chunk))
             current_chunk = [line]
-            current_length = len(line)
+            current_length = line_tokens
         else:
             current_chunk.append(line)
-            current_length += len(line) + 1
+            current_length += line_tokens
     if current_chunk:
         chunks.append("\n".join(current_chunk))
     return chunks
 
-def summarize_chunk(chunk: str) -> str:
-    token_bucket.consume()
-    llm = ChatOpenAI(model_name="gpt-4", temperature=0)
-    system_msg = SystemMessage(content="you are a helpful schedule analysis assistant. Please summarize the following context concisely.")
-    user_msg = HumanMessage(content=f"Context:\n\n{chunk}\n\nProvide a concise summary.")
-    response = llm([system_msg, user_msg])
-    return response.content
-
-def summarize_large_context(context: str) -> str:
-    chunks = chunk_text(context, MAX_CHUNK_CHARS)
-    summaries = []
-    for i, chunk in enumerate(chunks, start=1):
-        print(f"[Progress] Summarizing chunk {i}/{len(chunks)}")
-        summaries.append(summarize_chunk(chunk))
-    combined = "\n".join(summaries)
-    token_bucket.consume()
-    llm = ChatOpenAI(model_name="gpt-4", temperature=0)
-    system_msg = SystemMessage(content="you are a helpful schedule analysis assistant.")
-    user_msg = HumanMessage(content=f"Here are summaries:\n\n{combined}\n\nCombine them into one final summary.")
-    response = llm([system_msg, user_msg])
-    return response.content
-
-def summarize_behind_tasks(raw_analysis: str) -> str:
-    if len(raw_analysis) > MAX_CHUNK_CHARS:
-        return summarize_large_context(raw_analysis)
-    else:
-        token_bucket.consume()
-        llm = ChatOpenAI(model_name="gpt-4", temperature=0)
-        system_msg = SystemMessage(content="you are a helpful schedule analysis assistant. Extract and summarize tasks behind schedule concisely.")
-        user_msg = HumanMessage(content=f"Context:\n\n{raw_analysis}\n\nSummarize behind-schedule tasks concisely.")
-        response = llm([system_msg, user_msg])
-        return response.content
-
-def generate_plan(user_query: str) -> list:
-    token_bucket.consume()
-    llm = ChatOpenAI(model_name="gpt-4", temperature=0)
-    system_msg = SystemMessage(content=(
-        "you are a planning assistant for construction schedule analysis. "
-        "Given a user query, output a JSON array of steps with keys 'action' and 'description'."
-    ))
-    user_msg = HumanMessage(content=f"Generate a plan in JSON for the following query: {user_query}")
-    response = llm([system_msg, user_msg])
+def _messages(system: str, user: str) -> list:
+    from langchain.schema import HumanMessage, SystemMessage
+    return [SystemMessage(content=system), HumanMessage(content=user)]
+
+async def _acall_llm(system: str, user: str, engine=None) -> str:
+    """
+    One model call. With an engine, identical prompts are answered from the project's
+    llm_response_cache instead of the API.
+    """
+    messages = _messages(system, user)
+    key = llm_cache_key(LLM_MODEL, LLM_TEMPERATURE, messages)
+    if engine is not None:
+        cached = await run_io(llm_cache.get, engine, key)
+        if cached is not None:
+            return cached
+    # Debit the estimated prompt plus the completion allowance up front, then settle
+    # against the usage the API reports.
+    estimated = estimate_message_tokens(messages, LLM_MODEL) + COMPLETION_RESERVE_TOKENS
+    await token_bucket.aconsume(estimated)
+    _use_shared_session()
+    llm = _chat_client()
     try:
-        plan = json.loads(response.content)
-        return plan
+        # Native async request: the event loop keeps serving while we wait on the API.
+        with tracer.span("llm.call", model=LLM_MODEL, estimated_tokens=estimated), \
+                metrics.timed("construct_llm_call_seconds", kind="call"):
+            result = await llm.agenerate([messages])
     except Exception:
+        token_bucket.credit(estimated)
+        raise
+    content = result.generations[0][0].text
+    usage = (result.llm_output or {}).get("token_usage") or {}
+    used = usage.get("total_tokens") or estimated
+    token_bucket.reconcile(estimated, used)
+    metrics.inc("construct_llm_tokens_total", used)
+    if engine is not None:
+        await run_io(llm_cache.put, engine, key, LLM_MODEL, LLM_TEMPERATURE, content)
+    return content
+
+async def asummarize_chunk(chunk: str, engine=None) -> str:
+    return await _acall_llm(
+        "you are a helpful schedule analysis assistant. Please summarize the following context concisely.",
+        f"Context:\n\n{chunk}\n\nProvide a concise summary.",
+        engine=engine,
+    )
+
+async def _timed_call(semaphore, stats, level: int, index: int, total: int, coro_fn, text: str) -> str:
+    async with semaphore:
+        started = time.monotonic()
+        result = await coro_fn(text)
+        elapsed = time.monotonic() - started
+    label = "chunk" if level == 0 else f"reduce level {level} group"
+    tokens = estimate_tokens(text, LLM_MODEL)
+    print(f"[Progress] Summarized {label} {index}/{total} (~{tokens} tokens) in {elapsed:.2f}s")
+    if stats is not None:
+        stats.append({"level": level, "index": index, "tokens": tokens, "seconds": round(elapsed, 3)})
+    return result
+
+def _group_for_reduce(summaries: list, max_tokens: int) -> list:
+    """
+    Pack consecutive summaries into groups whose joined text fits in max_tokens.
+    Every group takes at least two summaries, so each reduce level shrinks the list.
+    """
+    groups = []
+    current = []
+    current_length = 0
+    for summary in summaries:
+        summary_tokens = estimate_tokens(summary, LLM_MODEL) + 1
+        if len(current) >= 2 and current_length + summary_tokens > max_tokens:
+            groups.append(current)
+            current = []
+            current_length = 0
+        current.append(summary)
+        current_length += summary_tokens
+    if len(current) == 1 and groups:
+        groups[-1].append(current[0])
+    elif current:
+        groups.append(current)
+    return groups
+
+async def _acombine_summaries(combined: str, engine=None) -> str:
+    return await _acall_llm(
+        "you are a helpful schedule analysis assistant.",
+        f"Here are summaries:\n\n{combined}\n\nCombine them into one final summary.",
+        engine=engine,
+    )
+
+async def asummarize_large_context(context: str, max_concurrency: int = None, stats: list = None,
+                                   engine=None) -> str:
+    """
+    Map-reduce summarization. Chunks are summarized concurrently (at most max_concurrency
+    calls in flight). Then the summaries are combined level by level in groups that fit
+    in the model's chunk token budget, until a single group remains for the final
+    combine. So no combine prompt ever needs chunking itself. If stats is a list, one
+    {"level", "index", "tokens", "seconds"} entry is appended per call.
+    """
+    semaphore = asyncio.Semaphore(max_concurrency or SUMMARY_CONFIG["max_concurrency"])
+    summarize = functools.partial(asummarize_chunk, engine=engine)
+    combine = functools.partial(_acombine_summaries, engine=engine)
+    budget = chunk_token_budget(LLM_MODEL)
+    chunks = chunk_text(context, budget)
+    summaries = await asyncio.gather(*(
+        _timed_call(semaphore, stats, 0, i, len(chunks), summarize, chunk)
+        for i, chunk in enumerate(chunks, start=1)
+    ))
+    level = 0
+    while True:
+        groups = _group_for_reduce(list(summaries), budget)
+        level += 1
+        if len(groups) == 1:
+            if len(groups[0]) == 1:
+                return groups[0][0]
+            return await _timed_call(semaphore, stats, level, 1, 1, combine, "\n".join(groups[0]))
+        summaries = await asyncio.gather(*(
+            _timed_call(semaphore, stats, level, i, len(groups), combine, "\n".join(group))
+            for i, group in enumerate(groups, start=1)
+        ))
+
+async def asummarize_behind_tasks(raw_analysis: str, engine=None) -> str:
+    if estimate_tokens(raw_analysis, LLM_MODEL) > chunk_token_budget(LLM_MODEL):
+        return await asummarize_large_context(raw_analysis, engine=engine)
+    return await _acall_llm(
+        "you are a helpful schedule analysis assistant. Extract and summarize tasks behind schedule concisely.",
+        f"Context:\n\n{raw_analysis}\n\nSummarize behind-schedule tasks concisely.",
+        engine=engine,
+    )
+
+def _valid_plan(plan) -> bool:
+    return isinstance(plan, list) and bool(plan) and all(
+        isinstance(step, dict) and step.get("action") in PLAN_ACTIONS for step in plan
+    )
+
+async def agenerate_plan(user_query: str, engine=None) -> list:
+    """
+    Steps for a query. Known query intents come from plan_cache without a model call;
+    otherwise the model plans, and a valid plan is cached for the next similar query.
+    """
+    cached = plan_cache.get(user_query)
+    if cached is not None:
+        print("[Progress] Using cached plan")
+        return cached
+    system = (
+        "you are a planning assistant for construction schedule analysis. "
+        "Given a user query, output a JSON array of steps with keys 'action' and 'description'. "
+        "Available actions:\n" + "\n".join(f"- {name}: {desc}" for name, desc in PLAN_ACTIONS.items()) +
+        "\nPrefer status_counts, top_variances and wbs_rollup over analyze_progress and fetch_table; "
+        "end with finalize."
+    )
+    user = f"Generate a plan in JSON for the following query: {user_query}"
+    content = await _acall_llm(system, user, engine=engine)
+    try:
+        plan = json.loads(content)
+    except (TypeError, ValueError):
+        plan = None
+    if not _valid_plan(plan):
+        # Never hand an unchecked plan to aexecute_plan, and let the next call ask the
+        # model again instead of reading the rejected response back from the cache.
+        if engine is not None:
+            key = llm_cache_key(LLM_MODEL, LLM_TEMPERATURE, _messages(system, user))
+            await run_io(llm_cache.delete, engine, key)
         return [{"action": "finalize", "description": "Could not generate plan, use default analysis."}]
+    plan_cache.put(user_query, plan)
+    return plan
 
-def execute_plan(schedule_id: str, plan: list) -> str:
-    engine = init_db()
+async def _astream_llm(system: str, user: str, engine=None):
+    """
+    _acall_llm, yielding the answer as it is generated. A cached answer comes back as
+    one piece. Streamed responses carry no usage, so the bucket is settled against
+    the estimated size of the text received.
+    """
+    messages = _messages(system, user)
+    key = llm_cache_key(LLM_MODEL, LLM_TEMPERATURE, messages)
+    if engine is not None:
+        cached = await run_io(llm_cache.get, engine, key)
+        if cached is not None:
+            yield cached
+            return
+    prompt_tokens = estimate_message_tokens(messages, LLM_MODEL)
+    estimated = prompt_tokens + COMPLETION_RESERVE_TOKENS
+    await token_bucket.aconsume(estimated)
+    _use_shared_session()
+    llm = _chat_client(streaming=True)
+    pieces = []
+    started = time.monotonic()
+    try:
+        async for chunk in llm.astream(messages):
+            if chunk.content:
+                if not pieces:
+                    metrics.observe("construct_llm_call_seconds", time.monotonic() - started, kind="first_token")
+                pieces.append(chunk.content)
+                yield chunk.content
+    except BaseException:
+        token_bucket.reconcile(estimated, prompt_tokens + estimate_tokens("".join(pieces), LLM_MODEL))
+        raise
+    metrics.observe("construct_llm_call_seconds", time.monotonic() - started, kind="stream")
+    content = "".join(pieces)
+    used = prompt_tokens + estimate_tokens(content, LLM_MODEL)
+    token_bucket.reconcile(estimated, used)
+    metrics.inc("construct_llm_tokens_total", used)
+    if engine is not None:
+        await run_io(llm_cache.put, engine, key, LLM_MODEL, LLM_TEMPERATURE, content)
+
+def _finalize_prompt(context: str, step: dict) -> tuple:
+    return (
+        "you are a helpful construction schedule assistant.",
+        f"Using the following context:\n\n{context}\n\n{step.get('description','')}\n\nProvide a final answer.",
+    )
+
+async def _arun_step(agent, engine, schedule_id: str, step: dict, results: list) -> str:
+    action = step.get("action")
+    if action == "fetch_table":
+        tasks = await run_io(agent.fetch_tasks, schedule_id, "target")
+        return "fetch_table result:\n" + format_tasks_table(tasks)
+    elif action == "analyze_progress":
+        analysis = await run_io(compare_schedules_tool, schedule_id)
+        return "analyze_progress result:\n" + analysis
+    elif action == "top_variances":
+        table = await run_io(top_variances_tool, schedule_id, step.get("k"))
+        return "top_variances result:\n" + table
+    elif action == "wbs_rollup":
+        table = await run_io(wbs_rollup_tool, schedule_id)
+        return "wbs_rollup result:\n" + table
+    elif action == "status_counts":
+        counts = await run_io(status_counts_tool, schedule_id)
+        return "status_counts result:\n" + counts
+    elif action == "summarize":
+        context = "\n".join(results)
+        summary = await asummarize_behind_tasks(context, engine=engine)
+        return "summarize result:\n" + summary
+    elif action == "finalize":
+        answer = await _acall_llm(*_finalize_prompt("\n".join(results), step), engine=engine)
+        return "finalize result:\n" + answer
+    return f"Unrecognized action: {action}"
+
+async def aiter_plan(schedule_id: str, plan: list, stream_final: bool = False):
+    """
+    Execute a plan, yielding a "step" event before and a "result" event after each
+    step. With stream_final, finalize steps also yield their answer as "token" events
+    while it is generated.
+    """
+    engine = await run_io(project_registry.engine_for_schedule, schedule_id)
     agent = ConstructionAgent(engine)
     results = []
     for idx, step in enumerate(plan, start=1):
         action = step.get("action")
         print(f"[Progress] Executing step {idx}/{len(plan)}: {action}")
-        if action == "fetch_table":
-            tasks = agent.fetch_tasks(schedule_id, "target")
-            results.append("fetch_table result:\n" + format_tasks_table(tasks))
-        elif action == "analyze_progress":
-            analysis = compare_schedules_tool(schedule_id)
-            results.append("analyze_progress result:\n" + analysis)
-        elif action == "summarize":
-            context = "\n".join(results)
-            summary = summarize_behind_tasks(context)
-            results.append("summarize result:\n" + summary)
-        elif action == "finalize":
-            context = "\n".join(results)
-            token_bucket.consume()
-            llm = ChatOpenAI(model_name="gpt-4", temperature=0)
-            system_msg = SystemMessage(content="you are a helpful construction schedule assistant.")
-            user_msg = HumanMessage(content=f"Using the following context:\n\n{context}\n\n{step.get('description','')}\n\nProvide a final answer.")
-            response = llm([system_msg, user_msg])
-            results.append("finalize result:\n" + response.content)
+        yield {"event": "step", "index": idx, "total": len(plan), "action": action,
+               "description": step.get("description", "")}
+        if action == "finalize" and stream_final:
+            pieces = []
+            async for token in _astream_llm(*_finalize_prompt("\n".join(results), step), engine=engine):
+                pieces.append(token)
+                yield {"event": "token", "index": idx, "text": token}
+            result = "finalize result:\n" + "".join(pieces)
         else:
-            results.append(f"Unrecognized action: {action}")
-    return results[-1] if results else "No steps executed."
+            result = await _arun_step(agent, engine, schedule_id, step, results)
+        results.append(result)
+        yield {"event": "result", "index": idx, "action": action, "text": result}
 
-def run_llm_agent(schedule_id: str, user_query: str) -> str:
-    engine = init_db()
+async def aexecute_plan(schedule_id: str, plan: list) -> str:
+    final = "No steps executed."
+    async for event in aiter_plan(schedule_id, plan):
+        if event["event"] == "result":
+            final = event["text"]
+    return final
+
+async def arun_llm_agent(schedule_id: str, user_query: str) -> str:
+    engine = await run_io(project_registry.engine_for_schedule, schedule_id)
     metadata.create_all(engine)
     print("[Progress] Generating plan...")
-    plan = generate_plan(user_query)
+    plan = await agenerate_plan(user_query, engine=engine)
     print("[Progress] Executing plan...")
-    final_text = execute_plan(schedule_id, plan)
-    store_analysis(engine, schedule_id, final_text)
+    final_text = await aexecute_plan(schedule_id, plan)
+    await run_io(store_analysis, engine, schedule_id, final_text)
     print("[Progress] Analysis stored and complete.")
-    return final_text
\ No newline at end of file
+    return final_text
+
+def _store_in_background(engine, schedule_id: str, analysis_text: str):
+    def _done(future):
+        if future.exception() is not None:
+            print(f"debug: storing analysis for {schedule_id} failed: {future.exception()}")
+    io_pool().submit(store_analysis, engine, schedule_id, analysis_text).add_done_callback(_done)
+
+async def astream_llm_agent(schedule_id: str, user_query: str):
+    """
+    run_llm_agent as a stream of events: "plan", then the step/token/result events of
+    aiter_plan, then "done" with the final text. The analysis is stored on the I/O
+    pool without holding up the "done" event.
+    """
+    engine = await run_io(project_registry.engine_for_schedule, schedule_id)
+    metadata.create_all(engine)
+    yield {"event": "status", "text": "Generating plan..."}
+    plan = await agenerate_plan(user_query, engine=engine)
+    yield {"event": "plan", "plan": plan}
+    final_text = "No steps executed."
+    async for event in aiter_plan(schedule_id, plan, stream_final=True):
+        if event["event"] == "result":
+            final_text = event["text"]
+        yield event
+    _store_in_background(engine, schedule_id, final_text)
+    yield {"event": "done", "analysis": final_text}
+
+# Synchronous entry points for callers outside an event loop (CLI, worker threads).
+def summarize_chunk(chunk: str, engine=None) -> str:
+    return _run(asummarize_chunk(chunk, engine=engine))
+
+def summarize_large_context(context: str, engine=None) -> str:
+    return _run(asummarize_large_context(context, engine=engine))
+
+def summarize_behind_tasks(raw_analysis: str, engine=None) -> str:
+    return _run(asummarize_behind_tasks(raw_analysis, engine=engine))
+
+def generate_plan(user_query: str, engine=None) -> list:
+    return _run(agenerate_plan(user_query, engine=engine))
+
+def execute_plan(schedule_id: str, plan: list) -> str:
+    return _run(aexecute_plan(schedule_id, plan))
+
+def run_llm_agent(schedule_id: str, user_query: str) -> str:
+    return _run(arun_llm_agent(schedule_id, user_query))
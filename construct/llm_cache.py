@@ -0,0 +1,128 @@
+# construct/llm_cache.py
+import os
+import json
+import hashlib
+import threading
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import select, insert, update, delete
+from construct.database import llm_response_cache_table
+from construct.db_writer import write
+
+LLM_CACHE_CONFIG = {
+    "enabled": os.environ.get("CONSTRUCT_LLM_CACHE", "1") != "0",
+    "ttl_seconds": float(os.environ.get("CONSTRUCT_LLM_CACHE_TTL_SECONDS", str(7 * 24 * 3600))),
+    "max_bytes": int(os.environ.get("CONSTRUCT_LLM_CACHE_MB", "64")) * 1024 * 1024,
+}
+
+def llm_cache_key(model: str, temperature: float, messages: list) -> str:
+    """
+    Hash of everything that determines a completion: model, temperature and the
+    (role, content) of every message.
+    """
+    payload = {
+        "model": model,
+        "temperature": temperature,
+        "messages": [[m.type, m.content] for m in messages],
+    }
+    return hashlib.sha256(json.dumps(payload, sort_keys=True).encode("utf-8")).hexdigest()
+
+class LLMResponseCache:
+    """
+    Completions cached in the llm_response_cache table of the project's database.
+    Entries older than ttl_seconds are ignored and purged; once the table holds more than
+    max_bytes of responses the least recently used entries are dropped.
+    """
+    def __init__(self, ttl_seconds: float, max_bytes: int, enabled: bool = True):
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _record(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+    def _cutoff(self) -> str:
+        return (datetime.now(timezone.utc) - timedelta(seconds=self.ttl_seconds)).isoformat()
+
+    def get(self, engine, key: str):
+        if not self.enabled or engine is None:
+            return None
+        with engine.connect() as conn:
+            row = conn.execute(
+                select(llm_response_cache_table.c.response)
+                .where(llm_response_cache_table.c.cache_key == key)
+                .where(llm_response_cache_table.c.created_at >= self._cutoff())
+            ).fetchone()
+        self._record(row is not None)
+        if row is None:
+            return None
+        write(engine, lambda conn: conn.execute(
+            update(llm_response_cache_table)
+            .where(llm_response_cache_table.c.cache_key == key)
+            .values(
+                hits=llm_response_cache_table.c.hits + 1,
+                last_accessed=datetime.now(timezone.utc).isoformat()
+            )
+        ))
+        return row[0]
+
+    def put(self, engine, key: str, model: str, temperature: float, response: str):
+        if not self.enabled or engine is None:
+            return
+        now = datetime.now(timezone.utc).isoformat()
+
+        def _put(conn):
+            conn.execute(delete(llm_response_cache_table).where(llm_response_cache_table.c.cache_key == key))
+            conn.execute(insert(llm_response_cache_table), {
+                "cache_key": key,
+                "model": model,
+                "temperature": temperature,
+                "response": response,
+                "size_bytes": len(response.encode("utf-8")),
+                "hits": 0,
+                "created_at": now,
+                "last_accessed": now,
+            })
+            self._evict(conn)
+
+        write(engine, _put)
+
+    def delete(self, engine, key: str):
+        """Drop an entry, e.g. a response its caller found unusable."""
+        if not self.enabled or engine is None:
+            return
+        write(engine, lambda conn: conn.execute(
+            delete(llm_response_cache_table).where(llm_response_cache_table.c.cache_key == key)
+        ))
+
+    def _evict(self, conn):
+        conn.execute(delete(llm_response_cache_table).where(llm_response_cache_table.c.created_at < self._cutoff()))
+        rows = conn.execute(
+            select(llm_response_cache_table.c.id, llm_response_cache_table.c.size_bytes)
+            .order_by(llm_response_cache_table.c.last_accessed.desc())
+        ).fetchall()
+        total = 0
+        stale = []
+        for row_id, size in rows:
+            total += size or 0
+            if total > self.max_bytes:
+                stale.append(row_id)
+        if stale:
+            conn.execute(delete(llm_response_cache_table).where(llm_response_cache_table.c.id.in_(stale)))
+
+# Global LLM response cache shared by the agent's model calls.
+llm_cache = LLMResponseCache(
+    LLM_CACHE_CONFIG["ttl_seconds"],
+    LLM_CACHE_CONFIG["max_bytes"],
+    enabled=LLM_CACHE_CONFIG["enabled"],
+)
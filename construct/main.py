@@ -0,0 +1,103 @@
+# construct/main.py
+"""
+Command-line entry point (`construct`).
+
+    construct serve [--host 0.0.0.0] [--port 8000] [--workers 4 | --reload]
+    construct bench [--sizes 1000,10000] [--stages analyze,schedule] [--baseline old.json]
+    construct synth --tasks 10000 --format csv --out gen/synthetic
+
+Only argparse is imported up front; each command imports what it needs, so `construct
+--help` and argument errors return without loading the API, pandas or SQLAlchemy.
+"""
+import argparse
+import sys
+
+def _int_list(value: str) -> list:
+    return [int(v.replace("_", "")) for v in value.split(",") if v]
+
+def _str_list(value: str) -> list:
+    return [v for v in value.split(",") if v]
+
+def _add_generator_options(parser):
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--wbs-depth", type=int, default=4)
+    parser.add_argument("--dependency-density", type=float, default=1.5, help="average predecessors per task")
+    parser.add_argument("--progress", default="mixed", choices=["on_track", "behind", "ahead", "mixed"])
+
+def _serve(args) -> int:
+    import uvicorn
+    # By import string: required for --reload/--workers, and keeps the app's imports in the server.
+    uvicorn.run("construct.api:app", host=args.host, port=args.port, workers=args.workers, reload=args.reload)
+    return 0
+
+def _bench(args) -> int:
+    from construct.bench import run_bench, DEFAULT_SIZES
+    report = run_bench(
+        sizes=args.sizes or DEFAULT_SIZES,
+        stages=args.stages,
+        seed=args.seed,
+        output=args.output,
+        baseline=args.baseline,
+        workdir=args.workdir,
+        excel_max_tasks=args.excel_max_tasks,
+        verbose=args.verbose,
+        wbs_depth=args.wbs_depth,
+        dependency_density=args.dependency_density,
+        progress=args.progress,
+    )
+    return 1 if any("error" in r for r in report["results"]) else 0
+
+def _synth(args) -> int:
+    from construct.synthetic import generate_schedule, write_excel, write_csv, write_db
+    schedule = generate_schedule(args.tasks, wbs_depth=args.wbs_depth, dependency_density=args.dependency_density,
+                                 progress=args.progress, seed=args.seed)
+    if args.format == "db":
+        from construct.database import init_db
+        engine = init_db(args.db_url)
+        rows = write_db(schedule, engine, args.schedule_id)
+        print(f"wrote {rows} task rows for {args.schedule_id} to {engine.url}")
+        return 0
+    writer = write_excel if args.format == "xlsx" else write_csv
+    paths = writer(schedule, args.out, prefix=args.prefix)
+    for schedule_type, path in paths.items():
+        print(f"{schedule_type}: {path}")
+    print(f"status date: {schedule['status_date']}")
+    return 0
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="construct", description="Construction scheduling tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    serve = commands.add_parser("serve", help="run the API server")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=8000)
+    serve.add_argument("--workers", type=int, default=None, help="worker processes (default 1)")
+    serve.add_argument("--reload", action="store_true", help="restart on code changes (development)")
+    serve.set_defaults(handler=_serve)
+
+    bench = commands.add_parser("bench", help="time each pipeline stage on synthetic schedules")
+    bench.add_argument("--sizes", type=_int_list, help="comma-separated task counts (default 1000,10000,100000,1000000)")
+    bench.add_argument("--stages", type=_str_list, help="comma-separated stages to time after loading")
+    bench.add_argument("--output", help="results JSON (default gen/bench/bench_<time>.json)")
+    bench.add_argument("--baseline", help="earlier results JSON to compare against")
+    bench.add_argument("--workdir", help="where databases and workbooks go (default: a temp dir)")
+    bench.add_argument("--excel-max-tasks", type=int, help="largest size written as Excel; larger sizes use CSV")
+    bench.add_argument("--verbose", action="store_true", help="show the pipeline's own output")
+    _add_generator_options(bench)
+    bench.set_defaults(handler=_bench)
+
+    synth = commands.add_parser("synth", help="write a synthetic schedule")
+    synth.add_argument("--tasks", type=int, required=True)
+    synth.add_argument("--format", choices=["xlsx", "csv", "db"], default="xlsx")
+    synth.add_argument("--out", default="gen/synthetic", help="output folder for xlsx/csv")
+    synth.add_argument("--prefix", default="synthetic")
+    synth.add_argument("--db-url", help="database for --format db (default: the project default DB)")
+    synth.add_argument("--schedule-id", default="SYNTH001")
+    _add_generator_options(synth)
+    synth.set_defaults(handler=_synth)
+
+    args = parser.parse_args(argv)
+    return args.handler(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
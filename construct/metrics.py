@@ -0,0 +1,194 @@
+# construct/metrics.py
+"""
+In-process counters and latency histograms, exposed as Prometheus text on /metrics.
+
+    with metrics.timed("construct_stage_seconds", stage="parse"):
+        ...
+
+    @metrics.instrument("construct_stage_seconds", stage="assign_chunks")
+    def assign_chunks(...): ...
+
+    metrics.inc("construct_tasks_processed_total", len(rows), stage="parse")
+
+With CONSTRUCT_METRICS=0, timed() hands back a shared no-op context and inc()/observe()
+return after one attribute check, so instrumented code pays next to nothing.
+
+Each process keeps its own registry. Work sent to the process pool is timed around the
+submit in the server process; timings recorded inside the worker process are not
+reported.
+"""
+import bisect
+import functools
+import os
+import threading
+import time
+
+METRICS_CONFIG = {
+    "enabled": os.environ.get("CONSTRUCT_METRICS", "1") != "0",
+}
+
+# Seconds; chosen to cover both SQLite writes (ms) and planner/LLM calls (minutes).
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+METRIC_HELP = {
+    "construct_stage_seconds": "Time spent in a pipeline stage.",
+    "construct_cpu_task_seconds": "Time from handing work to the CPU pool to its result, by function.",
+    "construct_tasks_processed_total": "Tasks handled by a pipeline stage.",
+    "construct_bytes_written_total": "Bytes written to files, by kind.",
+    "construct_db_write_seconds": "Time to commit one batch of database writes.",
+    "construct_db_write_jobs_total": "Write jobs committed through the single writer.",
+    "construct_db_lock_retries_total": "Writes retried because the database was locked.",
+    "construct_event_dispatch_seconds": "Time to run all listeners of an event.",
+    "construct_planner_seconds": "Planner subprocess wall time, by outcome.",
+    "construct_llm_call_seconds": "LLM request latency, by kind.",
+    "construct_llm_tokens_total": "Tokens consumed by LLM calls.",
+    "construct_cache_requests_total": "Cache lookups, by cache and result.",
+    "construct_events_total": "Event manager counters.",
+    "construct_events_pending": "Events waiting in the debouncer or queue.",
+}
+
+class _NoopTimer:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+_NOOP = _NoopTimer()
+
+class _Timer:
+    __slots__ = ("registry", "name", "labels", "started")
+
+    def __init__(self, registry, name: str, labels: dict):
+        self.registry = registry
+        self.name = name
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.registry.observe(self.name, time.perf_counter() - self.started, **self.labels)
+        return False
+
+class MetricsRegistry:
+    def __init__(self, enabled: bool = True, buckets: tuple = LATENCY_BUCKETS):
+        self.enabled = enabled
+        self.buckets = tuple(buckets)
+        self._counters = {}    # (name, labels) -> value
+        self._histograms = {}  # (name, labels) -> [bucket counts..., sum, count]
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(name: str, labels: dict) -> tuple:
+        return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+    def inc(self, name: str, value: float = 1, **labels):
+        if not self.enabled:
+            return
+        key = self._key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name: str, value: float, **labels):
+        if not self.enabled:
+            return
+        key = self._key(name, labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            histogram = self._histograms.get(key)
+            if histogram is None:
+                histogram = self._histograms[key] = [0] * (len(self.buckets) + 3)
+            histogram[index] += 1  # the last bucket slot is +Inf
+            histogram[-2] += value
+            histogram[-1] += 1
+
+    def timed(self, name: str, **labels):
+        """Context manager observing its duration in histogram `name`."""
+        if not self.enabled:
+            return _NOOP
+        return _Timer(self, name, labels)
+
+    def instrument(self, name: str, **labels):
+        """Decorator form of timed(); checks `enabled` on every call, not at import."""
+        def decorator(fn):
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                with _Timer(self, name, labels):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def add_collector(self, collector):
+        """
+        Call collector() on every scrape; it returns (name, type, labels, value) samples
+        for numbers kept elsewhere (cache stats, event manager counters).
+        """
+        if collector not in self._collectors:
+            self._collectors.append(collector)
+
+    def reset(self):
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "counters": dict(self._counters),
+                "histograms": {k: list(v) for k, v in self._histograms.items()},
+            }
+
+    def render_prometheus(self) -> str:
+        """All metrics in the Prometheus text exposition format (version 0.0.4)."""
+        families = {}  # name -> (type, [(suffix, labels, value)])
+
+        def add(name, kind, suffix, labels, value):
+            families.setdefault(name, (kind, []))[1].append((suffix, labels, value))
+
+        snapshot = self.snapshot()
+        for (name, labels), value in snapshot["counters"].items():
+            add(name, "counter", "", labels, value)
+        for (name, labels), histogram in snapshot["histograms"].items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), histogram[:-2]):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else repr(bound)
+                add(name, "histogram", "_bucket", labels + (("le", le),), cumulative)
+            add(name, "histogram", "_sum", labels, histogram[-2])
+            add(name, "histogram", "_count", labels, histogram[-1])
+        for collector in list(self._collectors):
+            try:
+                samples = collector()
+            except Exception as e:
+                print(f"debug: metrics collector {collector} failed: {e}")
+                continue
+            for name, kind, labels, value in samples:
+                add(name, kind, "", tuple(sorted((k, str(v)) for k, v in labels.items())), value)
+
+        lines = []
+        for name in sorted(families):
+            kind, samples = families[name]
+            if name in METRIC_HELP:
+                lines.append(f"# HELP {name} {METRIC_HELP[name]}")
+            lines.append(f"# TYPE {name} {kind}")
+            for suffix, labels, value in samples:
+                label_text = ",".join(f'{k}="{_escape(v)}"' for k, v in labels)
+                lines.append(f"{name}{suffix}{{{label_text}}} {_number(value)}" if label_text
+                             else f"{name}{suffix} {_number(value)}")
+        return "\n".join(lines) + "\n"
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _number(value) -> str:
+    if isinstance(value, float) and not value.is_integer():
+        return repr(value)
+    return str(int(value))
+
+# Global registry shared by the whole process.
+metrics = MetricsRegistry(enabled=METRICS_CONFIG["enabled"])
@@ -36,4 +36,5 @@ class ScheduleRow(BaseModel):
 
 class ScheduleData(BaseModel):
     schedule_id: str
-    tasks: List[ScheduleRow]
\ No newline at end of file
+    tasks: List[ScheduleRow]
+    event_id: Optional[str] = None  # the schedule_ingested event, if one was emitted
\ No newline at end of file
@@ -0,0 +1,143 @@
+# construct/optimized_schedule.py
+import os
+from datetime import datetime
+from sqlalchemy import select, delete
+from construct.database import projects_table, tasks_table
+from construct.db_writer import write
+from construct.plan_parser import steps_to_dates, plan_makespan, DATE_FORMAT
+from construct.utils import parse_user_date
+
+OPTIMIZED_SCHEDULE_TYPE = "optimized"
+WRITE_BATCH_SIZE = 10000
+
+EXPORT_COLUMNS = [
+    "task_id", "task_name", "wbs_value", "parent_id", "p6_wbs_guid",
+    "bl_start", "bl_finish", "start_date", "end_date", "duration", "status",
+]
+
+def get_plan_origin(engine, schedule_id: str) -> datetime:
+    """
+    The calendar date that plan offset 0 corresponds to:
+    the project's start date if set, else the earliest baseline start, else now.
+    """
+    with engine.connect() as conn:
+        start_str = conn.execute(
+            select(projects_table.c.project_start_date)
+            .where(projects_table.c.schedule_id == schedule_id)
+            .where(projects_table.c.project_start_date.is_not(None))
+        ).scalar()
+        if not start_str:
+            start_str = conn.execute(
+                select(tasks_table.c.bl_start)
+                .where(tasks_table.c.schedule_id == schedule_id)
+                .where(tasks_table.c.bl_start.is_not(None))
+                .order_by(tasks_table.c.bl_start)
+                .limit(1)
+            ).scalar()
+    return parse_user_date(start_str) or datetime.utcnow().replace(microsecond=0)
+
+def _source_tasks(conn, schedule_id: str) -> dict:
+    """
+    Task metadata to carry over onto the optimized rows, keyed by lowercased task_id
+    (planners lowercase PDDL names). In-progress rows win over target rows.
+    """
+    rows = conn.execute(
+        select(
+            tasks_table.c.task_id, tasks_table.c.task_name, tasks_table.c.wbs_value,
+            tasks_table.c.parent_id, tasks_table.c.p6_wbs_guid,
+            tasks_table.c.bl_start, tasks_table.c.bl_finish, tasks_table.c.schedule_type,
+        )
+        .where(tasks_table.c.schedule_id == schedule_id)
+        .where(tasks_table.c.schedule_type != OPTIMIZED_SCHEDULE_TYPE)
+    ).mappings()
+    source = {}
+    for r in rows:
+        key = r["task_id"].lower()
+        if key not in source or r["schedule_type"] == "in-progress":
+            source[key] = dict(r)
+    return source
+
+def write_optimized_schedule(engine, schedule_id: str, steps, origin: datetime) -> int:
+    """
+    Replace the "optimized" schedule for schedule_id with the given plan steps.
+    Rows are inserted in batches inside a single transaction.
+    Returns the number of task rows written.
+    """
+    def _write(conn):
+        written = 0
+        source = _source_tasks(conn, schedule_id)
+        conn.execute(
+            delete(tasks_table)
+            .where(tasks_table.c.schedule_id == schedule_id)
+            .where(tasks_table.c.schedule_type == OPTIMIZED_SCHEDULE_TYPE)
+        )
+        batch = []
+        for task_id, start_date, end_date, duration in steps_to_dates(steps, origin):
+            src = source.get(task_id.lower(), {})
+            batch.append({
+                "schedule_id": schedule_id,
+                "schedule_type": OPTIMIZED_SCHEDULE_TYPE,
+                "task_id": src.get("task_id", task_id),
+                "task_name": src.get("task_name"),
+                "wbs_value": src.get("wbs_value"),
+                "parent_id": src.get("parent_id"),
+                "p6_wbs_guid": src.get("p6_wbs_guid"),
+                "percent_done": None,
+                "bl_start": src.get("bl_start"),
+                "bl_finish": src.get("bl_finish"),
+                "start_date": start_date,
+                "end_date": end_date,
+                "duration": duration,
+                "status": "planned",
+            })
+            if len(batch) >= WRITE_BATCH_SIZE:
+                conn.execute(tasks_table.insert(), batch)
+                written += len(batch)
+                batch = []
+        if batch:
+            conn.execute(tasks_table.insert(), batch)
+            written += len(batch)
+        return written
+    written = write(engine, _write)
+    print(f"debug: wrote {written} optimized tasks for schedule {schedule_id}")
+    return written
+
+def export_optimized_schedule(engine, schedule_id: str, output_dir: str) -> str:
+    """
+    Export the optimized schedule as an .xlsx workbook using the same column names
+    as the ingestion format, so it can be re-ingested as a new target schedule.
+    Rows are streamed with openpyxl's write-only mode.
+    """
+    from openpyxl import Workbook
+    os.makedirs(output_dir, exist_ok=True)
+    export_file = os.path.join(output_dir, f"optimized_{schedule_id}.xlsx")
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet("optimized")
+    ws.append(EXPORT_COLUMNS)
+    with engine.connect() as conn:
+        rows = conn.execute(
+            select(*[tasks_table.c[col] for col in EXPORT_COLUMNS])
+            .where(tasks_table.c.schedule_id == schedule_id)
+            .where(tasks_table.c.schedule_type == OPTIMIZED_SCHEDULE_TYPE)
+            .order_by(tasks_table.c.start_date, tasks_table.c.task_id)
+        )
+        for row in rows:
+            ws.append(list(row))
+    wb.save(export_file)
+    return export_file
+
+def build_optimized_result(engine, schedule_id: str, steps, origin: datetime, output_dir: str, planner: str) -> dict:
+    """
+    Write back and export a plan, returning the structured result shared by every planner path.
+    """
+    written = write_optimized_schedule(engine, schedule_id, steps, origin)
+    export_file = export_optimized_schedule(engine, schedule_id, output_dir)
+    return {
+        "status": "success",
+        "schedule_id": schedule_id,
+        "planner": planner,
+        "steps": written,
+        "makespan": plan_makespan(steps),
+        "plan_start": origin.strftime(DATE_FORMAT),
+        "optimized_project_file": os.path.abspath(export_file),
+    }
@@ -0,0 +1,285 @@
+# construct/outbox.py
+"""
+Durable event outbox.
+
+Events that trigger downstream work (e.g. schedule_ingested -> PDDL generation) are
+written to events_table in the same transaction as the data they describe, then
+dispatched through event_manager. A completion worker marks them done in batches.
+
+A row is claimed by the process that dispatches it: status "claimed", with its owner
+and a lease. The writing process claims the row in the same transaction that creates
+it. Another process only takes over rows that are still pending, or whose lease has
+run out because their owner died. Such rows are replayed when a process first opens
+the database, and again as the leases it saw expire, so a crash no longer means
+re-ingesting and live workers do not run each other's events twice.
+
+Payloads must be JSON-serializable; listeners get the database back via engine_for().
+"""
+import json
+import os
+import queue
+import socket
+import threading
+import uuid
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import insert, select, update, bindparam, func, or_, and_
+from construct.database import events_table
+from construct.eventing import event_manager, Event
+from construct.registry import project_registry
+from construct.db_writer import write
+from construct.tracing import tracer
+
+PENDING = "pending"
+CLAIMED = "claimed"
+DONE = "done"
+FAILED = "failed"
+
+REPLAY_BATCH_SIZE = 100
+COMPLETION_BATCH_SIZE = 100
+
+OUTBOX_CONFIG = {
+    # How long a claimed event may run before another process treats its owner as dead.
+    "lease_seconds": float(os.environ.get("CONSTRUCT_OUTBOX_LEASE_SECONDS", "900")),
+}
+
+# Identifies this process as the owner of the rows it claims.
+OWNER = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+_replayed = set()
+_replay_timers = {}
+_replayed_lock = threading.Lock()
+
+def db_url_of(engine) -> str:
+    return engine.url.render_as_string(hide_password=False)
+
+def register_engine(engine) -> str:
+    """Make sure an engine's URL resolves back to it, so in-process listeners reuse it."""
+    return project_registry.adopt(engine)
+
+def engine_for(db_url: str):
+    """The engine for a database URL carried in an outbox payload."""
+    return project_registry.engine(db_url)
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+def _lease_until() -> str:
+    return (datetime.now(timezone.utc) + timedelta(seconds=OUTBOX_CONFIG["lease_seconds"])).isoformat()
+
+def enqueue_event(conn, event_type: str, payload: dict, schedule_id: str = None, details: str = None) -> Event:
+    """
+    Write an outbox row on `conn` (inside the caller's transaction), claimed by this
+    process, and return the Event to emit once that transaction has committed. The
+    current trace is stored with the payload, so a replayed event still reports under
+    the request that wrote it.
+    """
+    tracer.inject(payload)
+    event = Event(event_type, payload, event_id=uuid.uuid4().hex)
+    conn.execute(
+        insert(events_table),
+        {
+            "schedule_id": schedule_id,
+            "event_type": event_type,
+            "event_details": details,
+            "timestamp": _now(),
+            "event_id": event.event_id,
+            "payload": json.dumps(payload),
+            "status": CLAIMED,
+            "attempts": 0,
+            "owner": OWNER,
+            "lease_until": _lease_until(),
+        },
+    )
+    return event
+
+def publish(event: Event, db_url: str):
+    """Dispatch a committed outbox event and record its outcome when the listeners finish."""
+    handle = event_manager.emit(event)
+    event_id = event.event_id
+    handle.add_done_callback(lambda h: completions.record(db_url, event_id, h.errors))
+    return handle
+
+def _claimable(now: str):
+    # Pending rows (written before leases existed), and rows of another process whose
+    # lease ran out. This process's own claims are still in flight here.
+    return or_(
+        events_table.c.status == PENDING,
+        and_(
+            events_table.c.status == CLAIMED,
+            events_table.c.lease_until < now,
+            or_(events_table.c.owner.is_(None), events_table.c.owner != OWNER),
+        ),
+    )
+
+def claim_pending(engine, limit: int = REPLAY_BATCH_SIZE) -> list:
+    """
+    Claim up to `limit` unfinished outbox rows for this process, oldest first, and return
+    them as Events. Runs as one write job under the database's write lock, so two
+    processes never claim the same row.
+    """
+    def _claim(conn):
+        now = _now()
+        rows = conn.execute(
+            select(events_table.c.id, events_table.c.event_id, events_table.c.event_type, events_table.c.payload)
+            .where(_claimable(now))
+            .order_by(events_table.c.id)
+            .limit(limit)
+        ).fetchall()
+        if rows:
+            conn.execute(
+                update(events_table)
+                .where(events_table.c.id.in_([r.id for r in rows]))
+                .values(status=CLAIMED, owner=OWNER, lease_until=_lease_until())
+            )
+        return rows
+
+    rows = write(engine, _claim)
+    return [Event(r.event_type, json.loads(r.payload or "{}"), event_id=r.event_id) for r in rows]
+
+def next_lease_expiry(engine):
+    """When the earliest lease held by another process runs out (ISO string), or None."""
+    with engine.connect() as conn:
+        return conn.execute(
+            select(func.min(events_table.c.lease_until))
+            .where(events_table.c.status == CLAIMED)
+            .where(or_(events_table.c.owner.is_(None), events_table.c.owner != OWNER))
+        ).scalar()
+
+def replay_pending(engine, batch_size: int = REPLAY_BATCH_SIZE) -> int:
+    """Claim and re-dispatch every replayable outbox event of a database. Returns the number replayed."""
+    db_url = register_engine(engine)
+    replayed = 0
+    while True:
+        page = claim_pending(engine, batch_size)
+        if not page:
+            break
+        for event in page:
+            publish(event, db_url)
+        replayed += len(page)
+    if replayed:
+        print(f"debug: replayed {replayed} pending outbox events from {db_url}")
+    return replayed
+
+def _schedule_replay(engine):
+    """Check the database again once the earliest lease held by another process runs out."""
+    expiry = next_lease_expiry(engine)
+    if expiry is None:
+        return
+    db_url = register_engine(engine)
+    delay = (datetime.fromisoformat(expiry) - datetime.now(timezone.utc)).total_seconds()
+    timer = threading.Timer(max(delay, 0) + 1, _replay_expired, args=(engine,))
+    timer.daemon = True
+    with _replayed_lock:
+        if db_url in _replay_timers:
+            return
+        _replay_timers[db_url] = timer
+    timer.start()
+
+def _replay_expired(engine):
+    with _replayed_lock:
+        _replay_timers.pop(register_engine(engine), None)
+    try:
+        replay_pending(engine)
+        _schedule_replay(engine)
+    except Exception as e:
+        print(f"debug: outbox replay failed: {e}")
+
+def ensure_replayed(engine) -> int:
+    """
+    Replay a database's unclaimed and expired events the first time this process opens
+    it, then again whenever a lease held by another process runs out.
+    """
+    db_url = register_engine(engine)
+    with _replayed_lock:
+        if db_url in _replayed:
+            return 0
+        _replayed.add(db_url)
+    replayed = replay_pending(engine)
+    _schedule_replay(engine)
+    return replayed
+
+class CompletionWriter:
+    """
+    Marks outbox rows done/failed. Outcomes are queued and written by one worker thread,
+    grouped per database into a single executemany UPDATE. Without a running worker the
+    outcome is written immediately.
+    """
+    def __init__(self, batch_size: int = COMPLETION_BATCH_SIZE):
+        self.batch_size = batch_size
+        self._queue = None
+        self._worker = None
+
+    def start(self):
+        if self._worker is not None:
+            return
+        self._queue = queue.Queue()
+        self._worker = threading.Thread(target=self._loop, args=(self._queue,), name="outbox-writer", daemon=True)
+        self._worker.start()
+
+    def stop(self, wait: bool = True):
+        if self._worker is None:
+            return
+        worker, self._worker = self._worker, None
+        q, self._queue = self._queue, None
+        q.put(None)
+        if wait:
+            worker.join()
+
+    def record(self, db_url: str, event_id: str, errors: list):
+        item = (db_url, event_id, list(errors))
+        q = self._queue
+        if q is None:
+            self._write([item])
+        else:
+            q.put(item)
+
+    def flush(self):
+        """Block until every outcome recorded so far has been written."""
+        q = self._queue
+        if q is not None:
+            q.join()
+
+    def _loop(self, q: queue.Queue):
+        while True:
+            batch = [q.get()]
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(q.get_nowait())
+                except queue.Empty:
+                    break
+            items = [item for item in batch if item is not None]
+            try:
+                if items:
+                    self._write(items)
+            except Exception as e:
+                print(f"debug: failed to record outbox completions: {e}")
+            finally:
+                for _ in batch:
+                    q.task_done()
+            if len(items) < len(batch):
+                return
+
+    def _write(self, items: list):
+        by_db = {}
+        for db_url, event_id, errors in items:
+            by_db.setdefault(db_url, []).append({
+                "b_event_id": event_id,
+                "b_status": FAILED if errors else DONE,
+                "b_error": "; ".join(errors) or None,
+                "b_processed_at": _now(),
+            })
+        for db_url, params in by_db.items():
+            stmt = (
+                update(events_table)
+                .where(events_table.c.event_id == bindparam("b_event_id"))
+                .values(
+                    status=bindparam("b_status"),
+                    last_error=bindparam("b_error"),
+                    processed_at=bindparam("b_processed_at"),
+                    attempts=events_table.c.attempts + 1,
+                )
+            )
+            write(engine_for(db_url), lambda conn: conn.execute(stmt, params))
+
+# Global completion writer shared by every outbox event.
+completions = CompletionWriter()
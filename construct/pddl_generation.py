@@ -2,10 +2,14 @@ import os
 from datetime import datetime, timezone
 from sqlalchemy import select, insert, update
 from construct.database import tasks_table, pddl_mappings_table
+from construct.db_writer import write
 from construct.utils import compute_duration
 from construct.assign_chunks import assign_chunks
+from construct.metrics import metrics
+from construct.tracing import tracer
 
 # Generate the domain PDDL for a target schedule in an idempotent fashion.
+@tracer.traced("pddl.domain_for_target")
 def generate_domain_for_target(schedule_id: str, engine, output_dir: str = None) -> str:
     if output_dir is None:
         output_dir = os.path.join("gen", f"schedule_{schedule_id}")
@@ -28,9 +32,10 @@ def generate_domain_for_target(schedule_id: str, engine, output_dir: str = None)
     domain_str = generate_domain(schedule_id, engine)
     with open(domain_file, "w") as f:
         f.write(domain_str)
+    metrics.inc("construct_bytes_written_total", len(domain_str), kind="pddl")
     
     # Upsert the mapping entry
-    with engine.begin() as conn:
+    def _upsert(conn):
         if mapping:
             conn.execute(
                 update(pddl_mappings_table)
@@ -46,9 +51,12 @@ def generate_domain_for_target(schedule_id: str, engine, output_dir: str = None)
                 "problem_file": None,
                 "created_at": datetime.now(timezone.utc).isoformat()
             })
+    write(engine, _upsert)
     return domain_file
 
 
+@tracer.traced("pddl.domain")
+@metrics.instrument("construct_stage_seconds", stage="pddl_domain")
 def generate_domain(schedule_id: str, engine) -> str:
     """
     Generate a domain definition for the entire schedule.
@@ -98,6 +106,8 @@ def generate_domain(schedule_id: str, engine) -> str:
     domain_str = "\n".join(domain_lines)
     return domain_str
 
+@tracer.traced("pddl.problem")
+@metrics.instrument("construct_stage_seconds", stage="pddl_problem")
 def generate_problem_for_chunk(schedule_id: str, engine, tasks: list, chunks: list, current_chunk: str) -> str:
     """
     Generate a problem definition for a given chunk.
@@ -152,6 +162,7 @@ def generate_problem_for_chunk(schedule_id: str, engine, tasks: list, chunks: li
     return problem_str
 
 # Generates PDDL files (both domain and problem) for an in-progress schedule in an idempotent fashion.
+@tracer.traced("pddl.chunks")
 def generate_pddl_chunks_for_schedule(schedule_id: str, engine, chunk_length_days: int = 28, output_dir: str = None):
     if output_dir is None:
         output_dir = os.path.join("gen", f"schedule_{schedule_id}")
@@ -192,6 +203,7 @@ def generate_pddl_chunks_for_schedule(schedule_id: str, engine, chunk_length_day
     if not (mapping and os.path.isfile(domain_file)):
         with open(domain_file, "w") as f:
             f.write(domain_str)
+        metrics.inc("construct_bytes_written_total", len(domain_str), kind="pddl")
     
     # Generate the problem file for the current chunk.
     # (Assumes generate_problem_for_chunk is defined to return the problem PDDL as a string.)
@@ -200,9 +212,10 @@ def generate_pddl_chunks_for_schedule(schedule_id: str, engine, chunk_length_day
     if not os.path.isfile(problem_file):
         with open(problem_file, "w") as f:
             f.write(problem_str)
+        metrics.inc("construct_bytes_written_total", len(problem_str), kind="pddl")
     
     # Upsert the mapping entry to include both the domain and problem file paths.
-    with engine.begin() as conn:
+    def _upsert(conn):
         if mapping:
             conn.execute(
                 update(pddl_mappings_table)
@@ -219,5 +232,6 @@ def generate_pddl_chunks_for_schedule(schedule_id: str, engine, chunk_length_day
                 "problem_file": problem_file,
                 "created_at": datetime.now(timezone.utc).isoformat()
             })
+    write(engine, _upsert)
     
     return {"domain": domain_file, "problems": {current_chunk: problem_file}}
\ No newline at end of file
@@ -1,13 +1,12 @@
 import os
 
-# Ensure generated folder exists
 GEN_FOLDER = "gen"
-os.makedirs(GEN_FOLDER, exist_ok=True)
 
 def save_pddl(domain_str: str, problem_str: str, base_name: str):
     """
     Save the PDDL domain and problem file in the generated folder.
     """
+    os.makedirs(GEN_FOLDER, exist_ok=True)
     with open(f"{GEN_FOLDER}/{base_name}_domain.pddl", "w") as f:
         f.write(domain_str)
 
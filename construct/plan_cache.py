@@ -0,0 +1,121 @@
+# construct/plan_cache.py
+import os
+import re
+import copy
+import threading
+from collections import OrderedDict
+
+PLAN_CACHE_CONFIG = {
+    "enabled": os.environ.get("CONSTRUCT_PLAN_CACHE", "1") != "0",
+    "max_entries": int(os.environ.get("CONSTRUCT_PLAN_CACHE_ENTRIES", "256")),
+}
+
+STOPWORDS = {
+    "a", "about", "am", "an", "and", "any", "are", "as", "at", "be", "can", "could", "do", "does",
+    "for", "from", "give", "i", "in", "is", "it", "its", "me", "my", "of", "on", "or", "our",
+    "please", "show", "tell", "that", "the", "this", "to", "us", "we", "what", "which", "with",
+    "would", "you",
+}
+
+# Queries made only of these words are the everyday "how is the schedule doing"
+# requests; they all get DEFAULT_PLAN. Spelled as normalize_query leaves them
+# ("progress" -> "progres", "status" -> "statu").
+COMPARE_SUMMARIZE_WORDS = {
+    "ahead", "analysis", "analyze", "behind", "compare", "comparison", "delay", "delayed",
+    "doing", "going", "how", "late", "overview", "plan", "progres", "project", "report",
+    "schedule", "slip", "slipping", "statu", "summarize", "summary", "target", "task",
+    "track", "variance", "versu", "vs", "where",
+}
+
+COMPARE_SUMMARIZE = "compare_summarize"
+
+# "{query}" in a description is replaced with the user's query.
+DEFAULT_PLAN = [
+    {"action": "status_counts", "description": "Count tasks by status and against plan."},
+    {"action": "top_variances", "description": "List the tasks furthest behind plan."},
+    {"action": "wbs_rollup", "description": "Roll progress up per WBS."},
+    {"action": "finalize", "description": "{query}"},
+]
+
+def normalize_query(query: str) -> str:
+    """Lower-cased content words, crudely singularized, de-duplicated and sorted."""
+    words = set()
+    for word in re.findall(r"[a-z0-9]+", (query or "").lower()):
+        if word in STOPWORDS:
+            continue
+        if len(word) > 3 and word.endswith("s"):
+            word = word[:-1]
+        words.add(word)
+    return " ".join(sorted(words))
+
+def query_intent(query: str) -> str:
+    """The cache key for a query: a known intent, or its normalized words."""
+    normalized = normalize_query(query)
+    if not normalized or set(normalized.split()) <= COMPARE_SUMMARIZE_WORDS:
+        return COMPARE_SUMMARIZE
+    return normalized
+
+class PlanCache:
+    """
+    Agent plans by query intent, so recurring questions skip the planning call.
+    COMPARE_SUMMARIZE is always answered with DEFAULT_PLAN; other intents hold the
+    plan the model produced the first time, least recently used evicted beyond
+    max_entries. Queries with the same words in another order share an intent, so a
+    stored plan's finalize step asks "{query}" rather than the first query's question.
+    In memory only: plans are cheap to regenerate.
+    """
+    def __init__(self, max_entries: int, enabled: bool = True):
+        self.max_entries = max_entries
+        self.enabled = enabled
+        self.hits = 0
+        self.misses = 0
+        self._plans = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, query: str):
+        if not self.enabled:
+            return None
+        intent = query_intent(query)
+        with self._lock:
+            if intent == COMPARE_SUMMARIZE:
+                plan = DEFAULT_PLAN
+            else:
+                plan = self._plans.get(intent)
+                if plan is not None:
+                    self._plans.move_to_end(intent)
+            if plan is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+        plan = copy.deepcopy(plan)
+        for step in plan:
+            if isinstance(step.get("description"), str):
+                step["description"] = step["description"].replace("{query}", query)
+        return plan
+
+    def put(self, query: str, plan: list):
+        if not self.enabled:
+            return
+        intent = query_intent(query)
+        if intent == COMPARE_SUMMARIZE:
+            return
+        plan = copy.deepcopy(plan)
+        for step in plan:
+            if step.get("action") == "finalize":
+                step["description"] = "{query}"
+        with self._lock:
+            self._plans[intent] = plan
+            self._plans.move_to_end(intent)
+            while len(self._plans) > self.max_entries:
+                self._plans.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._plans.clear()
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": len(self._plans)}
+
+# Global plan cache shared by the agent's planning step.
+plan_cache = PlanCache(PLAN_CACHE_CONFIG["max_entries"], enabled=PLAN_CACHE_CONFIG["enabled"])
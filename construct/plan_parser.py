@@ -0,0 +1,73 @@
+# construct/plan_parser.py
+import re
+from datetime import datetime, timedelta
+from typing import Iterable, NamedTuple
+
+# Matches OPTIC/POPF plan lines such as "12.003: (do_t1042)  [5.000]".
+PLAN_STEP_RE = re.compile(r"^\s*(\d+(?:\.\d*)?)\s*:\s*\(\s*([^\s)]+)[^)]*\)\s*\[(\d+(?:\.\d*)?)\]")
+# Every task is encoded as a "do_<task_id>" durative action in the domain.
+ACTION_PREFIX = "do_"
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+class PlanStep(NamedTuple):
+    task_id: str
+    start: float      # offset from the plan origin, in days
+    duration: float   # in days
+
+def _is_solution_header(line: str) -> bool:
+    return line.startswith(";") and ("Solution Found" in line or "Plan found" in line)
+
+def _parse_step(line: str):
+    # Cheap pre-check before the regex: every step line carries a "[duration]".
+    if "[" not in line:
+        return None
+    m = PLAN_STEP_RE.match(line)
+    if m is None:
+        return None
+    action = m.group(2)
+    if action.lower().startswith(ACTION_PREFIX):
+        action = action[len(ACTION_PREFIX):]
+    return PlanStep(action, float(m.group(1)), float(m.group(3)))
+
+class PlanCollector:
+    """
+    Incremental parse_plan: feed() planner output one line at a time, as the planner
+    prints it, and read the steps of the latest complete solution from `steps`.
+    OPTIC is an anytime planner and prints each improved solution in turn, so the
+    step list is reset whenever a new solution header appears.
+    """
+    def __init__(self):
+        self.steps = []
+
+    def feed(self, line: str):
+        if line.startswith(";"):
+            if _is_solution_header(line):
+                self.steps = []
+            return
+        step = _parse_step(line)
+        if step is not None:
+            self.steps.append(step)
+
+def parse_plan(lines: Iterable[str]) -> list:
+    """
+    Parse planner output into the steps of the final (best) plan. `lines` can be any
+    iterable of lines (a list, an open file, a pipe), so large outputs never have to be
+    held in memory as a single string.
+    """
+    collector = PlanCollector()
+    for line in lines:
+        collector.feed(line)
+    return collector.steps
+
+def plan_makespan(steps: Iterable[PlanStep]) -> float:
+    return max((s.start + s.duration for s in steps), default=0.0)
+
+def steps_to_dates(steps: Iterable[PlanStep], origin: datetime):
+    """
+    Map plan offsets (in days) onto calendar dates counted from `origin`.
+    Yields (task_id, start_date, end_date, duration) with dates as DB strings.
+    """
+    for step in steps:
+        start = origin + timedelta(days=step.start)
+        end = start + timedelta(days=step.duration)
+        yield step.task_id, start.strftime(DATE_FORMAT), end.strftime(DATE_FORMAT), step.duration
@@ -0,0 +1,162 @@
+# construct/planner_cache.py
+import os
+import json
+import hashlib
+import threading
+from datetime import datetime, timezone
+from sqlalchemy import select, insert, update, delete, func
+from construct.database import planner_cache_table
+from construct.db_writer import write
+
+PLANNER_CACHE_CONFIG = {
+    "cache_dir": os.environ.get("CONSTRUCT_PLANNER_CACHE_DIR", os.path.join("gen", "planner_cache")),
+    "max_disk_bytes": int(os.environ.get("CONSTRUCT_PLANNER_CACHE_MB", "256")) * 1024 * 1024,
+    "max_db_entries": int(os.environ.get("CONSTRUCT_PLANNER_CACHE_DB_ENTRIES", "200")),
+}
+
+def planner_cache_key(domain_text: str, problem_text: str, args: list = None) -> str:
+    """
+    Content hash of everything that determines the planner output.
+    """
+    h = hashlib.sha256()
+    for part in (domain_text, problem_text, json.dumps(list(args or []))):
+        h.update(part.encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+class PlannerCache:
+    """
+    Two-tier cache for planner stdout.
+      - Disk: one file per key in cache_dir, shared by all projects on the host.
+        Evicted least-recently-used (by mtime) once the directory exceeds max_disk_bytes.
+      - DB: the planner_cache table in the project's database, so a plan survives a
+        cleaned gen/ folder. Each DB keeps at most max_db_entries rows (LRU by last_accessed).
+    Hits and misses are counted on the instance and per row in the DB.
+    """
+    def __init__(self, cache_dir: str, max_disk_bytes: int, max_db_entries: int):
+        self.cache_dir = cache_dir
+        self.max_disk_bytes = max_disk_bytes
+        self.max_db_entries = max_db_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.cache_dir, f"{key}.plan")
+
+    def _record(self, hit: bool):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
+
+    def get(self, key: str, engine=None):
+        output = self._disk_get(key)
+        if output is None and engine is not None:
+            output = self._db_get(engine, key)
+            if output is not None:
+                self._disk_put(key, output)
+        elif output is not None and engine is not None:
+            self._db_touch(engine, key)
+        self._record(output is not None)
+        print(f"debug: planner cache {'hit' if output is not None else 'miss'} for {key[:12]}")
+        return output
+
+    def put(self, key: str, output: str, args: list = None, engine=None):
+        self._disk_put(key, output)
+        if engine is not None:
+            self._db_put(engine, key, output, args)
+
+    # --- disk tier ---
+    def _disk_get(self, key: str):
+        path = self._path(key)
+        try:
+            with open(path, "r") as f:
+                output = f.read()
+        except FileNotFoundError:
+            return None
+        # Refresh mtime so eviction is least-recently-used rather than oldest-written.
+        os.utime(path)
+        return output
+
+    def _disk_put(self, key: str, output: str):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = f"{self._path(key)}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(output)
+        os.replace(tmp_path, self._path(key))
+        self._evict_disk()
+
+    def _evict_disk(self):
+        entries = []
+        total = 0
+        for name in os.listdir(self.cache_dir):
+            if not name.endswith(".plan"):
+                continue
+            st = os.stat(os.path.join(self.cache_dir, name))
+            entries.append((st.st_mtime, st.st_size, name))
+            total += st.st_size
+        entries.sort()
+        for _, size, name in entries:
+            if total <= self.max_disk_bytes:
+                break
+            try:
+                os.remove(os.path.join(self.cache_dir, name))
+            except FileNotFoundError:
+                pass
+            total -= size
+
+    # --- DB tier ---
+    def _db_get(self, engine, key: str):
+        with engine.connect() as conn:
+            row = conn.execute(
+                select(planner_cache_table.c.output)
+                .where(planner_cache_table.c.cache_key == key)
+            ).fetchone()
+        if row is None:
+            return None
+        self._db_touch(engine, key)
+        return row[0]
+
+    def _db_touch(self, engine, key: str):
+        write(engine, lambda conn: conn.execute(
+            update(planner_cache_table)
+            .where(planner_cache_table.c.cache_key == key)
+            .values(
+                hits=planner_cache_table.c.hits + 1,
+                last_accessed=datetime.now(timezone.utc).isoformat()
+            )
+        ))
+
+    def _db_put(self, engine, key: str, output: str, args: list = None):
+        now = datetime.now(timezone.utc).isoformat()
+        def _put(conn):
+            conn.execute(delete(planner_cache_table).where(planner_cache_table.c.cache_key == key))
+            conn.execute(insert(planner_cache_table), {
+                "cache_key": key,
+                "planner_args": json.dumps(list(args or [])),
+                "output": output,
+                "size_bytes": len(output.encode("utf-8")),
+                "hits": 0,
+                "created_at": now,
+                "last_accessed": now,
+            })
+            count = conn.execute(select(func.count()).select_from(planner_cache_table)).scalar()
+            if count > self.max_db_entries:
+                stale = select(planner_cache_table.c.id).order_by(
+                    planner_cache_table.c.last_accessed
+                ).limit(count - self.max_db_entries)
+                conn.execute(delete(planner_cache_table).where(planner_cache_table.c.id.in_(stale)))
+        write(engine, _put)
+
+# Global planner cache instance shared by run_optic.
+planner_cache = PlannerCache(
+    PLANNER_CACHE_CONFIG["cache_dir"],
+    PLANNER_CACHE_CONFIG["max_disk_bytes"],
+    PLANNER_CACHE_CONFIG["max_db_entries"],
+)
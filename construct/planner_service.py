@@ -0,0 +1,113 @@
+# construct/planner_service.py
+import os
+from construct.jobs import JobRegistry
+from construct.scheduler import run_optic, run_portfolio, kill_planner
+from construct.chunk_planning import run_chunked
+
+PLANNER_CONFIG = {
+    "max_workers": int(os.environ.get("CONSTRUCT_PLANNER_WORKERS", "2")),
+    "timeout": float(os.environ.get("CONSTRUCT_PLANNER_TIMEOUT", "1800")),
+    "memory_limit_mb": int(os.environ.get("CONSTRUCT_PLANNER_MEMORY_MB", "4096")),
+}
+
+PLANNER_MODES = ("single", "portfolio", "chunked")
+
+class PlannerService:
+    """
+    Bounded pool of planner jobs.
+    At most max_workers jobs run at once; further submissions queue. Portfolio and
+    chunked jobs start several planner processes each, so the processes themselves are
+    bounded separately: every run takes a slot from scheduler.planner_slots
+    (CONSTRUCT_PLANNER_PROCESSES, default the CPU count), shared by all jobs.
+    Each job gets a timeout and a memory cap per process, and can be cancelled while
+    queued or running (the planner process groups are killed).
+    """
+    def __init__(self, max_workers: int, timeout: float = None, memory_limit_mb: int = None):
+        self.timeout = timeout
+        self.memory_limit_mb = memory_limit_mb
+        self.jobs = JobRegistry(max_workers, name="planner")
+
+    def _run(self, job, schedule_id: str, engine, mapping: dict, timeout: float, memory_limit_mb: int,
+             mode: str = "single"):
+        procs = []
+
+        def on_start(proc):
+            # Portfolio runs start several processes; cancelling kills all of them.
+            procs.append(proc)
+            job.set_cancel_hook(lambda: [kill_planner(p) for p in list(procs)])
+        if mode == "chunked":
+            return run_chunked(
+                schedule_id,
+                engine,
+                timeout=timeout,
+                memory_limit_mb=memory_limit_mb,
+                on_start=on_start,
+            )
+        if mode == "portfolio":
+            return run_portfolio(
+                schedule_id,
+                engine,
+                mapping,
+                deadline=timeout,
+                memory_limit_mb=memory_limit_mb,
+                on_start=on_start,
+            )
+        return run_optic(
+            schedule_id,
+            engine,
+            mapping,
+            timeout=timeout,
+            memory_limit_mb=memory_limit_mb,
+            on_start=on_start,
+        )
+
+    def submit(self, schedule_id: str, engine, mapping: dict,
+               timeout: float = None, memory_limit_mb: int = None, mode: str = "single"):
+        """
+        Queue a planner job. mode is "single" (run_optic), "portfolio" (run_portfolio)
+        or "chunked" (run_chunked).
+        """
+        if mode not in PLANNER_MODES:
+            raise ValueError(f"Unknown planner mode: {mode}")
+        mapping = dict(mapping)
+        return self.jobs.submit(
+            "planner",
+            self._run,
+            schedule_id,
+            engine,
+            mapping,
+            timeout or self.timeout,
+            memory_limit_mb or self.memory_limit_mb,
+            mode,
+            meta={
+                "schedule_id": schedule_id,
+                "mode": mode,
+                "domain_file": mapping.get("domain_file"),
+                "problem_file": mapping.get("problem_file"),
+            },
+        )
+
+    def status(self, job_id: str):
+        job = self.jobs.get(job_id)
+        return job.to_dict() if job else None
+
+    def result(self, job_id: str, timeout: float = None):
+        """
+        Return the job (with its result) once finished, waiting up to `timeout` seconds.
+        Returns None for unknown job ids.
+        """
+        job = self.jobs.get(job_id)
+        if job is None:
+            return None
+        job.wait(timeout)
+        return job.to_dict(include_result=job.done())
+
+    def cancel(self, job_id: str) -> bool:
+        return self.jobs.cancel(job_id)
+
+# Global planner service instance shared by the API.
+planner_service = PlannerService(
+    PLANNER_CONFIG["max_workers"],
+    timeout=PLANNER_CONFIG["timeout"],
+    memory_limit_mb=PLANNER_CONFIG["memory_limit_mb"],
+)
@@ -1,7 +1,9 @@
 # construct/project_management.py
 import datetime
-from sqlalchemy import update
-from construct.database import projects_table
+import hashlib
+from sqlalchemy import update, select, func
+from construct.database import projects_table, tasks_table
+from construct.db_writer import write
 from typing import Optional
 
 def try_parse_datetime(date_str: str) -> Optional[str]:
@@ -24,38 +26,64 @@ def try_parse_datetime(date_str: str) -> Optional[str]:
             pass
     raise ValueError(f"Could not parse date/time: {date_str}")
 
-def set_project_start_date(engine, schedule_id: str, user_date_str: str):
-    iso_date = try_parse_datetime(user_date_str)
+def next_data_version():
+    """Column expression that bumps projects.data_version in an UPDATE."""
+    return func.coalesce(projects_table.c.data_version, 0) + 1
+
+def _today() -> str:
+    return datetime.datetime.utcnow().strftime("%Y-%m-%d")
+
+def get_data_version(engine, schedule_id: str) -> str:
+    """
+    Opaque version of everything stored for a schedule, for use as an ETag.
+    Changes whenever any of its project rows is (re)written. The highest task row id is
+    part of it, so a deleted and recreated database does not reproduce old tags. Without
+    a status date the analysis is relative to today, so the current date is part of it too.
+    """
     with engine.connect() as conn:
-        conn.execute(
-            update(projects_table)
+        rows = conn.execute(
+            select(
+                projects_table.c.id, projects_table.c.schedule_type,
+                projects_table.c.data_version, projects_table.c.current_in_progress_date,
+            )
             .where(projects_table.c.schedule_id == schedule_id)
-            .where(projects_table.c.schedule_type == "target")
-            .values(project_start_date=iso_date)
-        )
-        conn.commit()
+            .order_by(projects_table.c.id)
+        ).fetchall()
+        max_task_id = conn.execute(
+            select(func.max(tasks_table.c.id)).where(tasks_table.c.schedule_id == schedule_id)
+        ).scalar()
+    parts = [str(engine.url), schedule_id, str(max_task_id or 0)]
+    parts += [f"{r.id}:{r.schedule_type}:{r.data_version or 0}" for r in rows]
+    if not any(r.current_in_progress_date for r in rows if r.schedule_type == "target"):
+        parts.append(_today())
+    return hashlib.sha1("|".join(parts).encode()).hexdigest()
+
+def set_project_start_date(engine, schedule_id: str, user_date_str: str):
+    iso_date = try_parse_datetime(user_date_str)
+    write(engine, lambda conn: conn.execute(
+        update(projects_table)
+        .where(projects_table.c.schedule_id == schedule_id)
+        .where(projects_table.c.schedule_type == "target")
+        .values(project_start_date=iso_date, data_version=next_data_version())
+    ))
     print(f"DEBUG: Project start date for {schedule_id} set to {iso_date}")
 
 def set_project_end_date(engine, schedule_id: str, user_date_str: str):
     iso_date = try_parse_datetime(user_date_str)
-    with engine.connect() as conn:
-        conn.execute(
-            update(projects_table)
-            .where(projects_table.c.schedule_id == schedule_id)
-            .where(projects_table.c.schedule_type == "target")
-            .values(project_end_date=iso_date)
-        )
-        conn.commit()
+    write(engine, lambda conn: conn.execute(
+        update(projects_table)
+        .where(projects_table.c.schedule_id == schedule_id)
+        .where(projects_table.c.schedule_type == "target")
+        .values(project_end_date=iso_date, data_version=next_data_version())
+    ))
     print(f"DEBUG: Project end date for {schedule_id} set to {iso_date}")
 
 def set_current_in_progress_date(engine, schedule_id: str, user_date_str: str):
     iso_date = try_parse_datetime(user_date_str)
-    with engine.connect() as conn:
-        conn.execute(
-            update(projects_table)
-            .where(projects_table.c.schedule_id == schedule_id)
-            .where(projects_table.c.schedule_type == "in-progress")
-            .values(current_in_progress_date=iso_date)
-        )
-        conn.commit()
+    write(engine, lambda conn: conn.execute(
+        update(projects_table)
+        .where(projects_table.c.schedule_id == schedule_id)
+        .where(projects_table.c.schedule_type == "in-progress")
+        .values(current_in_progress_date=iso_date, data_version=next_data_version())
+    ))
     print(f"DEBUG: Current in-progress date for {schedule_id} set to {iso_date}")
\ No newline at end of file
@@ -0,0 +1,186 @@
+# construct/registry.py
+"""
+Project registry: resolves project handles and schedule ids to database engines.
+
+Every .cproj written by create_project() is indexed by its path and by schedule_id, so
+requests can be routed to the right project DB without re-reading the handle. Engines
+are kept in an LRU cache; engines idle for longer than idle_seconds, or beyond
+max_engines, are disposed. Schedules without a project use the default DB.
+"""
+import glob
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import NamedTuple, Optional
+from construct.database import init_db, default_db_url, gen_folder
+
+REGISTRY_CONFIG = {
+    "roots": [p for p in os.environ.get("CONSTRUCT_PROJECT_ROOTS", gen_folder).split(os.pathsep) if p],
+    "max_engines": int(os.environ.get("CONSTRUCT_MAX_ENGINES", "32")),
+    "idle_seconds": float(os.environ.get("CONSTRUCT_ENGINE_IDLE_SECONDS", "600")),
+    "rescan_seconds": float(os.environ.get("CONSTRUCT_PROJECT_RESCAN_SECONDS", "30")),
+}
+
+class ProjectInfo(NamedTuple):
+    project_file: str
+    project_name: str
+    schedule_id: str
+    db_file: str
+    project_folder: str
+    created_at: str
+
+    @property
+    def db_url(self) -> str:
+        return f"sqlite:///{self.db_file}"
+
+class ProjectNotFound(Exception):
+    """Raised for a project handle that does not exist or is not a valid .cproj."""
+
+class ProjectRegistry:
+    def __init__(self, roots: list = None, max_engines: int = 32, idle_seconds: float = 600,
+                 rescan_seconds: float = 30):
+        self.roots = list(roots or [])
+        self.max_engines = max_engines
+        self.idle_seconds = idle_seconds
+        self.rescan_seconds = rescan_seconds
+        self._by_handle = {}
+        self._by_schedule = {}
+        self._engines = OrderedDict()  # db_url -> [engine, last_used, pinned]
+        self._open_hooks = []
+        self._last_scan = None
+        self._lock = threading.RLock()
+
+    # --- project index ---
+
+    def register(self, project_file: str) -> ProjectInfo:
+        """Read a .cproj once and index it; the newest project wins for a schedule_id."""
+        project_file = os.path.abspath(project_file)
+        try:
+            with open(project_file, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            raise ProjectNotFound(f"Could not open project handle: {e}")
+        if not data.get("db_file") or not data.get("project_folder"):
+            raise ProjectNotFound("Invalid project handle: missing db_file or project_folder")
+        info = ProjectInfo(
+            project_file=project_file,
+            project_name=data.get("project_name"),
+            schedule_id=data.get("schedule_id"),
+            db_file=os.path.abspath(data["db_file"]),
+            project_folder=data["project_folder"],
+            created_at=data.get("created_at") or "",
+        )
+        with self._lock:
+            self._by_handle[project_file] = info
+            current = self._by_schedule.get(info.schedule_id)
+            if current is None or info.created_at >= current.created_at:
+                self._by_schedule[info.schedule_id] = info
+        return info
+
+    def scan(self, roots: list = None) -> int:
+        """Index every .cproj below the given roots (default: the configured roots)."""
+        found = 0
+        for root in roots or self.roots:
+            for project_file in glob.glob(os.path.join(root, "**", "*.cproj"), recursive=True):
+                try:
+                    self.register(project_file)
+                    found += 1
+                except ProjectNotFound as e:
+                    print(f"debug: skipping {project_file}: {e}")
+        with self._lock:
+            self._last_scan = time.monotonic()
+        return found
+
+    def project_for_handle(self, project_handle: str) -> ProjectInfo:
+        project_file = os.path.abspath(project_handle)
+        with self._lock:
+            info = self._by_handle.get(project_file)
+        return info or self.register(project_file)
+
+    def project_for_schedule(self, schedule_id: str) -> Optional[ProjectInfo]:
+        with self._lock:
+            info = self._by_schedule.get(schedule_id)
+            stale = self._last_scan is None or time.monotonic() - self._last_scan > self.rescan_seconds
+        if info is None and stale:
+            # Unknown schedule: look for projects created by another process, at most
+            # once per rescan interval so misses do not turn into per-request globbing.
+            self.scan()
+            with self._lock:
+                info = self._by_schedule.get(schedule_id)
+        return info
+
+    # --- engines ---
+
+    def add_open_hook(self, hook):
+        """Call hook(engine) whenever a database is opened for the first time."""
+        if hook not in self._open_hooks:
+            self._open_hooks.append(hook)
+
+    def engine(self, db_url: str = None):
+        db_url = db_url or default_db_url()
+        with self._lock:
+            entry = self._engines.get(db_url)
+            if entry is not None:
+                entry[1] = time.monotonic()
+                self._engines.move_to_end(db_url)
+                self._evict()
+                return entry[0]
+            engine = init_db(db_url=db_url)
+            self._engines[db_url] = [engine, time.monotonic(), False]
+            self._evict()
+        for hook in self._open_hooks:
+            hook(engine)
+        return engine
+
+    def adopt(self, engine) -> str:
+        """Route a caller-owned engine's URL to that engine; it is never evicted."""
+        db_url = engine.url.render_as_string(hide_password=False)
+        with self._lock:
+            if db_url not in self._engines:
+                self._engines[db_url] = [engine, time.monotonic(), True]
+        return db_url
+
+    def _evict(self):
+        now = time.monotonic()
+        evictable = [url for url, (_, last_used, pinned) in self._engines.items() if not pinned]
+        over = len(self._engines) - self.max_engines
+        for url in evictable:  # oldest first
+            last_used = self._engines[url][1]
+            if over > 0 or now - last_used > self.idle_seconds:
+                engine = self._engines.pop(url)[0]
+                engine.dispose()
+                over -= 1
+
+    def evict_idle(self):
+        with self._lock:
+            self._evict()
+
+    # --- resolution ---
+
+    def resolve(self, project_handle: str = None, schedule_id: str = None):
+        """
+        (engine, project_folder) for a request: an explicit project handle wins, then
+        the project indexed for schedule_id, then the default DB (project_folder None).
+        """
+        if project_handle:
+            info = self.project_for_handle(project_handle)
+        elif schedule_id:
+            info = self.project_for_schedule(schedule_id)
+        else:
+            info = None
+        if info is None:
+            return self.engine(), None
+        return self.engine(info.db_url), info.project_folder
+
+    def engine_for_schedule(self, schedule_id: str):
+        return self.resolve(schedule_id=schedule_id)[0]
+
+# Global registry shared by the API, event handlers and LLM tools.
+project_registry = ProjectRegistry(
+    roots=REGISTRY_CONFIG["roots"],
+    max_engines=REGISTRY_CONFIG["max_engines"],
+    idle_seconds=REGISTRY_CONFIG["idle_seconds"],
+    rescan_seconds=REGISTRY_CONFIG["rescan_seconds"],
+)
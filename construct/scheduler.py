@@ -1,11 +1,328 @@
 # construct/scheduler.py
+import os
+import time
+import signal
 import subprocess
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from sqlalchemy import select, insert
+from construct.database import planner_portfolio_runs_table
+from construct.db_writer import write
+from construct.planner_cache import planner_cache, planner_cache_key
+from construct.plan_parser import PlanCollector, plan_makespan
+from construct.optimized_schedule import build_optimized_result, get_plan_origin
+from construct.heuristic_scheduler import run_heuristic
+from construct.metrics import metrics
+from construct.tracing import tracer
 
-def run_optic(domain_file: str, problem_file: str) -> str:
+# The planner binary; overridable so deployments can point at a wrapper script.
+OPTIC_CMD = os.environ.get("CONSTRUCT_OPTIC_CMD", "optic")
+
+# Planner processes allowed at once across the whole process: PlannerService jobs,
+# portfolio races and chunked runs all take a slot per OPTIC process, so the number of
+# planners (each with its own memory cap) never exceeds this, however jobs fan out.
+PLANNER_PROCESS_CONFIG = {
+    "max_processes": int(os.environ.get("CONSTRUCT_PLANNER_PROCESSES", str(os.cpu_count() or 1))),
+}
+planner_slots = threading.BoundedSemaphore(PLANNER_PROCESS_CONFIG["max_processes"])
+
+# Planner configurations raced by run_portfolio. Each entry may also override
+# "domain_file"/"problem_file" to race an alternative PDDL encoding of the same chunk.
+PLANNER_PORTFOLIO = [
+    {"name": "default", "args": []},
+    {"name": "first-plan", "args": ["-N"]},       # stop at the first plan, no anytime improvement
+    {"name": "best-first", "args": ["-E"]},       # skip enforced hill-climbing
+    {"name": "no-helpful-actions", "args": ["-h"]},
+]
+
+class PlannerTimeout(Exception):
+    """Raised when a planner run exceeds its time budget."""
+    def __init__(self, message: str, output: str = None):
+        super().__init__(message)
+        # Whatever the planner printed before it was killed (may hold complete plans).
+        self.output = output or ""
+
+def _memory_limiter(memory_limit_mb: int):
+    """
+    Build a preexec_fn that caps the child's address space.
+    Only available on POSIX; elsewhere the limit is ignored.
+    """
+    if not memory_limit_mb or os.name != "posix":
+        return None
+
+    def apply_limit():
+        import resource
+        limit = int(memory_limit_mb) * 1024 * 1024
+        resource.setrlimit(resource.RLIMIT_AS, (limit, limit))
+    return apply_limit
+
+def kill_planner(proc: subprocess.Popen):
+    """
+    Kill a planner process and everything it spawned.
+    OPTIC is usually launched through a wrapper (planutils/apptainer), so the
+    whole process group has to go, not just the direct child.
+    """
+    if proc.poll() is not None:
+        return
+    try:
+        if os.name == "posix":
+            os.killpg(proc.pid, signal.SIGKILL)
+        else:
+            proc.kill()
+    except (ProcessLookupError, PermissionError):
+        pass
+
+def _drain(stream, into: list):
+    for line in stream:
+        into.append(line)
+
+@tracer.traced("planner.run")
+def run_planner(domain_file: str, problem_file: str, args: list = None,
+              timeout: float = None, memory_limit_mb: int = None, on_start=None,
+              engine=None, use_cache: bool = True, on_line=None) -> str:
     """
     Calls the OPTIC planner with the given domain and problem files.
     Returns the stdout output from the planner.
+
+    - args: extra planner flags, placed before the domain/problem arguments.
+    - timeout: seconds before the planner is killed and PlannerTimeout is raised.
+    - memory_limit_mb: address-space cap for the planner process.
+    - on_start: optional callback receiving the Popen handle, so callers can cancel the run.
+    - engine: project DB; when given, cached plans are also stored there.
+    - use_cache: look up (and store) the output keyed by the domain/problem content and args.
+    - on_line: called with every stdout line (without the newline) as the planner prints
+      it, e.g. PlanCollector.feed to parse plans while the planner is still searching.
+      Cached output is replayed through it too.
     """
-    cmd = ["optic", "-d", domain_file, "-p", problem_file]
-    result = subprocess.run(cmd, capture_output=True, text=True, check=True)
-    return result.stdout
\ No newline at end of file
+    cache_key = None
+    if use_cache:
+        with open(domain_file, "r") as f:
+            domain_text = f.read()
+        with open(problem_file, "r") as f:
+            problem_text = f.read()
+        cache_key = planner_cache_key(domain_text, problem_text, args)
+        cached = planner_cache.get(cache_key, engine=engine)
+        if cached is not None:
+            if on_line:
+                for line in cached.splitlines():
+                    on_line(line)
+            return cached
+
+    cmd = [OPTIC_CMD, *(args or []), "-d", domain_file, "-p", problem_file]
+    started = time.monotonic()
+    if not planner_slots.acquire(timeout=timeout):
+        metrics.observe("construct_planner_seconds", time.monotonic() - started, outcome="timeout")
+        raise PlannerTimeout(f"No planner slot free within {timeout}s for {problem_file}")
+    try:
+        if timeout is not None:
+            timeout = max(timeout - (time.monotonic() - started), 0.0)
+        return _run_process(cmd, problem_file, started, timeout, memory_limit_mb, on_start, on_line,
+                            cache_key, args, engine)
+    finally:
+        planner_slots.release()
+
+def _run_process(cmd: list, problem_file: str, started: float, timeout: float, memory_limit_mb: int,
+                 on_start, on_line, cache_key, args: list, engine) -> str:
+    proc = subprocess.Popen(
+        cmd,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        preexec_fn=_memory_limiter(memory_limit_mb),
+        start_new_session=(os.name == "posix"),
+    )
+    if on_start:
+        on_start(proc)
+    # stdout is read here line by line; stderr is drained on the side so a chatty
+    # planner cannot block on a full pipe. The timer kills the process group, which
+    # closes stdout and ends the read loop.
+    stderr_lines = []
+    stderr_reader = threading.Thread(target=_drain, args=(proc.stderr, stderr_lines), daemon=True)
+    stderr_reader.start()
+    timed_out = threading.Event()
+
+    def expire():
+        timed_out.set()
+        kill_planner(proc)
+
+    timer = threading.Timer(timeout, expire) if timeout is not None else None
+    if timer is not None:
+        timer.daemon = True
+        timer.start()
+    lines = []
+    try:
+        for line in proc.stdout:
+            lines.append(line)
+            if on_line:
+                on_line(line.rstrip("\n"))
+        proc.wait()
+    finally:
+        if timer is not None:
+            timer.cancel()
+        if proc.poll() is None:
+            kill_planner(proc)
+            proc.wait()
+        stderr_reader.join()
+        proc.stdout.close()
+        proc.stderr.close()
+    stdout = "".join(lines)
+    if timed_out.is_set():
+        metrics.observe("construct_planner_seconds", time.monotonic() - started, outcome="timeout")
+        raise PlannerTimeout(f"Planner exceeded {timeout}s on {problem_file}", output=stdout)
+    outcome = "ok" if proc.returncode == 0 else "error"
+    metrics.observe("construct_planner_seconds", time.monotonic() - started, outcome=outcome)
+    if proc.returncode != 0:
+        raise subprocess.CalledProcessError(proc.returncode, cmd, output=stdout, stderr="".join(stderr_lines))
+    if cache_key is not None:
+        planner_cache.put(cache_key, stdout, args=args, engine=engine)
+    return stdout
+
+def run_optic(schedule_id: str, engine, mapping, output_dir: str = None, fallback: bool = True,
+              **planner_kwargs) -> dict:
+    """
+    Plan a schedule with OPTIC and write the result back as an "optimized" schedule.
+      - mapping: the pddl_mappings row (domain_file/problem_file) for the schedule.
+      - fallback: if OPTIC is not installed, times out, or there is no problem file,
+        schedule with the built-in heuristic instead of raising.
+      - planner_kwargs: forwarded to run_planner (args, timeout, memory_limit_mb, on_start, ...).
+    Returns a dict with status, planner, step count, makespan (days) and the exported
+    optimized_project_file.
+    """
+    domain_file = mapping.get("domain_file")
+    problem_file = mapping.get("problem_file")
+    if output_dir is None:
+        if domain_file:
+            output_dir = os.path.dirname(os.path.abspath(domain_file))
+        else:
+            output_dir = os.path.join("gen", f"schedule_{schedule_id}")
+    try:
+        if not (domain_file and problem_file):
+            raise FileNotFoundError(f"No domain/problem PDDL mapped for schedule {schedule_id}")
+        plan = PlanCollector()
+        run_planner(domain_file, problem_file, engine=engine, on_line=plan.feed, **planner_kwargs)
+    except (FileNotFoundError, PlannerTimeout) as e:
+        if not fallback:
+            raise
+        print(f"debug: falling back to heuristic scheduler for {schedule_id}: {e}")
+        result = run_heuristic(schedule_id, engine, output_dir)
+        result["fallback_reason"] = str(e)
+        return result
+    steps = plan.steps
+    if not steps:
+        return {"status": "no_plan", "schedule_id": schedule_id, "planner": "optic"}
+    origin = get_plan_origin(engine, schedule_id)
+    return build_optimized_result(engine, schedule_id, steps, origin, output_dir, planner="optic")
+
+def preferred_portfolio_config(engine, schedule_id: str):
+    """
+    The configuration that most recently won a portfolio race for this schedule, if any.
+    """
+    with engine.connect() as conn:
+        return conn.execute(
+            select(planner_portfolio_runs_table.c.config_name)
+            .where(planner_portfolio_runs_table.c.schedule_id == schedule_id)
+            .order_by(planner_portfolio_runs_table.c.id.desc())
+            .limit(1)
+        ).scalar()
+
+def _record_portfolio_winner(engine, schedule_id: str, config_name: str, makespan: float, elapsed: float):
+    write(engine, lambda conn: conn.execute(insert(planner_portfolio_runs_table), {
+        "schedule_id": schedule_id,
+        "config_name": config_name,
+        "makespan": makespan,
+        "elapsed_seconds": elapsed,
+        "created_at": datetime.now(timezone.utc).isoformat(),
+    }))
+
+def run_portfolio(schedule_id: str, engine, mapping, configs: list = None, deadline: float = None,
+                  mode: str = "first", max_parallel: int = None, output_dir: str = None,
+                  on_start=None, memory_limit_mb: int = None) -> dict:
+    """
+    Race several planner configurations on the same schedule.
+      - mode="first": return the first configuration that produces a plan; kill the rest.
+      - mode="best": let every configuration run until it finishes or the deadline
+        passes, then keep the plan with the smallest makespan. Runs cut off by the
+        deadline still contribute the last plan they printed.
+      - deadline: overall wall-clock budget in seconds.
+      - max_parallel: concurrent planner processes (defaults to the planner process
+        budget, which also bounds them together with every other planner run);
+        the configuration that won last time for this schedule is always launched first.
+    The winning configuration is recorded so later races prefer it.
+    Returns the same structured result as run_optic, plus the winning "config".
+    """
+    configs = list(configs or PLANNER_PORTFOLIO)
+    preferred = preferred_portfolio_config(engine, schedule_id)
+    configs.sort(key=lambda c: c["name"] != preferred)
+    max_parallel = max_parallel or PLANNER_PROCESS_CONFIG["max_processes"]
+    if output_dir is None:
+        output_dir = os.path.dirname(os.path.abspath(mapping["domain_file"]))
+
+    started = time.monotonic()
+    stop = threading.Event()
+    procs = []
+    procs_lock = threading.Lock()
+    candidates = []
+
+    def register(proc):
+        with procs_lock:
+            procs.append(proc)
+        if on_start:
+            on_start(proc)
+        if stop.is_set():
+            kill_planner(proc)
+
+    def attempt(config):
+        if stop.is_set():
+            return
+        remaining = None
+        if deadline is not None:
+            remaining = deadline - (time.monotonic() - started)
+            if remaining <= 0:
+                return
+        plan = PlanCollector()
+        try:
+            run_planner(
+                config.get("domain_file", mapping["domain_file"]),
+                config.get("problem_file", mapping["problem_file"]),
+                args=config.get("args"),
+                timeout=remaining,
+                memory_limit_mb=memory_limit_mb,
+                on_start=register,
+                engine=engine,
+                on_line=plan.feed,
+            )
+        except PlannerTimeout:
+            pass  # the collector holds the last plan printed before the deadline
+        except (subprocess.CalledProcessError, OSError) as e:
+            print(f"debug: portfolio config {config['name']} failed: {e}")
+            return
+        steps = plan.steps
+        if not steps:
+            return
+        with procs_lock:
+            candidates.append((plan_makespan(steps), time.monotonic() - started, config["name"], steps))
+        if mode == "first":
+            stop.set()
+            with procs_lock:
+                running = list(procs)
+            for proc in running:
+                kill_planner(proc)
+
+    with ThreadPoolExecutor(max_workers=max_parallel, thread_name_prefix="portfolio") as pool:
+        for config in configs:
+            pool.submit(attempt, config)
+
+    if not candidates:
+        return {"status": "no_plan", "schedule_id": schedule_id, "planner": "optic-portfolio"}
+    if mode == "first":
+        makespan, elapsed, winner, steps = min(candidates, key=lambda c: c[1])
+    else:
+        makespan, elapsed, winner, steps = min(candidates, key=lambda c: (c[0], c[1]))
+    _record_portfolio_winner(engine, schedule_id, winner, makespan, elapsed)
+    print(f"debug: portfolio winner for {schedule_id}: {winner} (makespan {makespan}, {elapsed:.1f}s)")
+
+    origin = get_plan_origin(engine, schedule_id)
+    result = build_optimized_result(engine, schedule_id, steps, origin, output_dir, planner="optic-portfolio")
+    result["config"] = winner
+    return result
@@ -0,0 +1,237 @@
+# construct/synthetic.py
+"""
+Seeded synthetic schedules for tests and benchmarks.
+
+generate_schedule() builds a target schedule, a matching in-progress schedule and
+finish-to-start dependencies, shaped like a P6 export: tasks grouped in a WBS tree,
+baseline dates that respect the dependencies, and progress drawn from a chosen
+distribution around the expected progress at the status date. The same arguments
+always give the same schedule.
+
+The result can be written as Excel or CSV workbooks that ingestion reads like real
+exports, or straight into a project database.
+"""
+import csv
+import os
+import random
+from datetime import datetime, timedelta
+from sqlalchemy import insert, delete, select, update
+from construct.database import projects_table, tasks_table, dependencies_table
+from construct.db_writer import write
+from construct.project_management import next_data_version
+
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+# Excel stops at 1,048,576 rows; larger schedules can only be written as CSV.
+EXCEL_MAX_ROWS = 1_048_575
+
+COLUMNS = [
+    "project_name", "wbs_value", "task_id", "parent_id", "task_name", "percent_done",
+    "start_date", "end_date", "duration", "bl_start", "bl_finish", "status", "predecessors",
+]
+
+PROGRESS_DISTRIBUTIONS = ("on_track", "behind", "ahead", "mixed")
+
+def _wbs_codes(n_tasks: int, depth: int) -> list:
+    """One WBS code per task: a tree `depth` levels deep whose leaves hold ~8 tasks each."""
+    leaves = max(1, n_tasks // 8)
+    branching = max(2, round(leaves ** (1.0 / max(depth, 1))))
+    codes = []
+    for i in range(n_tasks):
+        leaf = min(i * leaves // n_tasks, leaves - 1)
+        parts = []
+        for _ in range(depth):
+            parts.append(str(leaf % branching + 1))
+            leaf //= branching
+        codes.append("1." + ".".join(reversed(parts)))
+    return codes
+
+def _progress(expected: float, distribution: str, rng: random.Random) -> float:
+    if distribution == "mixed":
+        distribution = rng.choices(("on_track", "behind", "ahead"), (0.6, 0.3, 0.1))[0]
+    if distribution == "on_track":
+        actual = expected + rng.uniform(-2, 2) if 0 < expected < 100 else expected
+    elif distribution == "behind":
+        actual = expected * rng.uniform(0.3, 0.95)
+    else:
+        actual = expected + (100 - expected) * rng.uniform(0.05, 0.5)
+    return float(round(min(100.0, max(0.0, actual))))
+
+def generate_schedule(n_tasks: int, wbs_depth: int = 4, dependency_density: float = 1.5,
+                      progress: str = "mixed", seed: int = 0, start: str = "2024-01-01 07:00:00",
+                      status_fraction: float = 0.5, project_name: str = "Synthetic Project") -> dict:
+    """
+    A synthetic project of n_tasks tasks.
+
+    wbs_depth: levels in the WBS tree.
+    dependency_density: average predecessors per task, drawn from the preceding tasks.
+    progress: "on_track", "behind", "ahead" or "mixed" (60/30/10 of those).
+    status_fraction: where the status date falls between project start and finish.
+
+    Returns {"project_name", "status_date", "target": [row], "progress": [row],
+    "dependencies": [(task_id, depends_on_task_id)]}, rows keyed like COLUMNS.
+    """
+    if progress not in PROGRESS_DISTRIBUTIONS:
+        raise ValueError(f"Unknown progress distribution: {progress}")
+    rng = random.Random(seed)
+    project_start = datetime.strptime(start, DATE_FORMAT)
+    wbs = _wbs_codes(n_tasks, wbs_depth)
+    task_ids = [str(100000 + i) for i in range(n_tasks)]
+
+    # Predecessors come from a window of recent tasks, like trades following each other
+    # through an area; it keeps the graph a DAG and the critical path realistic.
+    window = 50
+    starts, finishes, durations, predecessors = [], [], [], []
+    dependencies = []
+    for i in range(n_tasks):
+        count = min(i, int(dependency_density) + (rng.random() < dependency_density % 1))
+        preds = rng.sample(range(max(0, i - window), i), count) if count else []
+        duration = rng.randint(1, 20)
+        if preds:
+            begin = max(finishes[p] for p in preds)
+        else:
+            begin = project_start + timedelta(days=rng.randint(0, 30))
+        finish = begin + timedelta(days=duration)
+        starts.append(begin)
+        finishes.append(finish)
+        durations.append(duration)
+        predecessors.append(preds)
+        dependencies.extend((task_ids[i], task_ids[p]) for p in preds)
+
+    project_finish = max(finishes) if finishes else project_start
+    status_date = project_start + (project_finish - project_start) * status_fraction
+
+    target, in_progress = [], []
+    for i in range(n_tasks):
+        begin, finish = starts[i], finishes[i]
+        if status_date <= begin:
+            expected = 0.0
+        elif status_date >= finish:
+            expected = 100.0
+        else:
+            expected = 100.0 * (status_date - begin) / (finish - begin)
+        actual = _progress(expected, progress, rng)
+        status = "Completed" if actual >= 100 else "In Progress" if actual > 0 else "Not Started"
+        row = {
+            "project_name": project_name,
+            "wbs_value": wbs[i],
+            "task_id": task_ids[i],
+            "parent_id": None,
+            "task_name": f"Task {wbs[i]}-{i}",
+            "percent_done": None,
+            "start_date": None,
+            "end_date": None,
+            "duration": float(durations[i]),
+            "bl_start": begin.strftime(DATE_FORMAT),
+            "bl_finish": finish.strftime(DATE_FORMAT),
+            "status": None,
+            "predecessors": ",".join(task_ids[p] for p in predecessors[i]) or None,
+        }
+        target.append(row)
+        slip = timedelta(days=rng.randint(0, 5)) if actual > 0 else None
+        in_progress.append({
+            **row,
+            "percent_done": actual,
+            "start_date": (begin + slip).strftime(DATE_FORMAT) if slip is not None else None,
+            # Actual finish once complete, forecast finish while in progress (as P6 exports it).
+            "end_date": (finish + slip).strftime(DATE_FORMAT) if slip is not None else None,
+            "status": status,
+        })
+    return {
+        "project_name": project_name,
+        "status_date": status_date.strftime(DATE_FORMAT),
+        "target": target,
+        "progress": in_progress,
+        "dependencies": dependencies,
+    }
+
+def write_excel(schedule: dict, folder: str, prefix: str = "synthetic") -> dict:
+    """Write target and in-progress workbooks; returns {"target": path, "in-progress": path}."""
+    import pandas as pd
+    if len(schedule["target"]) > EXCEL_MAX_ROWS:
+        raise ValueError(f"{len(schedule['target'])} tasks do not fit in an Excel sheet; use write_csv")
+    os.makedirs(folder, exist_ok=True)
+    paths = {}
+    for schedule_type, key in (("target", "target"), ("in-progress", "progress")):
+        path = os.path.join(folder, f"{prefix}_{key}.xlsx")
+        pd.DataFrame(schedule[key], columns=COLUMNS).to_excel(path, index=False)
+        paths[schedule_type] = path
+    return paths
+
+def write_csv(schedule: dict, folder: str, prefix: str = "synthetic") -> dict:
+    """Write target and in-progress CSV files; returns {"target": path, "in-progress": path}."""
+    os.makedirs(folder, exist_ok=True)
+    paths = {}
+    for schedule_type, key in (("target", "target"), ("in-progress", "progress")):
+        path = os.path.join(folder, f"{prefix}_{key}.csv")
+        with open(path, "w", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=COLUMNS)
+            writer.writeheader()
+            writer.writerows(schedule[key])
+        paths[schedule_type] = path
+    return paths
+
+def _dependency_rows(schedule: dict, schedule_id: str) -> list:
+    return [
+        {"schedule_id": schedule_id, "task_id": task_id, "depends_on_task_id": depends_on}
+        for task_id, depends_on in schedule["dependencies"]
+    ]
+
+def _replace_dependencies(conn, schedule_id: str, edges: list):
+    conn.execute(delete(dependencies_table).where(dependencies_table.c.schedule_id == schedule_id))
+    if edges:
+        conn.execute(insert(dependencies_table), edges)
+
+def _upsert_project(conn, schedule: dict, schedule_id: str, schedule_type: str):
+    values = {"project_name": schedule["project_name"], "current_in_progress_date": schedule["status_date"]}
+    existing = conn.execute(
+        select(projects_table.c.id)
+        .where(projects_table.c.schedule_id == schedule_id)
+        .where(projects_table.c.schedule_type == schedule_type)
+    ).fetchone()
+    if existing:
+        conn.execute(
+            update(projects_table)
+            .where(projects_table.c.id == existing.id)
+            .values(data_version=next_data_version(), **values)
+        )
+    else:
+        conn.execute(insert(projects_table), {
+            "schedule_id": schedule_id,
+            "schedule_type": schedule_type,
+            "created_at": datetime.utcnow().isoformat(),
+            "data_version": 1,
+            **values,
+        })
+
+def write_db(schedule: dict, engine, schedule_id: str) -> int:
+    """
+    Insert the schedule's projects rows, tasks and dependencies directly, bypassing file
+    parsing. Both projects rows carry the status date and get a new data_version.
+    Replaces any existing rows of schedule_id; returns the number of task rows written.
+    """
+    rows = []
+    for schedule_type, key in (("target", "target"), ("in-progress", "progress")):
+        for task in schedule[key]:
+            row = {c.name: task.get(c.name) for c in tasks_table.columns if c.name != "id"}
+            row["schedule_id"] = schedule_id
+            row["schedule_type"] = schedule_type
+            rows.append(row)
+    edges = _dependency_rows(schedule, schedule_id)
+
+    def _write(conn):
+        for schedule_type in ("target", "in-progress"):
+            _upsert_project(conn, schedule, schedule_id, schedule_type)
+        conn.execute(delete(tasks_table).where(tasks_table.c.schedule_id == schedule_id))
+        if rows:
+            conn.execute(insert(tasks_table), rows)
+        _replace_dependencies(conn, schedule_id, edges)
+        return len(rows)
+
+    return write(engine, _write)
+
+def write_dependencies(schedule: dict, engine, schedule_id: str) -> int:
+    """Insert only the dependency edges; ingestion does not read them from workbooks."""
+    edges = _dependency_rows(schedule, schedule_id)
+    write(engine, lambda conn: _replace_dependencies(conn, schedule_id, edges))
+    return len(edges)
@@ -0,0 +1,65 @@
+# construct/tokens.py
+"""
+Token estimates and per-model context budgets for LLM calls.
+
+Counts are exact when tiktoken is installed and fall back to ~4 characters per token
+otherwise, which is close enough for rate limiting and chunk sizing.
+"""
+import functools
+import os
+
+try:
+    import tiktoken
+except ImportError:
+    tiktoken = None
+
+# Context window per model, in tokens.
+MODEL_CONTEXT_TOKENS = {
+    "gpt-4": 8192,
+    "gpt-4-32k": 32768,
+    "gpt-4-1106-preview": 128000,
+    "gpt-3.5-turbo": 4096,
+    "gpt-3.5-turbo-16k": 16384,
+}
+DEFAULT_CONTEXT_TOKENS = 4096
+
+# Room left in every call for the instructions around a chunk and for the completion.
+PROMPT_OVERHEAD_TOKENS = 200
+COMPLETION_RESERVE_TOKENS = int(os.environ.get("CONSTRUCT_LLM_COMPLETION_TOKENS", "1024"))
+# Tokens per chat message for role and separators (OpenAI's documented overhead).
+MESSAGE_OVERHEAD_TOKENS = 4
+
+CHARS_PER_TOKEN = 4
+
+@functools.lru_cache(maxsize=None)
+def _encoding(model: str):
+    if tiktoken is None:
+        return None
+    try:
+        return tiktoken.encoding_for_model(model)
+    except KeyError:
+        return tiktoken.get_encoding("cl100k_base")
+
+def estimate_tokens(text: str, model: str = "gpt-4") -> int:
+    encoding = _encoding(model)
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+def estimate_message_tokens(messages: list, model: str = "gpt-4") -> int:
+    """Prompt tokens of a chat request (langchain messages)."""
+    return sum(estimate_tokens(m.content, model) + MESSAGE_OVERHEAD_TOKENS for m in messages) + 3
+
+def context_tokens(model: str) -> int:
+    return MODEL_CONTEXT_TOKENS.get(model, DEFAULT_CONTEXT_TOKENS)
+
+def chunk_token_budget(model: str) -> int:
+    """
+    How many tokens of context fit in one call to `model`, after the instructions and
+    the completion. CONSTRUCT_LLM_CHUNK_TOKENS caps it (e.g. to keep chunks small).
+    """
+    budget = context_tokens(model) - PROMPT_OVERHEAD_TOKENS - COMPLETION_RESERVE_TOKENS
+    cap = os.environ.get("CONSTRUCT_LLM_CHUNK_TOKENS")
+    if cap:
+        budget = min(budget, int(cap))
+    return max(budget, 1)
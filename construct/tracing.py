@@ -0,0 +1,451 @@
+# construct/tracing.py
+"""
+Request-scoped trace spans, exportable as Chrome trace or speedscope JSON.
+
+    with tracer.span("ingest.write", schedule_id=schedule_id):
+        ...
+
+    @tracer.traced("pddl.domain")
+    def generate_domain(...): ...
+
+The current trace and span live in context variables, so nested spans find their parent
+in threads and asyncio tasks alike. A span opened outside any trace starts a new one.
+The trace crosses the pipeline's hand-offs explicitly:
+
+    HTTP request  TraceRequests middleware; the id comes from an X-Trace-Id request
+                  header or is generated, and is returned in the X-Trace-Id response header
+    thread pools  executors.run_io, the DB writer and ingest jobs run their work in a
+                  copy of the submitter's context
+    events        inject() stores trace_id/parent_span_id in the event payload (and so in
+                  the outbox row); the dispatching worker continues the trace from there
+    processes     work sent to the CPU pool runs under run_traced(), which collects the
+                  worker's spans and hands them back with the result
+
+Finished spans are kept in memory per trace, the least recently used trace dropped
+beyond max_traces. GET /traces/{trace_id}?format=chrome opens in chrome://tracing or
+Perfetto, format=speedscope in https://www.speedscope.app.
+
+The sampling profiler is opt-in (CONSTRUCT_PROFILE_INTERVAL, in seconds): a thread that
+records the Python stack of every thread currently inside a span, filed under that
+span's trace and exported as sampled profiles in the speedscope format. Only threads of
+the server process are sampled. On the event loop thread, concurrent requests share one
+stack, so a sample is filed under the most recently opened span there.
+"""
+import contextvars
+import functools
+import itertools
+import os
+import random
+import sys
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+
+TRACING_CONFIG = {
+    "enabled": os.environ.get("CONSTRUCT_TRACING", "1") != "0",
+    "max_traces": int(os.environ.get("CONSTRUCT_TRACE_MAX", "200")),
+    "max_spans": int(os.environ.get("CONSTRUCT_TRACE_MAX_SPANS", "10000")),  # per trace
+    "profile_interval": float(os.environ.get("CONSTRUCT_PROFILE_INTERVAL", "0")),  # 0: profiler off
+    "max_samples": int(os.environ.get("CONSTRUCT_PROFILE_MAX_SAMPLES", "20000")),  # per trace
+}
+
+MAX_STACK_DEPTH = 128
+
+_trace_id = contextvars.ContextVar("construct_trace_id", default=None)
+_span_id = contextvars.ContextVar("construct_span_id", default=None)
+# Set by run_traced() in worker processes: finished spans go here instead of the store.
+_collector = contextvars.ContextVar("construct_span_collector", default=None)
+
+# Span ids count up from a random start per process: unique enough within a trace and
+# much cheaper than a uuid per span.
+_span_ids = itertools.count(random.getrandbits(60))
+
+def new_trace_id() -> str:
+    return os.urandom(16).hex()
+
+class _NoopSpan:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def set(self, **attrs):
+        pass
+
+_NOOP = _NoopSpan()
+
+class _Span:
+    __slots__ = ("tracer", "record", "started", "previous")
+
+    def __init__(self, tracer, name: str, attrs: dict):
+        self.tracer = tracer
+        self.record = {"name": name, "attrs": attrs}
+
+    def set(self, **attrs):
+        """Add attributes once they are known (row counts, outcome)."""
+        self.record["attrs"].update(attrs)
+
+    def __enter__(self):
+        trace_id = _trace_id.get() or new_trace_id()
+        span_id = f"{next(_span_ids):016x}"
+        thread = threading.current_thread()
+        self.record.update(
+            trace_id=trace_id, span_id=span_id, parent_id=_span_id.get(),
+            pid=os.getpid(), tid=thread.ident, thread=thread.name,
+        )
+        self.previous = (_trace_id.get(), _span_id.get())
+        _trace_id.set(trace_id)
+        _span_id.set(span_id)
+        self.tracer._entered(self.record)
+        self.record["start"] = time.time()
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.record["duration"] = time.perf_counter() - self.started
+        if exc_type is not None:
+            self.record["attrs"]["error"] = f"{exc_type.__name__}: {exc}"
+        # set() rather than reset(): a span may close in another context than it opened
+        # in (an async generator resumed by a different task).
+        _trace_id.set(self.previous[0])
+        _span_id.set(self.previous[1])
+        self.tracer._exited(self.record)
+        self.tracer._record(self.record)
+        return False
+
+class Tracer:
+    def __init__(self, enabled: bool = True, max_traces: int = 200, max_spans: int = 10000,
+                 max_samples: int = 20000):
+        self.enabled = enabled
+        self.max_traces = max_traces
+        self.max_spans = max_spans
+        self.max_samples = max_samples
+        self._traces = OrderedDict()  # trace_id -> {"spans": [...], "samples": [...], "dropped": n}
+        self._lock = threading.Lock()
+        self._active = {}  # thread id -> open span records, kept while the profiler runs
+        self._profiler = None
+
+    def span(self, name: str, **attrs):
+        """Context manager recording one span under the current trace (or a new one)."""
+        if not self.enabled:
+            return _NOOP
+        return _Span(self, name, attrs)
+
+    def traced(self, name: str = None, **attrs):
+        """Decorator form of span(); checks `enabled` on every call, not at import."""
+        def decorator(fn):
+            span_name = name or fn.__name__
+
+            @functools.wraps(fn)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return fn(*args, **kwargs)
+                with _Span(self, span_name, dict(attrs)):
+                    return fn(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def current_trace_id(self):
+        return _trace_id.get()
+
+    def context(self):
+        """{"trace_id", "span_id"} of the current span, to hand to other threads or processes."""
+        trace_id = _trace_id.get()
+        if not self.enabled or trace_id is None:
+            return None
+        return {"trace_id": trace_id, "span_id": _span_id.get()}
+
+    def inject(self, payload: dict) -> dict:
+        """Store the current trace in an event payload, unless it already carries one."""
+        context = self.context()
+        if context is not None and "trace_id" not in payload:
+            payload["trace_id"] = context["trace_id"]
+            payload["parent_span_id"] = context["span_id"]
+        return payload
+
+    @contextmanager
+    def continue_trace(self, trace_id: str = None, parent_span_id: str = None):
+        """Make trace_id current for the block (a new trace when None)."""
+        previous = (_trace_id.get(), _span_id.get())
+        _trace_id.set(trace_id or new_trace_id())
+        _span_id.set(parent_span_id)
+        try:
+            yield _trace_id.get()
+        finally:
+            _trace_id.set(previous[0])
+            _span_id.set(previous[1])
+
+    def _entered(self, record: dict):
+        if self._profiler is not None:
+            with self._lock:
+                self._active.setdefault(record["tid"], []).append(record)
+
+    def _exited(self, record: dict):
+        if self._profiler is not None or self._active:
+            with self._lock:
+                stack = self._active.get(record["tid"])
+                if stack and record in stack:
+                    stack.remove(record)
+                    if not stack:
+                        del self._active[record["tid"]]
+
+    def _entry(self, trace_id: str) -> dict:
+        # Caller holds the lock.
+        entry = self._traces.get(trace_id)
+        if entry is None:
+            entry = self._traces[trace_id] = {"spans": [], "samples": [], "dropped": 0}
+            while len(self._traces) > self.max_traces:
+                self._traces.popitem(last=False)
+        else:
+            self._traces.move_to_end(trace_id)
+        return entry
+
+    def _record(self, record: dict):
+        collector = _collector.get()
+        if collector is not None:
+            collector.append(record)
+            return
+        self.add_spans([record])
+
+    def add_spans(self, spans: list):
+        """File finished spans, e.g. the ones a worker process sent back."""
+        with self._lock:
+            for record in spans:
+                entry = self._entry(record["trace_id"])
+                if len(entry["spans"]) < self.max_spans:
+                    entry["spans"].append(record)
+                else:
+                    entry["dropped"] += 1
+
+    def _add_samples(self, samples: list):
+        with self._lock:
+            for trace_id, sample in samples:
+                entry = self._traces.get(trace_id)
+                if entry is None:
+                    # The trace's first span is still open; it is filed when that span ends.
+                    entry = self._entry(trace_id)
+                if len(entry["samples"]) < self.max_samples:
+                    entry["samples"].append(sample)
+
+    def _active_spans(self) -> list:
+        with self._lock:
+            return [(tid, stack[-1]) for tid, stack in self._active.items() if stack]
+
+    def get(self, trace_id: str):
+        """{"spans", "samples", "dropped"} of a trace (copies), or None if unknown."""
+        with self._lock:
+            entry = self._traces.get(trace_id)
+            if entry is None:
+                return None
+            return {"spans": list(entry["spans"]), "samples": list(entry["samples"]), "dropped": entry["dropped"]}
+
+    def traces(self) -> list:
+        """One summary per stored trace, most recent first."""
+        with self._lock:
+            entries = [(trace_id, list(entry["spans"])) for trace_id, entry in self._traces.items()]
+        summaries = []
+        for trace_id, spans in reversed(entries):
+            if not spans:
+                continue
+            start = min(s["start"] for s in spans)
+            end = max(s["start"] + s["duration"] for s in spans)
+            root = min(spans, key=lambda s: (s["parent_id"] is not None, s["start"]))
+            summaries.append({
+                "trace_id": trace_id,
+                "name": root["name"],
+                "started_at": start,
+                "duration_ms": round((end - start) * 1000, 3),
+                "spans": len(spans),
+            })
+        return summaries
+
+    def clear(self):
+        with self._lock:
+            self._traces.clear()
+
+    def start_profiler(self, interval: float):
+        """Start sampling the stacks of threads inside spans every `interval` seconds."""
+        with self._lock:
+            if self._profiler is not None:
+                return
+            self._profiler = SamplingProfiler(self, interval)
+        self._profiler.start()
+
+    def stop_profiler(self):
+        with self._lock:
+            profiler, self._profiler = self._profiler, None
+            self._active.clear()
+        if profiler is not None:
+            profiler.stop()
+
+class SamplingProfiler:
+    def __init__(self, tracer: Tracer, interval: float):
+        self.tracer = tracer
+        self.interval = interval
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._loop, name="trace-profiler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _loop(self):
+        while not self._stop.wait(self.interval):
+            active = self.tracer._active_spans()
+            if not active:
+                continue
+            frames = sys._current_frames()
+            now = time.time()
+            samples = []
+            for tid, record in active:
+                frame = frames.get(tid)
+                if frame is not None:
+                    samples.append((record["trace_id"], {
+                        "t": now, "pid": record["pid"], "tid": tid, "thread": record["thread"],
+                        "stack": _stack(frame), "weight": self.interval,
+                    }))
+            del frames
+            self.tracer._add_samples(samples)
+
+def _stack(frame) -> list:
+    """(function, file, line) from the outermost frame to `frame`."""
+    stack = []
+    while frame is not None and len(stack) < MAX_STACK_DEPTH:
+        code = frame.f_code
+        stack.append((code.co_name, code.co_filename, frame.f_lineno))
+        frame = frame.f_back
+    stack.reverse()
+    return stack
+
+def run_traced(context: dict, fn, args: tuple, kwargs: dict):
+    """
+    Run fn(*args, **kwargs) under the caller's trace in a pool worker; returns
+    (result, spans recorded during the call) for the caller to add_spans(). Module-level
+    so it can be sent to the process pool.
+    """
+    spans = []
+    previous = (_collector.get(), _trace_id.get(), _span_id.get())
+    _collector.set(spans)
+    _trace_id.set(context["trace_id"])
+    _span_id.set(context["span_id"])
+    try:
+        with tracer.span(f"worker.{fn.__name__}"):
+            result = fn(*args, **kwargs)
+    finally:
+        _collector.set(previous[0])
+        _trace_id.set(previous[1])
+        _span_id.set(previous[2])
+    return result, spans
+
+def chrome_trace(trace: dict, trace_id: str = None) -> dict:
+    """A trace as Chrome Trace Event JSON: one complete ("X") event per span."""
+    events = []
+    threads = {}
+    for s in trace["spans"]:
+        threads[(s["pid"], s["tid"])] = s["thread"]
+        events.append({
+            "name": s["name"],
+            "cat": "construct",
+            "ph": "X",
+            "ts": s["start"] * 1e6,
+            "dur": s["duration"] * 1e6,
+            "pid": s["pid"],
+            "tid": s["tid"],
+            "args": {**s["attrs"], "span_id": s["span_id"], "parent_id": s["parent_id"]},
+        })
+    for (pid, tid), name in threads.items():
+        events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": name}})
+    return {
+        "traceEvents": events,
+        "displayTimeUnit": "ms",
+        "otherData": {"trace_id": trace_id, "dropped_spans": trace["dropped"]},
+    }
+
+def speedscope(trace: dict, trace_id: str = None) -> dict:
+    """
+    A trace in the speedscope file format: an evented profile of spans per thread, and
+    a sampled profile per thread when the profiler ran. Times are milliseconds from the
+    first span. speedscope needs spans on a thread to nest, so a span overlapping the end
+    of its enclosing one is cut at that end.
+    """
+    frames = []
+    frame_index = {}
+
+    def frame(name, file=None, line=None):
+        key = (name, file, line)
+        if key not in frame_index:
+            frame_index[key] = len(frames)
+            entry = {"name": name}
+            if file is not None:
+                entry.update(file=file, line=line)
+            frames.append(entry)
+        return frame_index[key]
+
+    spans, samples = trace["spans"], trace["samples"]
+    origin = min([s["start"] for s in spans] + [s["t"] for s in samples] or [0.0])
+    lanes = {}
+    for s in spans:
+        lanes.setdefault((s["pid"], s["tid"], s["thread"]), []).append(s)
+
+    profiles = []
+    for (pid, tid, thread), lane in sorted(lanes.items(), key=lambda item: min(s["start"] for s in item[1])):
+        events, stack = [], []  # stack: (frame, end) of open spans
+        for s in sorted(lane, key=lambda s: (s["start"], -s["duration"])):
+            start = (s["start"] - origin) * 1000
+            end = start + s["duration"] * 1000
+            while stack and stack[-1][1] <= start:
+                closed, at = stack.pop()
+                events.append({"type": "C", "frame": closed, "at": at})
+            if stack:
+                end = min(end, stack[-1][1])
+            opened = frame(s["name"])
+            events.append({"type": "O", "frame": opened, "at": start})
+            stack.append((opened, end))
+        while stack:
+            closed, at = stack.pop()
+            events.append({"type": "C", "frame": closed, "at": at})
+        profiles.append({
+            "type": "evented",
+            "name": f"{thread} (pid {pid})",
+            "unit": "milliseconds",
+            "startValue": events[0]["at"],
+            "endValue": max(e["at"] for e in events),
+            "events": events,
+        })
+
+    by_thread = {}
+    for sample in samples:
+        by_thread.setdefault((sample["pid"], sample["tid"], sample["thread"]), []).append(sample)
+    for (pid, tid, thread), thread_samples in by_thread.items():
+        thread_samples.sort(key=lambda sample: sample["t"])
+        profiles.append({
+            "type": "sampled",
+            "name": f"samples: {thread} (pid {pid})",
+            "unit": "milliseconds",
+            "startValue": (thread_samples[0]["t"] - origin) * 1000,
+            "endValue": (thread_samples[-1]["t"] - origin) * 1000 + thread_samples[-1]["weight"] * 1000,
+            "samples": [[frame(*entry) for entry in sample["stack"]] for sample in thread_samples],
+            "weights": [sample["weight"] * 1000 for sample in thread_samples],
+        })
+
+    return {
+        "$schema": "https://www.speedscope.app/file-format-schema.json",
+        "name": f"trace {trace_id}" if trace_id else "trace",
+        "exporter": "construct",
+        "activeProfileIndex": 0,
+        "shared": {"frames": frames},
+        "profiles": profiles,
+    }
+
+# Global tracer shared by the whole process.
+tracer = Tracer(
+    enabled=TRACING_CONFIG["enabled"],
+    max_traces=TRACING_CONFIG["max_traces"],
+    max_spans=TRACING_CONFIG["max_spans"],
+    max_samples=TRACING_CONFIG["max_samples"],
+)
@@ -3,7 +3,18 @@ import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy import create_engine
 from construct.api import app  # your FastAPI app
-from construct.database import metadata
+from construct.database import metadata, gen_folder
+
+SAMPLE_WORKBOOKS = (("test_1.xlsx", "target"), ("test_1_progress_1.xlsx", "in-progress"))
+
+@pytest.fixture(scope="session", autouse=True)
+def gen_dir(tmp_path_factory):
+    # Run the session from a scratch directory: the default DB (gen/construct.db), the
+    # PDDL files and the planner cache all live under the relative gen folder.
+    work_dir = tmp_path_factory.mktemp("work")
+    with pytest.MonkeyPatch.context() as mp:
+        mp.chdir(work_dir)
+        yield work_dir / gen_folder
 
 @pytest.fixture(scope="session")
 def resources_dir():
@@ -27,4 +38,17 @@ def engine(db_url):
 @pytest.fixture(scope="session")
 def client():
     with TestClient(app) as c:
-        yield c
\ No newline at end of file
+        yield c
+
+@pytest.fixture
+def ingest_samples(client, resources_dir):
+    """Ingest the sample target and in-progress workbooks into the default DB."""
+    def ingest(schedule_id):
+        for name, schedule_type in SAMPLE_WORKBOOKS:
+            response = client.post("/ingest-schedule/", params={
+                "file_path": os.path.join(resources_dir, name),
+                "schedule_id": schedule_id,
+                "schedule_type": schedule_type,
+            })
+            assert response.status_code == 200, response.text
+    return ingest
@@ -0,0 +1,155 @@
+"""
+Mixed-traffic load test for the API.
+
+Starts the app under uvicorn on a free port, seeds a target and an in-progress schedule,
+then drives a weighted mix of requests from concurrent clients and reports throughput
+per second and latency percentiles per endpoint. LLM calls are replaced by a fixed
+delay (--llm-latency) so the run does not need an API key.
+
+    python tests/loadtest.py --duration 30 --concurrency 32
+
+Not collected by pytest (no test_ prefix); run it by hand.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from collections import defaultdict
+
+import httpx
+import uvicorn
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESOURCES = os.path.join(ROOT, "resources")
+SCHEDULE_ID = "LOAD001"
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+def _fake_llm(latency: float):
+    from construct import llm_agent
+
+    async def fake_acall_llm(system: str, user: str, engine=None) -> str:
+        await asyncio.sleep(latency)
+        if "JSON" in user:
+            return json.dumps([
+                {"action": "analyze_progress", "description": "compare"},
+                {"action": "finalize", "description": "answer"},
+            ])
+        return "ok"
+
+    llm_agent._acall_llm = fake_acall_llm
+
+def _start_server(port: int):
+    from construct.api import app
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        time.sleep(0.05)
+    return server, thread
+
+def _requests():
+    progress_file = os.path.join(RESOURCES, "test_1_progress_1.xlsx")
+    return [
+        # (name, weight, method, path, params)
+        ("compare", 60, "GET", f"/compare-schedules/{SCHEDULE_ID}", None),
+        ("event-metrics", 20, "GET", "/events/metrics", None),
+        ("ingest", 10, "POST", "/ingest-schedule/",
+         {"file_path": progress_file, "schedule_id": SCHEDULE_ID, "schedule_type": "in-progress"}),
+        ("agent", 10, "POST", "/agent-analyze/", {"schedule_id": SCHEDULE_ID, "prompt": "What is late?"}),
+    ]
+
+async def _client(client, mix, deadline, latencies, completions, errors):
+    names = [m[0] for m in mix]
+    weights = [m[1] for m in mix]
+    by_name = {m[0]: m for m in mix}
+    while time.monotonic() < deadline:
+        name, _, method, path, params = by_name[random.choices(names, weights)[0]]
+        started = time.monotonic()
+        try:
+            response = await client.request(method, path, params=params)
+            ok = response.status_code == 200
+        except httpx.HTTPError:
+            ok = False
+        finished = time.monotonic()
+        if ok:
+            latencies[name].append(finished - started)
+            completions.append(finished)
+        else:
+            errors[name] += 1
+
+def _percentile(values, q):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+async def run(base_url: str, duration: float, concurrency: int):
+    async with httpx.AsyncClient(base_url=base_url, timeout=120) as client:
+        for schedule_type, name in (("target", "test_1.xlsx"), ("in-progress", "test_1_progress_1.xlsx")):
+            response = await client.post("/ingest-schedule/", params={
+                "file_path": os.path.join(RESOURCES, name), "schedule_id": SCHEDULE_ID, "schedule_type": schedule_type,
+            })
+            response.raise_for_status()
+
+        mix = _requests()
+        latencies = defaultdict(list)
+        errors = defaultdict(int)
+        completions = []
+        started = time.monotonic()
+        deadline = started + duration
+        await asyncio.gather(*(
+            _client(client, mix, deadline, latencies, completions, errors) for _ in range(concurrency)
+        ))
+        elapsed = time.monotonic() - started
+
+    per_second = defaultdict(int)
+    for t in completions:
+        per_second[int(t - started)] += 1
+    seconds = [per_second[s] for s in range(int(duration))]
+    print(f"\n{len(completions)} requests in {elapsed:.1f}s with {concurrency} clients "
+          f"({len(completions) / elapsed:.1f} req/s)")
+    if seconds:
+        print(f"throughput per second: min {min(seconds)}  median {statistics.median(seconds)}  max {max(seconds)}")
+    print(f"{'endpoint':<15}{'count':>8}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name, *_ in mix:
+        values = latencies[name]
+        print(f"{name:<15}{len(values):>8}{errors[name]:>8}"
+              f"{_percentile(values, 0.5) * 1000:>10.1f}{_percentile(values, 0.95) * 1000:>10.1f}"
+              f"{_percentile(values, 0.99) * 1000:>10.1f}")
+    return sum(errors.values())
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--duration", type=float, default=30.0)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="seconds per faked LLM call")
+    args = parser.parse_args(argv)
+
+    # Keep the default database and generated files out of the working tree.
+    workdir = tempfile.mkdtemp(prefix="construct_load_")
+    os.chdir(workdir)
+    sys.path.insert(0, ROOT)
+    _fake_llm(args.llm_latency)
+    port = _free_port()
+    server, thread = _start_server(port)
+    try:
+        failures = asyncio.run(run(f"http://127.0.0.1:{port}", args.duration, args.concurrency))
+    finally:
+        server.should_exit = True
+        thread.join()
+    print(f"workdir: {workdir}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
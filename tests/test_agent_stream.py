@@ -0,0 +1,71 @@
+import json
+import time
+
+from sqlalchemy import select
+
+from construct import llm_agent
+from construct.database import analysis_history_table
+from construct.registry import project_registry
+
+SCHEDULE_ID = "STREAM001"
+
+class FakeStreamingChat:
+    def __init__(self, **kwargs):
+        pass
+
+    async def astream(self, messages):
+        for word in ("Two ", "tasks ", "are ", "late."):
+            yield type("Chunk", (), {"content": word})()
+
+def _events(response):
+    events = []
+    for block in response.text.strip().split("\n\n"):
+        name, data = block.split("\n", 1)
+        events.append((name[len("event: "):], json.loads(data[len("data: "):])))
+    return events
+
+def test_agent_stream_emits_steps_tokens_and_stores_analysis(client, ingest_samples, monkeypatch):
+    ingest_samples(SCHEDULE_ID)
+
+    async def fake_plan(user_query, engine=None):
+        return [{"action": "status_counts"}, {"action": "finalize", "description": user_query}]
+
+    monkeypatch.setattr(llm_agent, "agenerate_plan", fake_plan)
+    monkeypatch.setattr(llm_agent, "ChatOpenAI", FakeStreamingChat)
+    monkeypatch.setattr(llm_agent, "_clients", {})
+    # Answer from the fake model, not from a cached answer.
+    monkeypatch.setattr(llm_agent.llm_cache, "enabled", False)
+    response = client.get("/agent-analyze/stream", params={"schedule_id": SCHEDULE_ID, "prompt": "What is late?"},
+                          headers={"Accept": "text/event-stream", "Accept-Encoding": "gzip"})
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/event-stream")
+    assert "content-encoding" not in response.headers
+
+    events = _events(response)
+    names = [name for name, _ in events]
+    assert names[:2] == ["status", "plan"]
+    assert names[2:5] == ["step", "result", "step"]
+    assert names.count("token") == 4
+    assert names[-2:] == ["result", "done"]
+    final = "finalize result:\nTwo tasks are late."
+    assert events[-1][1]["analysis"] == final
+
+    engine = project_registry.engine_for_schedule(SCHEDULE_ID)
+    deadline = time.monotonic() + 5
+    stored = []
+    while not stored and time.monotonic() < deadline:
+        with engine.connect() as conn:
+            stored = conn.execute(
+                select(analysis_history_table.c.analysis_text)
+                .where(analysis_history_table.c.schedule_id == SCHEDULE_ID)
+            ).fetchall()
+        time.sleep(0.05)
+    assert stored[-1][0] == final
+
+def test_agent_stream_reports_errors(client, monkeypatch):
+    async def failing_plan(user_query, engine=None):
+        raise RuntimeError("planner unavailable")
+
+    monkeypatch.setattr(llm_agent, "agenerate_plan", failing_plan)
+    response = client.get("/agent-analyze/stream", params={"schedule_id": "NOPE", "prompt": "?"})
+    assert _events(response)[-1] == ("error", {"event": "error", "detail": "planner unavailable"})
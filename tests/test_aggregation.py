@@ -0,0 +1,50 @@
+from construct import llm_agent
+from construct.agent import ConstructionAgent
+from construct.registry import project_registry
+
+SCHEDULE_ID = "AGG001"
+
+def test_aggregates_agree_with_full_analysis(ingest_samples):
+    ingest_samples(SCHEDULE_ID)
+    agent = ConstructionAgent(project_registry.engine_for_schedule(SCHEDULE_ID))
+    insights = agent.analyze_progress(SCHEDULE_ID)["insights"]
+    behind = sum("behind schedule" in i for i in insights)
+
+    top = agent.top_variances(SCHEDULE_ID, k=3)
+    assert top["behind"] == behind
+    assert len(top["tasks"]) == min(3, behind)
+    variances = [t["variance"] for t in top["tasks"]]
+    assert variances == sorted(variances)
+
+    rollup = agent.wbs_rollup(SCHEDULE_ID)["wbs"]
+    assert sum(g["behind"] for g in rollup) == behind
+
+    counts = agent.status_counts(SCHEDULE_ID)
+    assert counts["behind"] == behind
+    assert counts["behind"] + counts["ahead"] + counts["on_track"] == sum(counts["by_status"].values())
+
+    assert agent.top_variances("NOPE") == {"error": "Target or in-progress schedule not found"}
+
+def test_plan_uses_bounded_tools(ingest_samples, monkeypatch):
+    ingest_samples(SCHEDULE_ID)
+    prompts = []
+
+    async def fake_llm(system, user, engine=None):
+        prompts.append(user)
+        return "answer"
+
+    monkeypatch.setattr(llm_agent, "_acall_llm", fake_llm)
+    monkeypatch.setitem(llm_agent.AGGREGATE_CONFIG, "max_rows", 2)
+    plan = [
+        {"action": "status_counts"},
+        {"action": "top_variances", "k": "50"},
+        {"action": "wbs_rollup"},
+        {"action": "finalize", "description": "What is late?"},
+    ]
+    assert llm_agent.execute_plan(SCHEDULE_ID, plan) == "finalize result:\nanswer"
+    context = prompts[-1]
+    assert "Tasks by status:" in context
+    # top_variances is capped at max_rows rows whatever k the planner asked for.
+    top_section = context.split("top_variances result:\n")[1].split("wbs_rollup result:")[0]
+    rows = [line for line in top_section.splitlines()[3:] if line.count(" | ") == 5]
+    assert len(rows) == 2
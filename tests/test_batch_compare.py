@@ -0,0 +1,24 @@
+SCHEDULE_ID = "BATCH001"
+
+def test_batch_compare_matches_single_compare(client, ingest_samples, tmp_path):
+    ingest_samples(SCHEDULE_ID)
+
+    single = client.get(f"/compare-schedules/{SCHEDULE_ID}").json()["analysis"]["insights"]
+    response = client.post("/compare-schedules/batch", json={"schedules": [
+        {"schedule_id": SCHEDULE_ID},
+        {"schedule_id": "NOPE"},
+        {"schedule_id": SCHEDULE_ID, "project_handle": str(tmp_path / "missing.cproj")},
+    ]})
+    assert response.status_code == 200, response.text
+    data = response.json()
+    assert data["databases"] == 1
+    summary, missing, bad_handle = data["results"]
+
+    assert summary["schedule_id"] == SCHEDULE_ID
+    assert summary["behind"] == sum("behind schedule" in i for i in single)
+    assert summary["ahead"] == sum("ahead of schedule" in i for i in single)
+    assert summary["behind"] + summary["ahead"] + summary["on_track"] == summary["tasks_compared"]
+    if summary["behind"]:
+        assert summary["worst_variance"]["variance"] < 0
+    assert missing["error"] == "Target or in-progress schedule not found"
+    assert "Could not open project handle" in bad_handle["error"]
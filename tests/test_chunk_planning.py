@@ -0,0 +1,86 @@
+import os
+from sqlalchemy import select, insert
+
+from construct import scheduler
+from construct.database import tasks_table, pddl_mappings_table
+from construct.chunk_planning import run_chunked, stitch_chunk_plans
+from construct.plan_parser import PlanStep
+
+def test_stitch_chunk_plans_offsets_by_predecessor_makespan():
+    results = [
+        {"chunk": "chunk_1", "planner": "optic", "steps": [PlanStep("C", 0.0, 4.0)], "makespan": 4.0},
+        {"chunk": "chunk_0", "planner": "optic", "steps": [PlanStep("A", 0.0, 2.0), PlanStep("B", 1.0, 2.0)], "makespan": 3.0},
+        {"chunk": "chunk_2", "planner": "heuristic", "steps": [PlanStep("D", 0.5, 1.0)], "makespan": 1.5},
+    ]
+    steps, summary = stitch_chunk_plans(results)
+    assert steps == [
+        PlanStep("A", 0.0, 2.0),
+        PlanStep("B", 1.0, 2.0),
+        PlanStep("C", 3.0, 4.0),
+        PlanStep("D", 7.5, 1.0),
+    ]
+    assert [c["offset"] for c in summary] == [0.0, 3.0, 7.0]
+
+def test_run_chunked_plans_every_chunk(engine, tmp_path, monkeypatch):
+    monkeypatch.setattr(scheduler, "OPTIC_CMD", "/nonexistent/optic")
+    with engine.begin() as conn:
+        conn.execute(insert(tasks_table), [
+            {"schedule_id": "CHUNK001", "schedule_type": "target", "task_id": "T1", "duration": 3.0,
+             "bl_start": "2024-01-01 08:00:00", "bl_finish": "2024-01-04 08:00:00"},
+            {"schedule_id": "CHUNK001", "schedule_type": "target", "task_id": "T2", "duration": 2.0,
+             "bl_start": "2024-02-10 08:00:00", "bl_finish": "2024-02-12 08:00:00"},
+        ])
+    result = run_chunked("CHUNK001", engine, chunk_length_days=28, output_dir=str(tmp_path))
+    assert result["status"] == "success"
+    assert [c["chunk"] for c in result["chunks"]] == ["chunk_0", "chunk_1"]
+    assert result["chunks"][1]["offset"] == 3.0
+    assert result["makespan"] == 5.0
+    assert os.path.isfile(result["optimized_project_file"])
+
+    with engine.connect() as conn:
+        chunks = conn.execute(
+            select(pddl_mappings_table.c.chunk)
+            .where(pddl_mappings_table.c.schedule_id == "CHUNK001")
+        ).scalars().all()
+    assert sorted(chunks) == ["chunk_0", "chunk_1"]
+
+def test_run_chunked_plans_each_task_once(engine, tmp_path, monkeypatch):
+    monkeypatch.setattr(scheduler, "OPTIC_CMD", "/nonexistent/optic")
+    with engine.begin() as conn:
+        conn.execute(insert(tasks_table), [
+            {"schedule_id": "CHUNK002", "schedule_type": "target", "task_id": "T1", "duration": 3.0,
+             "bl_start": "2024-01-01 08:00:00", "bl_finish": "2024-01-04 08:00:00"},
+            {"schedule_id": "CHUNK002", "schedule_type": "target", "task_id": "T2", "duration": 2.0,
+             "bl_start": "2024-02-10 08:00:00", "bl_finish": "2024-02-12 08:00:00"},
+            # T1's progress row falls into T2's chunk by its dates.
+            {"schedule_id": "CHUNK002", "schedule_type": "in-progress", "task_id": "T1", "duration": 3.0,
+             "bl_start": "2024-02-09 08:00:00", "bl_finish": "2024-02-12 08:00:00"},
+        ])
+    result = run_chunked("CHUNK002", engine, chunk_length_days=28, output_dir=str(tmp_path))
+    assert result["status"] == "success"
+    with engine.connect() as conn:
+        task_ids = conn.execute(
+            select(tasks_table.c.task_id)
+            .where(tasks_table.c.schedule_id == "CHUNK002")
+            .where(tasks_table.c.schedule_type == "optimized")
+        ).scalars().all()
+    assert sorted(task_ids) == ["T1", "T2"]
+
+def test_run_scheduler_plans_the_whole_schedule_mapping(client, monkeypatch):
+    from construct import api
+    engine, _ = api.resolve_project(None, "CHUNKMAP001")
+    with engine.begin() as conn:
+        conn.execute(insert(pddl_mappings_table), [
+            {"schedule_id": "CHUNKMAP001", "chunk": "chunk_0", "domain_file": "d.pddl", "problem_file": "problem_chunk_0.pddl"},
+            {"schedule_id": "CHUNKMAP001", "chunk": None, "domain_file": "d.pddl", "problem_file": "problem_chunk_3.pddl"},
+        ])
+    submitted = []
+
+    class Job:
+        job_id = "job"
+
+    monkeypatch.setattr(api.planner_service, "submit", lambda schedule_id, engine, mapping, **kw: submitted.append(dict(mapping)) or Job())
+    response = client.post("/run-scheduler/", params={"schedule_id": "CHUNKMAP001"})
+    assert response.status_code == 200, response.text
+    assert submitted[0]["chunk"] is None
+    assert submitted[0]["problem_file"] == "problem_chunk_3.pddl"
@@ -0,0 +1,56 @@
+from construct.database import init_db
+from construct.project_management import set_project_start_date
+
+SCHEDULE_ID = "ETAG001"
+
+def test_compare_schedules_etag_and_compression(client, ingest_samples):
+    ingest_samples(SCHEDULE_ID)
+    url = f"/compare-schedules/{SCHEDULE_ID}"
+
+    first = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert first.status_code == 200
+    assert first.headers["content-encoding"] in ("gzip", "br")
+    etag = first.headers["etag"]
+
+    cached = client.get(url, headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+    assert cached.headers["etag"] == etag
+
+    # A status-date change is a new version of the schedule.
+    set_project_start_date(init_db(), SCHEDULE_ID, "2020-01-27")
+    changed = client.get(url, headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert changed.headers["etag"] != etag
+    assert changed.json()["schedule_id"] == SCHEDULE_ID
+
+def test_etag_changes_when_the_date_rolls_over(client, ingest_samples, monkeypatch):
+    from construct import project_management
+    ingest_samples("ETAG002")
+    url = "/compare-schedules/ETAG002"
+    monkeypatch.setattr(project_management, "_today", lambda: "2024-05-01")
+    etag = client.get(url).headers["etag"]
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+    # No status date: the analysis is relative to today, so tomorrow is a new version.
+    monkeypatch.setattr(project_management, "_today", lambda: "2024-05-02")
+    rolled = client.get(url, headers={"If-None-Match": etag})
+    assert rolled.status_code == 200
+    assert rolled.headers["etag"] != etag
+
+def test_recreated_database_does_not_reuse_etags(tmp_path):
+    from sqlalchemy import insert
+    from construct.database import projects_table, tasks_table
+    from construct.project_management import get_data_version
+
+    def build(n_tasks):
+        engine = init_db(f"sqlite:///{tmp_path / 'recreated.db'}")
+        with engine.begin() as conn:
+            conn.execute(insert(projects_table), {"schedule_id": "S", "schedule_type": "target", "data_version": 1})
+            conn.execute(insert(tasks_table), [{"schedule_id": "S", "task_id": str(i)} for i in range(n_tasks)])
+        version = get_data_version(engine, "S")
+        engine.dispose()
+        (tmp_path / "recreated.db").unlink()
+        return version
+
+    assert build(3) != build(5)
@@ -0,0 +1,81 @@
+import threading
+from sqlalchemy import create_engine, insert, select, func, text
+
+from construct.database import metadata, analysis_history_table, tasks_table, pddl_mappings_table, init_db, add_missing_columns
+from construct.db_writer import DatabaseWriter, _writers
+from construct.pddl_generation import generate_domain_for_target
+
+def test_concurrent_writes_are_serialized_and_batched(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'w.db'}")
+    metadata.create_all(engine)
+    writer = DatabaseWriter(engine, max_batch=16)
+
+    def add(i):
+        writer.write(lambda conn: conn.execute(
+            insert(analysis_history_table), {"schedule_id": "S", "analysis_text": str(i), "timestamp": ""}
+        ))
+
+    threads = [threading.Thread(target=add, args=(i,)) for i in range(40)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    with engine.connect() as conn:
+        assert conn.execute(select(func.count()).select_from(analysis_history_table)).scalar() == 40
+
+def test_failing_job_does_not_fail_its_batch(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'w.db'}")
+    metadata.create_all(engine)
+    writer = DatabaseWriter(engine)
+    release = threading.Event()
+    # Hold the writer so the next two jobs are committed as one batch.
+    blocker = writer.submit(lambda conn: release.wait(5))
+    good = writer.submit(lambda conn: conn.execute(
+        insert(analysis_history_table), {"schedule_id": "S", "analysis_text": "ok", "timestamp": ""}
+    ))
+    bad = writer.submit(lambda conn: conn.execute(text("INSERT INTO no_such_table VALUES (1)")))
+    release.set()
+    blocker.result(5)
+    good.result(5)
+    assert bad.exception(5) is not None
+    with engine.connect() as conn:
+        assert conn.execute(select(func.count()).select_from(analysis_history_table)).scalar() == 1
+
+def test_init_db_enables_wal(tmp_path):
+    engine = init_db(f"sqlite:///{tmp_path / 'wal.db'}")
+    with engine.connect() as conn:
+        assert conn.execute(text("PRAGMA journal_mode")).scalar() == "wal"
+
+def test_concurrent_column_migrations_do_not_collide(tmp_path):
+    db_file = tmp_path / "old.db"
+    engine = create_engine(f"sqlite:///{db_file}")
+    with engine.begin() as conn:
+        conn.execute(text("CREATE TABLE projects (id INTEGER PRIMARY KEY, schedule_id VARCHAR)"))
+    errors = []
+
+    def migrate():
+        # One engine per "worker process", as each would open its own.
+        try:
+            add_missing_columns(create_engine(f"sqlite:///{db_file}"))
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=migrate) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert errors == []
+    with engine.connect() as conn:
+        columns = {r[1] for r in conn.execute(text("PRAGMA table_info(projects)"))}
+    assert "data_version" in columns
+
+def test_pddl_mapping_upsert_goes_through_the_writer(tmp_path):
+    engine = init_db(f"sqlite:///{tmp_path / 'pddl.db'}")
+    with engine.begin() as conn:
+        conn.execute(insert(tasks_table), {"schedule_id": "W1", "schedule_type": "target", "task_id": "T1",
+                                           "duration": 1.0, "bl_start": "2024-01-01 08:00:00"})
+    domain_file = generate_domain_for_target("W1", engine, output_dir=str(tmp_path))
+    assert engine.url.render_as_string(hide_password=False) in _writers
+    with engine.connect() as conn:
+        assert conn.execute(select(pddl_mappings_table.c.domain_file)).scalar() == domain_file
@@ -0,0 +1,124 @@
+import threading
+import pytest
+
+from construct.eventing import Event, EventManager, EventQueueFull
+
+@pytest.fixture
+def manager():
+    manager = EventManager()
+    yield manager
+    manager.stop(wait=False)
+
+def test_inline_dispatch_isolates_listener_errors(manager):
+    calls = []
+
+    def broken(event):
+        raise RuntimeError("boom")
+
+    manager.add_listener("ping", broken)
+    manager.add_listener("ping", lambda e: calls.append(e.payload["n"]))
+    handle = manager.emit(Event("ping", {"n": 1}))
+    assert handle.done()
+    assert calls == [1]
+    assert handle.errors == ["broken: RuntimeError: boom"]
+
+def test_async_emit_returns_before_listeners_finish(manager):
+    release = threading.Event()
+    seen = []
+
+    def slow(event):
+        release.wait(5)
+        seen.append(event.event_id)
+
+    manager.add_listener("ingested", slow)
+    manager.start(workers=1, queue_size=10)
+    handle = manager.emit(Event("ingested"))
+    assert not handle.done()
+    assert manager.get_handle(handle.event_id) is handle
+
+    finished = []
+    handle.add_done_callback(lambda h: finished.append(h.status))
+    release.set()
+    assert handle.wait(5)
+    assert seen == [handle.event_id]
+    assert finished == ["done"]
+
+def test_full_queue_applies_backpressure(manager):
+    release = threading.Event()
+    manager.add_listener("ingested", lambda e: release.wait(5))
+    manager.start(workers=1, queue_size=1, put_timeout=0.1)
+    manager.emit(Event("ingested"))      # picked up by the worker
+    # Give the worker a moment to take the first event off the queue.
+    for _ in range(50):
+        if manager.pending_count() == 0:
+            break
+        threading.Event().wait(0.01)
+    manager.emit(Event("ingested"))      # fills the queue
+    with pytest.raises(EventQueueFull):
+        manager.emit(Event("ingested"))
+    release.set()
+
+def test_coalesces_events_with_same_key(manager):
+    seen = []
+    manager.add_listener("ingested", lambda e: seen.append(e.payload["file"]))
+    manager.coalesce("ingested", key_fields=("schedule_id",), window=0.2)
+    manager.start(workers=1, queue_size=10)
+    first = manager.emit(Event("ingested", {"schedule_id": "S1", "file": "a.xlsx"}))
+    second = manager.emit(Event("ingested", {"schedule_id": "S1", "file": "b.xlsx"}))
+    other = manager.emit(Event("ingested", {"schedule_id": "S2", "file": "c.xlsx"}))
+    assert second is first
+    assert other is not first
+    assert first.wait(5) and other.wait(5)
+    # One invocation per key, with the latest payload.
+    assert sorted(seen) == ["b.xlsx", "c.xlsx"]
+    assert first.coalesced == 1
+    metrics = manager.metrics()
+    assert metrics["emitted"] == 3
+    assert metrics["coalesced"] == 1
+    assert metrics["dispatched"] == 2
+
+def test_ingests_of_different_projects_are_not_coalesced(manager):
+    from construct.event_handlers import SCHEDULE_INGESTED_KEY_FIELDS
+    seen = []
+    manager.add_listener("schedule_ingested", lambda e: seen.append(e.payload["db_url"]))
+    manager.coalesce("schedule_ingested", key_fields=SCHEDULE_INGESTED_KEY_FIELDS, window=0.2)
+    manager.start(workers=1, queue_size=10)
+    payload = {"schedule_id": "S1", "schedule_type": "target", "project_folder": None}
+    first = manager.emit(Event("schedule_ingested", {**payload, "db_url": "sqlite:///a.db"}))
+    second = manager.emit(Event("schedule_ingested", {**payload, "db_url": "sqlite:///b.db"}))
+    assert second is not first
+    assert first.wait(5) and second.wait(5)
+    assert sorted(seen) == ["sqlite:///a.db", "sqlite:///b.db"]
+
+def test_stop_flushes_debounced_events(manager):
+    seen = []
+    manager.add_listener("ingested", lambda e: seen.append(e.event_id))
+    manager.coalesce("ingested", window=60)
+    manager.start(workers=1, queue_size=10)
+    handle = manager.emit(Event("ingested", {"schedule_id": "S1"}))
+    manager.stop(wait=True)
+    assert handle.done()
+    assert seen == [handle.event_id]
+
+def test_stop_waits_for_the_debouncer_to_hand_over(manager):
+    seen = []
+    manager.add_listener("ingested", lambda e: seen.append(e.event_id))
+    manager.coalesce("ingested", window=0.01)
+    manager.start(workers=1, queue_size=10)
+    taken, resume = threading.Event(), threading.Event()
+    enqueue = manager._enqueue
+
+    def slow_enqueue(handle):
+        taken.set()
+        resume.wait(5)
+        enqueue(handle)
+
+    manager._enqueue = slow_enqueue
+    handle = manager.emit(Event("ingested", {"schedule_id": "S1"}))
+    # The debouncer has taken the event off its pending set but not queued it yet.
+    assert taken.wait(5)
+    threading.Timer(0.1, resume.set).start()
+    manager.stop(wait=True)
+    assert handle.wait(5)
+    assert handle.errors == []
+    assert seen == [handle.event_id]
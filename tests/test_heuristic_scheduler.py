@@ -0,0 +1,58 @@
+import os
+from sqlalchemy import insert
+
+from construct.database import tasks_table, dependencies_table
+from construct.heuristic_scheduler import list_schedule
+from construct.plan_parser import PlanStep, plan_makespan
+from construct.scheduler import run_optic
+
+def test_list_schedule_respects_dependencies():
+    tasks = {
+        "A": {"duration": 2.0, "bl_start": "2024-01-01 08:00:00"},
+        "B": {"duration": 3.0, "bl_start": "2024-01-03 08:00:00"},
+        "C": {"duration": 1.0, "bl_start": "2024-01-02 08:00:00"},
+        "D": {"duration": 4.0, "bl_start": "2024-01-06 08:00:00"},
+    }
+    # B and C follow A; D follows both B and C.
+    dependencies = [("B", "A"), ("C", "A"), ("D", "B"), ("D", "C")]
+    steps = list_schedule(tasks, dependencies)
+    assert steps == [
+        PlanStep("A", 0.0, 2.0),
+        PlanStep("C", 2.0, 1.0),   # same earliest start as B, earlier baseline
+        PlanStep("B", 2.0, 3.0),
+        PlanStep("D", 5.0, 4.0),
+    ]
+    assert plan_makespan(steps) == 9.0
+
+def test_list_schedule_skips_completed_and_survives_cycles():
+    tasks = {t: {"duration": 1.0, "bl_start": ""} for t in ("A", "B", "C", "D")}
+    # A is already done; B <-> C form a cycle; D follows C.
+    dependencies = [("B", "A"), ("B", "C"), ("C", "B"), ("D", "C")]
+    steps = list_schedule(tasks, dependencies, completed={"A"})
+    assert sorted(s.task_id for s in steps) == ["B", "C", "D"]
+    by_id = {s.task_id: s for s in steps}
+    assert by_id["D"].start >= by_id["C"].start + 1.0
+
+def test_run_optic_falls_back_without_planner(engine, tmp_path, monkeypatch):
+    from construct import scheduler
+    monkeypatch.setattr(scheduler, "OPTIC_CMD", "/nonexistent/optic")
+    with engine.begin() as conn:
+        conn.execute(insert(tasks_table), [
+            {"schedule_id": "HEUR001", "schedule_type": "target", "task_id": "T1",
+             "duration": 2.0, "bl_start": "2024-03-01 08:00:00", "bl_finish": "2024-03-03 08:00:00"},
+            {"schedule_id": "HEUR001", "schedule_type": "target", "task_id": "T2",
+             "duration": 1.0, "bl_start": "2024-03-03 08:00:00", "bl_finish": "2024-03-04 08:00:00"},
+        ])
+        conn.execute(insert(dependencies_table), {"schedule_id": "HEUR001", "task_id": "T2", "depends_on_task_id": "T1"})
+    domain_file = tmp_path / "domain.pddl"
+    problem_file = tmp_path / "problem.pddl"
+    domain_file.write_text("(define (domain construction))")
+    problem_file.write_text("(define (problem proj))")
+
+    result = run_optic("HEUR001", engine, {"domain_file": str(domain_file), "problem_file": str(problem_file)},
+                       use_cache=False)
+    assert result["status"] == "success"
+    assert result["planner"] == "heuristic"
+    assert result["makespan"] == 3.0
+    assert result["plan_start"] == "2024-03-01 08:00:00"
+    assert os.path.isfile(result["optimized_project_file"])
@@ -0,0 +1,29 @@
+import os
+import subprocess
+import sys
+
+HEAVY_MODULES = ("pandas", "numpy", "openpyxl", "langchain", "openai", "aiohttp")
+
+def _loaded_after_import(module: str, cwd) -> list:
+    package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    code = (
+        f"import sys, {module}\n"
+        f"print(','.join(m for m in {HEAVY_MODULES!r} if m in sys.modules))"
+    )
+    result = subprocess.run(
+        [sys.executable, "-c", code], cwd=cwd, capture_output=True, text=True, timeout=60,
+        env={**os.environ, "PYTHONPATH": package_root},
+    )
+    assert result.returncode == 0, result.stderr
+    return [m for m in result.stdout.strip().split(",") if m]
+
+def test_api_import_defers_heavy_dependencies_and_writes_nothing(tmp_path):
+    assert _loaded_after_import("construct.api", tmp_path) == []
+    assert os.listdir(tmp_path) == []
+
+def test_cli_entry_point_imports_only_argparse(tmp_path):
+    code = "import sys, construct.main; print('sqlalchemy' in sys.modules or 'fastapi' in sys.modules)"
+    package_root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    result = subprocess.run([sys.executable, "-c", code], cwd=tmp_path, capture_output=True, text=True,
+                            timeout=60, env={**os.environ, "PYTHONPATH": package_root})
+    assert result.stdout.strip() == "False", result.stderr
@@ -0,0 +1,227 @@
+import asyncio
+import json
+import threading
+import time
+
+import pytest
+
+from construct import llm_agent
+from construct.tokens import estimate_tokens
+
+SUMMARY = "word " * 300
+
+def test_map_reduce_summarization_is_concurrent_and_hierarchical(monkeypatch):
+    monkeypatch.setenv("CONSTRUCT_LLM_CHUNK_TOKENS", "750")
+    in_flight = 0
+    peak = 0
+    combine_prompts = []
+
+    async def fake_llm(system, user, engine=None):
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        if "Combine" in user:
+            combine_prompts.append(user)
+        # Long summaries force more than one reduce level.
+        return SUMMARY
+
+    monkeypatch.setattr(llm_agent, "_acall_llm", fake_llm)
+    context = "\n".join(f"task {i} is behind schedule by {i} days" for i in range(2000))
+    stats = []
+    summary = asyncio.run(llm_agent.asummarize_large_context(context, max_concurrency=3, stats=stats))
+
+    chunks = llm_agent.chunk_text(context, 750)
+    assert len(chunks) > 1
+    assert all(estimate_tokens(c) <= 750 for c in chunks)
+    assert summary == SUMMARY
+    assert 1 < peak <= 3
+    assert sum(1 for s in stats if s["level"] == 0) == len(chunks)
+    assert max(s["level"] for s in stats) > 1
+    # Each reduce prompt holds one group that fits the budget (plus at most one overflow).
+    assert all(estimate_tokens(p) < 3 * 750 for p in combine_prompts)
+
+def test_group_for_reduce_always_shrinks():
+    groups = llm_agent._group_for_reduce(["x" * 5000] * 5, 750)
+    assert len(groups) < 5
+    assert sum(len(g) for g in groups) == 5
+
+class FakeChat:
+    calls = []
+
+    def __init__(self, **kwargs):
+        pass
+
+    async def agenerate(self, batches):
+        FakeChat.calls.append(batches[0])
+        generation = type("Generation", (), {"text": f"summary {len(FakeChat.calls)}"})()
+        return type("Result", (), {
+            "generations": [[generation]],
+            "llm_output": {"token_usage": {"total_tokens": 50}},
+        })()
+
+def test_identical_prompts_are_answered_from_the_cache(monkeypatch, tmp_path):
+    from sqlalchemy import create_engine
+    from construct.database import metadata
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'llm.db'}")
+    metadata.create_all(engine)
+    FakeChat.calls = []
+    monkeypatch.setattr(llm_agent, "ChatOpenAI", FakeChat)
+    monkeypatch.setattr(llm_agent, "_clients", {})
+    first = llm_agent.summarize_chunk("task 1 is late", engine=engine)
+    again = llm_agent.summarize_chunk("task 1 is late", engine=engine)
+    other = llm_agent.summarize_chunk("task 2 is late", engine=engine)
+    assert first == again == "summary 1"
+    assert other == "summary 2"
+    assert len(FakeChat.calls) == 2
+
+def test_rejected_plan_is_not_served_from_the_cache(monkeypatch, tmp_path):
+    from sqlalchemy import create_engine
+    from construct.database import metadata
+    from construct.plan_cache import PlanCache
+
+    replies = ['[{"action": "drop_tables"}]', '[{"action": "finalize", "description": "ok"}]']
+
+    class PlanningChat(FakeChat):
+        async def agenerate(self, batches):
+            FakeChat.calls.append(batches[0])
+            generation = type("Generation", (), {"text": replies[len(FakeChat.calls) - 1]})()
+            return type("Result", (), {"generations": [[generation]], "llm_output": {}})()
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'llm.db'}")
+    metadata.create_all(engine)
+    FakeChat.calls = []
+    monkeypatch.setattr(llm_agent, "ChatOpenAI", PlanningChat)
+    monkeypatch.setattr(llm_agent, "_clients", {})
+    monkeypatch.setattr(llm_agent, "plan_cache", PlanCache(max_entries=8, enabled=False))
+    fallback = llm_agent.generate_plan("Which crews are idle?", engine=engine)
+    assert fallback[0]["description"] == "Could not generate plan, use default analysis."
+    plan = llm_agent.generate_plan("Which crews are idle?", engine=engine)
+    assert plan == [{"action": "finalize", "description": "ok"}]
+    assert len(FakeChat.calls) == 2
+
+def test_cache_evicts_by_size_and_ttl(tmp_path):
+    from sqlalchemy import create_engine, select
+    from construct.database import metadata, llm_response_cache_table
+    from construct.llm_cache import LLMResponseCache
+
+    engine = create_engine(f"sqlite:///{tmp_path / 'llm.db'}")
+    metadata.create_all(engine)
+    cache = LLMResponseCache(ttl_seconds=3600, max_bytes=25)
+    for i in range(3):
+        cache.put(engine, f"k{i}", "gpt-4", 0, "x" * 10)
+    with engine.connect() as conn:
+        keys = {r.cache_key for r in conn.execute(select(llm_response_cache_table))}
+    assert keys == {"k1", "k2"}
+
+    expired = LLMResponseCache(ttl_seconds=-1, max_bytes=1000)
+    assert expired.get(engine, "k2") is None
+    assert cache.get(engine, "k2") == "x" * 10
+
+def test_call_debits_estimate_and_reconciles_usage(monkeypatch):
+    bucket = llm_agent.TokenBucket(capacity=100000, refill_rate=0.001)
+    monkeypatch.setattr(llm_agent, "token_bucket", bucket)
+    monkeypatch.setattr(llm_agent, "ChatOpenAI", FakeChat)
+    monkeypatch.setattr(llm_agent, "_clients", {})
+    llm_agent._run(llm_agent._acall_llm("system", "user"))
+    # Only the reported usage (50 tokens) stays debited.
+    assert 100000 - bucket.tokens == pytest.approx(50, abs=1)
+
+def test_bucket_waiters_wake_on_credit():
+    bucket = llm_agent.TokenBucket(capacity=100, refill_rate=0.01)
+    bucket.consume(100)
+    woke = []
+
+    def waiter():
+        bucket.consume(40)
+        woke.append("thread")
+
+    async def async_waiter():
+        await bucket.aconsume(40)
+        woke.append("async")
+
+    thread = threading.Thread(target=waiter)
+    thread.start()
+    loop_thread = threading.Thread(target=lambda: asyncio.run(async_waiter()))
+    loop_thread.start()
+    time.sleep(0.1)
+    assert woke == []
+    started = time.monotonic()
+    bucket.credit(80)
+    thread.join(2)
+    loop_thread.join(2)
+    assert sorted(woke) == ["async", "thread"]
+    assert time.monotonic() - started < 1
+
+def test_plan_cache_skips_the_model_for_known_intents(monkeypatch):
+    from construct.plan_cache import PlanCache
+
+    calls = []
+
+    async def fake_llm(system, user, engine=None):
+        calls.append(user)
+        return '[{"action": "wbs_rollup"}, {"action": "finalize", "description": "answer"}]'
+
+    monkeypatch.setattr(llm_agent, "_acall_llm", fake_llm)
+    monkeypatch.setattr(llm_agent, "plan_cache", PlanCache(max_entries=8))
+
+    plan = llm_agent.generate_plan("Compare progress and summarize what is behind schedule")
+    assert [s["action"] for s in plan] == ["status_counts", "top_variances", "wbs_rollup", "finalize"]
+    assert plan[-1]["description"] == "Compare progress and summarize what is behind schedule"
+    assert calls == []
+
+    first = llm_agent.generate_plan("Which subcontractors have crews on the roof?")
+    again = llm_agent.generate_plan("which subcontractors have crews on the roof")
+    assert [s["action"] for s in first] == [s["action"] for s in again]
+    assert again[-1]["description"] == "which subcontractors have crews on the roof"
+    assert len(calls) == 1
+    assert llm_agent.plan_cache.stats() == {"hits": 2, "misses": 1, "entries": 1}
+
+def test_cached_plan_answers_the_live_query(monkeypatch):
+    from construct.plan_cache import PlanCache, query_intent
+
+    async def fake_llm(system, user, engine=None):
+        if user.startswith("Generate a plan"):
+            question = user.split(": ", 1)[1]
+            return json.dumps([{"action": "finalize", "description": question}])
+        return user.split("\n\n")[-2]
+
+    monkeypatch.setattr(llm_agent, "_acall_llm", fake_llm)
+    monkeypatch.setattr(llm_agent, "plan_cache", PlanCache(max_entries=8))
+    first, second = "Is roofing behind framing?", "Is framing behind roofing?"
+    assert query_intent(first) == query_intent(second)
+    answers = [llm_agent.execute_plan("PLAN001", llm_agent.generate_plan(q)) for q in (first, second)]
+    assert answers == [f"finalize result:\n{first}", f"finalize result:\n{second}"]
+    assert llm_agent.plan_cache.stats()["hits"] == 1
+
+def test_invalid_model_plan_falls_back_and_is_not_cached(monkeypatch):
+    from construct.plan_cache import PlanCache
+
+    async def fake_llm(system, user, engine=None):
+        return '[{"action": "drop_tables"}, {"action": "finalize"}]'
+
+    monkeypatch.setattr(llm_agent, "_acall_llm", fake_llm)
+    monkeypatch.setattr(llm_agent, "plan_cache", PlanCache(max_entries=8))
+    for query in ("Which crews are idle?", "Which crews are idle?"):
+        plan = llm_agent.generate_plan(query)
+        assert plan == [{"action": "finalize", "description": "Could not generate plan, use default analysis."}]
+    assert llm_agent.plan_cache.stats()["entries"] == 0
+
+def test_model_client_is_shared(monkeypatch):
+    monkeypatch.setattr(llm_agent, "ChatOpenAI", FakeChat)
+    monkeypatch.setattr(llm_agent, "_clients", {})
+    assert llm_agent._chat_client() is llm_agent._chat_client()
+    assert llm_agent._chat_client(streaming=True) is not llm_agent._chat_client()
+
+    async def sessions():
+        import openai
+        llm_agent._use_shared_session()
+        first = openai.aiosession.get()
+        llm_agent._use_shared_session()
+        return first, openai.aiosession.get()
+
+    first, second = llm_agent._run(sessions())
+    assert first is second
+    assert first.closed
@@ -0,0 +1,42 @@
+from construct.metrics import MetricsRegistry, metrics
+
+def test_histograms_and_counters_render_as_prometheus_text():
+    registry = MetricsRegistry(buckets=(0.1, 1.0))
+    registry.observe("construct_stage_seconds", 0.05, stage="parse")
+    registry.observe("construct_stage_seconds", 0.5, stage="parse")
+    registry.observe("construct_stage_seconds", 5, stage="parse")
+    registry.inc("construct_tasks_processed_total", 10, stage="parse")
+    registry.add_collector(lambda: [("construct_events_pending", "gauge", {"stage": "queued"}, 3)])
+    text = registry.render_prometheus()
+
+    assert "# TYPE construct_stage_seconds histogram" in text
+    assert 'construct_stage_seconds_bucket{stage="parse",le="0.1"} 1' in text
+    assert 'construct_stage_seconds_bucket{stage="parse",le="1.0"} 2' in text
+    assert 'construct_stage_seconds_bucket{stage="parse",le="+Inf"} 3' in text
+    assert 'construct_stage_seconds_count{stage="parse"} 3' in text
+    assert 'construct_stage_seconds_sum{stage="parse"} 5.55' in text
+    assert 'construct_tasks_processed_total{stage="parse"} 10' in text
+    assert 'construct_events_pending{stage="queued"} 3' in text
+
+def test_disabled_registry_records_nothing():
+    registry = MetricsRegistry(enabled=False)
+
+    @registry.instrument("construct_stage_seconds", stage="x")
+    def work():
+        return 42
+
+    with registry.timed("construct_stage_seconds", stage="y"):
+        registry.inc("construct_tasks_processed_total")
+    assert work() == 42
+    assert registry.snapshot() == {"counters": {}, "histograms": {}}
+
+def test_metrics_endpoint_reports_pipeline_stages(client, ingest_samples):
+    ingest_samples("METRICS001")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    assert 'construct_stage_seconds_count{stage="ingest_write"}' in text
+    assert "construct_db_write_seconds_count" in text
+    assert 'construct_cache_requests_total{cache="llm",result="hit"}' in text
+    assert metrics.snapshot()["counters"][("construct_tasks_processed_total", (("stage", "ingest_write"),))] > 0
@@ -0,0 +1,100 @@
+import json
+import time
+import pytest
+from sqlalchemy import create_engine, select, insert
+
+from construct.database import metadata, events_table
+from construct.eventing import event_manager
+from construct import outbox
+
+@pytest.fixture
+def engine(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'outbox.db'}")
+    metadata.create_all(engine)
+    return engine
+
+@pytest.fixture
+def listener():
+    seen = []
+    fn = lambda e: seen.append((e.event_id, e.payload))
+    event_manager.add_listener("outbox_test", fn)
+    yield seen
+    event_manager.remove_listener("outbox_test", fn)
+
+def _statuses(engine):
+    with engine.connect() as conn:
+        return {r.event_id: r.status for r in conn.execute(select(events_table)) if r.event_id}
+
+def test_event_committed_with_transaction_and_marked_done(engine, listener):
+    db_url = outbox.register_engine(engine)
+    with engine.begin() as conn:
+        event = outbox.enqueue_event(conn, "outbox_test", {"schedule_id": "S1", "db_url": db_url}, "S1")
+    # Claimed by the writing process, so no other process replays it while it runs.
+    assert _statuses(engine) == {event.event_id: outbox.CLAIMED}
+    assert outbox.replay_pending(engine) == 0
+
+    assert outbox.publish(event, db_url).wait(5)
+    outbox.completions.flush()
+    assert listener == [(event.event_id, {"schedule_id": "S1", "db_url": db_url})]
+    assert _statuses(engine) == {event.event_id: outbox.DONE}
+
+def test_rolled_back_transaction_leaves_no_event(engine):
+    with pytest.raises(RuntimeError):
+        with engine.begin() as conn:
+            outbox.enqueue_event(conn, "outbox_test", {"schedule_id": "S1"}, "S1")
+            raise RuntimeError("ingest failed")
+    assert _statuses(engine) == {}
+
+def test_replay_dispatches_unfinished_events(engine, listener):
+    # Rows left pending by a process that died before dispatching them.
+    with engine.begin() as conn:
+        conn.execute(insert(events_table), [
+            {"event_id": f"e{i}", "event_type": "outbox_test", "status": outbox.PENDING,
+             "attempts": 0, "payload": json.dumps({"n": i})}
+            for i in range(5)
+        ] + [{"event_id": "old", "event_type": "outbox_test", "status": outbox.DONE, "attempts": 1, "payload": "{}"}])
+
+    assert outbox.replay_pending(engine, batch_size=2) == 5
+    for i in range(5):
+        event_manager.get_handle(f"e{i}").wait(5)
+    outbox.completions.flush()
+    # Replayed oldest first; with several event workers the listeners may still finish out of order.
+    emitted = [event_manager.get_handle(f"e{i}").emitted_at for i in range(5)]
+    assert emitted == sorted(emitted)
+    assert sorted(payload["n"] for _, payload in listener) == [0, 1, 2, 3, 4]
+    assert set(_statuses(engine).values()) == {outbox.DONE}
+
+def test_replay_takes_only_unclaimed_and_expired_rows(engine, listener):
+    past, future = "2000-01-01T00:00:00+00:00", "2999-01-01T00:00:00+00:00"
+    with engine.begin() as conn:
+        conn.execute(insert(events_table), [
+            {"event_id": "live", "event_type": "outbox_test", "status": outbox.CLAIMED, "attempts": 0,
+             "payload": "{}", "owner": "other-worker", "lease_until": future},
+            {"event_id": "dead", "event_type": "outbox_test", "status": outbox.CLAIMED, "attempts": 0,
+             "payload": "{}", "owner": "crashed-worker", "lease_until": past},
+        ])
+
+    assert outbox.replay_pending(engine) == 1
+    event_manager.get_handle("dead").wait(5)
+    outbox.completions.flush()
+    assert [event_id for event_id, _ in listener] == ["dead"]
+    assert _statuses(engine) == {"live": outbox.CLAIMED, "dead": outbox.DONE}
+    # A second worker opening the database finds nothing left to take.
+    assert outbox.replay_pending(engine) == 0
+
+def test_expired_lease_is_replayed_after_the_first_open(engine, listener):
+    from datetime import datetime, timedelta, timezone
+    soon = (datetime.now(timezone.utc) + timedelta(seconds=0.2)).isoformat()
+    with engine.begin() as conn:
+        conn.execute(insert(events_table), {"event_id": "slow", "event_type": "outbox_test", "status": outbox.CLAIMED,
+                                            "attempts": 0, "payload": "{}", "owner": "crashed-worker",
+                                            "lease_until": soon})
+    assert outbox.ensure_replayed(engine) == 0
+    handle = None
+    for _ in range(50):
+        handle = event_manager.get_handle("slow")
+        if handle is not None:
+            break
+        time.sleep(0.1)
+    assert handle is not None and handle.wait(5)
+    assert [event_id for event_id, _ in listener] == ["slow"]
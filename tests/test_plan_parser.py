@@ -0,0 +1,78 @@
+import os
+import pytest
+from datetime import datetime
+from sqlalchemy import select, insert
+
+from construct.database import tasks_table
+from construct.plan_parser import PlanStep, parse_plan, PlanCollector, plan_makespan
+from construct.optimized_schedule import (
+    OPTIMIZED_SCHEDULE_TYPE, write_optimized_schedule, export_optimized_schedule
+)
+
+OPTIC_OUTPUT = """\
+; Command line: optic -d domain.pddl -p problem.pddl
+; Plan found with metric 12.000
+0.000: (do_t1)  [5.000]
+5.001: (do_t2)  [7.000]
+
+; Plan found with metric 9.000
+; States evaluated so far: 42
+0.000: (do_t1)  [5.000]
+0.000: (do_t2)  [7.000]
+7.001: (do_t3)  [2.000]
+"""
+
+def test_parse_plan_keeps_only_the_final_solution():
+    steps = parse_plan(OPTIC_OUTPUT.splitlines())
+    assert steps == [
+        PlanStep("t1", 0.0, 5.0),
+        PlanStep("t2", 0.0, 7.0),
+        PlanStep("t3", 7.001, 2.0),
+    ]
+    assert plan_makespan(steps) == pytest.approx(9.001)
+
+def test_plan_collector_parses_line_by_line():
+    collector = PlanCollector()
+    for line in OPTIC_OUTPUT.splitlines():
+        collector.feed(line)
+    assert collector.steps == parse_plan(OPTIC_OUTPUT.splitlines())
+
+    lines = (f"{i}.000: (do_t{i})  [1.000]\n" for i in range(100_000))
+    steps = parse_plan(lines)
+    assert len(steps) == 100_000
+    assert steps[-1] == PlanStep("t99999", 99999.0, 1.0)
+
+def test_write_back_and_export_optimized_schedule(engine, tmp_path):
+    with engine.begin() as conn:
+        conn.execute(insert(tasks_table), [
+            {"schedule_id": "PLAN001", "schedule_type": "target", "task_id": "T1", "task_name": "Excavate"},
+            {"schedule_id": "PLAN001", "schedule_type": "target", "task_id": "T2", "task_name": "Pour"},
+        ])
+    steps = [PlanStep("t1", 0.0, 2.0), PlanStep("t2", 2.5, 1.0)]
+    written = write_optimized_schedule(engine, "PLAN001", steps, datetime(2024, 1, 1, 8))
+    assert written == 2
+
+    with engine.connect() as conn:
+        rows = conn.execute(
+            select(tasks_table)
+            .where(tasks_table.c.schedule_id == "PLAN001")
+            .where(tasks_table.c.schedule_type == OPTIMIZED_SCHEDULE_TYPE)
+            .order_by(tasks_table.c.task_id)
+        ).mappings().all()
+    assert [r["task_id"] for r in rows] == ["T1", "T2"]
+    assert rows[0]["task_name"] == "Excavate"
+    assert rows[0]["start_date"] == "2024-01-01 08:00:00"
+    assert rows[0]["end_date"] == "2024-01-03 08:00:00"
+    assert rows[1]["start_date"] == "2024-01-03 20:00:00"
+
+    # Re-running replaces the optimized rows rather than appending.
+    write_optimized_schedule(engine, "PLAN001", steps[:1], datetime(2024, 1, 1, 8))
+    export_file = export_optimized_schedule(engine, "PLAN001", str(tmp_path))
+    assert os.path.isfile(export_file)
+    with engine.connect() as conn:
+        count = conn.execute(
+            select(tasks_table.c.id)
+            .where(tasks_table.c.schedule_id == "PLAN001")
+            .where(tasks_table.c.schedule_type == OPTIMIZED_SCHEDULE_TYPE)
+        ).fetchall()
+    assert len(count) == 1
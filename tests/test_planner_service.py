@@ -0,0 +1,164 @@
+import os
+import stat
+import threading
+import time
+import pytest
+from sqlalchemy import create_engine
+
+from construct import scheduler
+from construct.planner_cache import PlannerCache
+from construct.jobs import SUCCEEDED, CANCELLED
+from construct.planner_service import PlannerService
+from construct.database import metadata
+from construct.plan_parser import PlanCollector, PlanStep
+
+@pytest.fixture
+def engine(tmp_path):
+    # A fresh DB per test so the DB tier of the planner cache starts empty.
+    engine = create_engine(f"sqlite:///{tmp_path / 'planner.db'}")
+    metadata.create_all(engine)
+    return engine
+
+@pytest.fixture
+def fake_optic(tmp_path, monkeypatch):
+    """
+    Install a stand-in planner script that echoes a one-step plan after
+    sleeping for FAKE_OPTIC_SLEEP seconds.
+    """
+    script = tmp_path / "fake_optic"
+    script.write_text(
+        "#!/bin/sh\n"
+        "sleep ${FAKE_OPTIC_SLEEP:-0}\n"
+        "echo '0.000: (do_T1)  [1.000]'\n"
+    )
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setattr(scheduler, "OPTIC_CMD", str(script))
+    monkeypatch.setattr(scheduler, "planner_cache", PlannerCache(str(tmp_path / "cache"), 1024 * 1024, 10))
+    return script
+
+@pytest.fixture
+def pddl_files(tmp_path):
+    domain_file = tmp_path / "domain.pddl"
+    problem_file = tmp_path / "problem.pddl"
+    domain_file.write_text("(define (domain construction))")
+    problem_file.write_text("(define (problem proj))")
+    return str(domain_file), str(problem_file)
+
+@pytest.fixture
+def mapping(pddl_files):
+    return {"domain_file": pddl_files[0], "problem_file": pddl_files[1]}
+
+def test_run_planner_returns_stdout(fake_optic, pddl_files):
+    out = scheduler.run_planner(*pddl_files)
+    assert "(do_T1)" in out
+
+def test_run_planner_timeout_kills_planner(fake_optic, pddl_files, monkeypatch):
+    monkeypatch.setenv("FAKE_OPTIC_SLEEP", "5")
+    with pytest.raises(scheduler.PlannerTimeout):
+        scheduler.run_planner(*pddl_files, timeout=0.2)
+
+def test_run_planner_parses_lines_before_the_planner_exits(fake_optic, pddl_files, tmp_path, monkeypatch):
+    # An anytime planner that prints a plan, then keeps searching past the deadline.
+    anytime = tmp_path / "anytime_optic"
+    anytime.write_text(
+        "#!/bin/sh\n"
+        "echo '; Plan found'\n"
+        "echo '0.000: (do_T1)  [1.000]'\n"
+        "sleep 5\n"
+    )
+    anytime.chmod(anytime.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setattr(scheduler, "OPTIC_CMD", str(anytime))
+    plan = PlanCollector()
+    with pytest.raises(scheduler.PlannerTimeout) as raised:
+        scheduler.run_planner(*pddl_files, timeout=0.5, on_line=plan.feed)
+    assert plan.steps == [PlanStep("T1", 0.0, 1.0)]
+    assert "(do_T1)" in raised.value.output
+
+def test_planner_service_submit_and_result(fake_optic, engine, mapping):
+    service = PlannerService(max_workers=1, timeout=10)
+    job = service.submit("S1", engine, mapping)
+    result = service.result(job.job_id, timeout=10)
+    assert result["status"] == SUCCEEDED, result
+    assert result["result"]["status"] == "success"
+    assert result["result"]["steps"] == 1
+    assert os.path.isfile(result["result"]["optimized_project_file"])
+    assert result["meta"]["schedule_id"] == "S1"
+
+def test_planner_service_timeout_falls_back_to_heuristic(fake_optic, engine, mapping, monkeypatch):
+    monkeypatch.setenv("FAKE_OPTIC_SLEEP", "5")
+    service = PlannerService(max_workers=1)
+    job = service.submit("S1", engine, mapping, timeout=0.2)
+    result = service.result(job.job_id, timeout=10)
+    assert result["status"] == SUCCEEDED
+    assert result["result"]["planner"] == "heuristic"
+    assert "exceeded" in result["result"]["fallback_reason"]
+
+def test_planner_service_cancel_running_and_queued(fake_optic, engine, mapping, monkeypatch):
+    monkeypatch.setenv("FAKE_OPTIC_SLEEP", "5")
+    service = PlannerService(max_workers=1, timeout=30)
+    running = service.submit("S1", engine, mapping)
+    queued = service.submit("S1", engine, mapping)
+
+    assert service.cancel(queued.job_id)
+    assert service.status(queued.job_id)["status"] == CANCELLED
+
+    assert service.cancel(running.job_id)
+    assert running.wait(5)
+    assert service.status(running.job_id)["status"] == CANCELLED
+    # Join the worker so a cancelled run cannot leak into the next test.
+    service.jobs.shutdown(wait=True)
+
+def test_run_planner_serves_cached_plan(fake_optic, pddl_files, engine, monkeypatch):
+    first = scheduler.run_planner(*pddl_files, engine=engine)
+    # A planner that would now fail proves the second call never reaches it.
+    monkeypatch.setattr(scheduler, "OPTIC_CMD", "/nonexistent/optic")
+    second = scheduler.run_planner(*pddl_files, engine=engine)
+    assert second == first
+    assert scheduler.planner_cache.stats() == {"hits": 1, "misses": 1}
+
+    # The DB tier still answers once the disk copy is gone.
+    for name in os.listdir(scheduler.planner_cache.cache_dir):
+        os.remove(os.path.join(scheduler.planner_cache.cache_dir, name))
+    assert scheduler.run_planner(*pddl_files, engine=engine) == first
+
+    # Different planner arguments are a different cache entry.
+    with pytest.raises(FileNotFoundError):
+        scheduler.run_planner(*pddl_files, args=["-N"], engine=engine)
+
+def test_portfolio_returns_first_plan_and_prefers_winner(fake_optic, engine, mapping, tmp_path, monkeypatch):
+    # Only the "-N" configuration answers quickly; the others would sleep well past the test.
+    slow_then_fast = tmp_path / "portfolio_optic"
+    slow_then_fast.write_text(
+        "#!/bin/sh\n"
+        "[ \"$1\" = \"-N\" ] || sleep 30\n"
+        "echo '; Plan found with metric 3.000'\n"
+        "echo '0.000: (do_T1)  [3.000]'\n"
+    )
+    slow_then_fast.chmod(slow_then_fast.stat().st_mode | stat.S_IEXEC)
+    monkeypatch.setattr(scheduler, "OPTIC_CMD", str(slow_then_fast))
+    monkeypatch.setattr(scheduler, "planner_slots", threading.BoundedSemaphore(4))
+
+    assert scheduler.preferred_portfolio_config(engine, "S1") is None
+    result = scheduler.run_portfolio("S1", engine, mapping, deadline=20, max_parallel=4)
+    assert result["status"] == "success"
+    assert result["config"] == "first-plan"
+    assert result["makespan"] == 3.0
+    assert scheduler.preferred_portfolio_config(engine, "S1") == "first-plan"
+
+def test_planner_processes_share_one_budget(fake_optic, engine, mapping, monkeypatch):
+    # Two configurations, two parallel slots in the race, but one planner process allowed.
+    monkeypatch.setenv("FAKE_OPTIC_SLEEP", "0.5")
+    monkeypatch.setattr(scheduler, "planner_slots", threading.BoundedSemaphore(1))
+    running, peak = [], []
+
+    def on_start(proc):
+        running[:] = [p for p in running if p.poll() is None] + [proc]
+        peak.append(len(running))
+
+    configs = [{"name": "a", "args": []}, {"name": "b", "args": ["-N"]}]
+    started = time.monotonic()
+    result = scheduler.run_portfolio("S1", engine, mapping, configs=configs, mode="best",
+                                     max_parallel=2, on_start=on_start, deadline=20)
+    assert result["status"] == "success"
+    assert max(peak) == 1
+    assert time.monotonic() - started >= 1.0
@@ -12,6 +12,15 @@ workflow_state = {}
 
 DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
 
+def wait_for_event(client, event_id):
+    # PDDL generation runs on the event workers; wait for it before validating artifacts.
+    assert event_id, "Ingestion did not return an event_id"
+    response = client.get(f"/events/{event_id}", params={"wait": 60})
+    assert response.status_code == 200, f"Event lookup failed: {response.text}"
+    event = response.json()
+    assert event["status"] == "done", f"Event did not finish: {event}"
+    assert not event["errors"], f"Event listeners failed: {event['errors']}"
+
 # ------------------------------------------------------------------
 # TEST 1: Create the Project (Target)
 # ------------------------------------------------------------------
@@ -53,6 +62,7 @@ def test_ingest_target_schedule(client, resources_dir):
     assert response.status_code == 200, f"Target schedule ingestion failed: {response.text}"
     data = response.json()
     assert data.get("schedule_id") == "TARGET001", "Target schedule ingestion did not return expected schedule_id"
+    wait_for_event(client, data.get("event_id"))
 
 # ------------------------------------------------------------------
 # TEST 3: Validate the Target Project's Data and PDDL Mapping in the DB
@@ -102,6 +112,7 @@ def test_ingest_inprogress_schedule(client, resources_dir):
     assert response.status_code == 200, f"In-progress schedule ingestion failed: {response.text}"
     data = response.json()
     assert data.get("schedule_id") == "INPROGRESS001", "Ingestion did not return expected in-progress schedule_id"
+    wait_for_event(client, data.get("event_id"))
 
 # ------------------------------------------------------------------
 # TEST 5: Validate the In-Progress Project's Data in the DB
@@ -0,0 +1,31 @@
+import pytest
+
+from construct.project import create_project
+from construct.registry import ProjectRegistry, ProjectNotFound
+
+def test_resolves_schedules_to_their_project_db(tmp_path):
+    project_a, db_a = create_project("Alpha", "SCHED_A", str(tmp_path / "a"))
+    create_project("Beta", "SCHED_B", str(tmp_path / "b"))
+    registry = ProjectRegistry(roots=[str(tmp_path)])
+
+    # Found by scanning the roots on the first miss.
+    engine_a, folder_a = registry.resolve(schedule_id="SCHED_A")
+    assert engine_a.url.database == db_a
+    assert folder_a == str(tmp_path / "a")
+    engine_b, _ = registry.resolve(schedule_id="SCHED_B")
+    assert engine_b is not engine_a
+
+    # Engines are cached and shared between handle- and schedule-based lookups.
+    assert registry.resolve(project_handle=project_a)[0] is engine_a
+    assert registry.engine_for_schedule("SCHED_A") is engine_a
+
+def test_engine_cache_is_bounded(tmp_path):
+    registry = ProjectRegistry(max_engines=1)
+    first = registry.engine(f"sqlite:///{tmp_path / 'one.db'}")
+    registry.engine(f"sqlite:///{tmp_path / 'two.db'}")
+    assert registry.engine(f"sqlite:///{tmp_path / 'one.db'}") is not first
+
+def test_bad_handle_raises(tmp_path):
+    registry = ProjectRegistry()
+    with pytest.raises(ProjectNotFound):
+        registry.resolve(project_handle=str(tmp_path / "missing.cproj"))
@@ -0,0 +1,59 @@
+import json
+
+from construct.synthetic import generate_schedule, write_csv
+from construct.ingestion import parse_schedule_file
+from construct.bench import run_bench, STAGES
+
+def test_generator_is_seeded_and_respects_dependencies():
+    schedule = generate_schedule(500, wbs_depth=3, dependency_density=2.0, progress="behind", seed=7)
+    assert schedule == generate_schedule(500, wbs_depth=3, dependency_density=2.0, progress="behind", seed=7)
+    assert schedule != generate_schedule(500, wbs_depth=3, dependency_density=2.0, progress="behind", seed=8)
+
+    target = {t["task_id"]: t for t in schedule["target"]}
+    assert len(target) == 500
+    assert 900 <= len(schedule["dependencies"]) <= 1000
+    for task_id, depends_on in schedule["dependencies"]:
+        assert target[depends_on]["bl_finish"] <= target[task_id]["bl_start"]
+    assert all(len(t["wbs_value"].split(".")) == 4 for t in schedule["target"])
+    assert all(t["percent_done"] < 100 or t["status"] == "Completed" for t in schedule["progress"])
+
+def test_csv_output_round_trips_through_ingestion(tmp_path):
+    schedule = generate_schedule(50, seed=1)
+    paths = write_csv(schedule, str(tmp_path))
+    parsed = parse_schedule_file(paths["in-progress"], "SYN001", "in-progress")
+    assert parsed["project_name"] == schedule["project_name"]
+    rows = {r["task_id"]: r for r in parsed["task_rows"]}
+    for task in schedule["progress"]:
+        assert rows[task["task_id"]]["percent_done"] == task["percent_done"]
+        assert rows[task["task_id"]]["wbs_value"] == task["wbs_value"]
+
+def test_bench_times_every_stage(tmp_path):
+    output = tmp_path / "bench.json"
+    run_bench(sizes=[200], output=str(output), workdir=str(tmp_path / "work"))
+    report = json.loads(output.read_text())
+    assert [r["stage"] for r in report["results"]] == STAGES
+    assert not [r for r in report["results"] if "error" in r]
+
+    # A second run compares against the first.
+    run_bench(sizes=[200], stages=["analyze"], output=str(tmp_path / "again.json"),
+              baseline=str(output), workdir=str(tmp_path / "work2"))
+    again = json.loads((tmp_path / "again.json").read_text())
+    assert [r["stage"] for r in again["results"]] == ["generate", "write_files", "parse", "ingest", "analyze"]
+
+def test_synth_db_writes_both_projects_rows(tmp_path):
+    from sqlalchemy import create_engine, select
+    from construct.database import projects_table
+    from construct.main import main
+
+    db_url = f"sqlite:///{tmp_path / 'synth.db'}"
+    for _ in range(2):
+        assert main(["synth", "--tasks", "50", "--format", "db", "--db-url", db_url]) == 0
+    status_date = generate_schedule(50)["status_date"]
+    with create_engine(db_url).connect() as conn:
+        rows = conn.execute(
+            select(projects_table.c.schedule_type, projects_table.c.data_version,
+                   projects_table.c.current_in_progress_date)
+            .where(projects_table.c.schedule_id == "SYNTH001")
+            .order_by(projects_table.c.schedule_type)
+        ).fetchall()
+    assert [tuple(r) for r in rows] == [("in-progress", 2, status_date), ("target", 2, status_date)]
@@ -0,0 +1,120 @@
+import os
+import time
+
+from construct.eventing import EventManager, Event
+from construct.tracing import Tracer, tracer, run_traced, chrome_trace, speedscope
+
+def _work(n):
+    with tracer.span("inner", n=n):
+        return n * 2
+
+def test_nested_spans_share_the_trace_and_link_to_their_parent():
+    local = Tracer(max_traces=2)
+    with local.span("outer") as outer:
+        with local.span("inner"):
+            pass
+        outer.set(rows=3)
+    spans = local.get(local.traces()[0]["trace_id"])["spans"]
+    by_name = {s["name"]: s for s in spans}
+    assert by_name["inner"]["parent_id"] == by_name["outer"]["span_id"]
+    assert by_name["inner"]["trace_id"] == by_name["outer"]["trace_id"]
+    assert by_name["outer"]["attrs"] == {"rows": 3}
+
+    for _ in range(3):
+        with local.span("other"):
+            pass
+    assert len(local.traces()) == 2
+
+def test_run_traced_returns_worker_spans_under_the_callers_trace():
+    with tracer.continue_trace("feedface" * 4):
+        with tracer.span("caller"):
+            result, spans = run_traced(tracer.context(), _work, (21,), {})
+    assert result == 42
+    assert [s["name"] for s in spans] == ["inner", "worker._work"]
+    assert {s["trace_id"] for s in spans} == {"feedface" * 4}
+    # Collected for the caller, not filed by the worker.
+    assert "inner" not in {s["name"] for s in tracer.get("feedface" * 4)["spans"]}
+
+def test_events_continue_the_emitters_trace():
+    manager = EventManager()
+    manager.add_listener("traced", lambda e: time.sleep(0.01))
+    manager.start(workers=1)
+    try:
+        with tracer.continue_trace() as trace_id:
+            with tracer.span("emit"):
+                handle = manager.emit(Event("traced", {"n": 1}))
+        assert handle.wait(5)
+    finally:
+        manager.stop(wait=True)
+    assert handle.to_dict()["trace_id"] == trace_id
+    names = {s["name"] for s in tracer.get(trace_id)["spans"]}
+    assert {"emit", "event.dispatch", "listener.<lambda>"} <= names
+
+def test_exports_are_nested_per_thread():
+    trace = {"spans": [
+        {"name": "a", "trace_id": "t", "span_id": "1", "parent_id": None, "pid": 1, "tid": 1,
+         "thread": "main", "start": 100.0, "duration": 1.0, "attrs": {}},
+        # Overlaps the end of its parent; speedscope gets it cut at 101.0.
+        {"name": "b", "trace_id": "t", "span_id": "2", "parent_id": "1", "pid": 1, "tid": 1,
+         "thread": "main", "start": 100.5, "duration": 1.0, "attrs": {}},
+        {"name": "c", "trace_id": "t", "span_id": "3", "parent_id": "1", "pid": 2, "tid": 7,
+         "thread": "worker", "start": 100.2, "duration": 0.1, "attrs": {"error": "boom"}},
+    ], "samples": [
+        {"t": 100.6, "pid": 1, "tid": 1, "thread": "main", "weight": 0.01,
+         "stack": [("main", "app.py", 1), ("work", "app.py", 9)]},
+    ], "dropped": 0}
+
+    chrome = chrome_trace(trace, "t")
+    complete = [e for e in chrome["traceEvents"] if e["ph"] == "X"]
+    assert {e["name"]: e["dur"] for e in complete} == {"a": 1e6, "b": 1e6, "c": 1e5}
+    assert {e["args"]["name"] for e in chrome["traceEvents"] if e["ph"] == "M"} == {"main", "worker"}
+
+    profile = speedscope(trace, "t")
+    names = [f["name"] for f in profile["shared"]["frames"]]
+    main = profile["profiles"][0]
+    assert [(e["type"], names[e["frame"]], round(e["at"])) for e in main["events"]] == [
+        ("O", "a", 0), ("O", "b", 500), ("C", "b", 1000), ("C", "a", 1000),
+    ]
+    sampled = [p for p in profile["profiles"] if p["type"] == "sampled"]
+    assert [[names[i] for i in stack] for stack in sampled[0]["samples"]] == [["main", "work"]]
+
+def test_profiler_samples_threads_inside_spans():
+    local = Tracer()
+    local.start_profiler(0.002)
+    try:
+        with local.span("busy"):
+            deadline = time.monotonic() + 0.1
+            while time.monotonic() < deadline:
+                pass
+    finally:
+        local.stop_profiler()
+    trace = local.get(local.traces()[0]["trace_id"])
+    assert trace["samples"]
+    assert any(frame[0] == "test_profiler_samples_threads_inside_spans" for frame in trace["samples"][0]["stack"])
+
+def test_ingest_request_is_traced_through_pddl_generation(client, resources_dir, tmp_path):
+    response = client.post("/create-project/", json={
+        "project_name": "Trace Project", "schedule_id": "TRACE001", "project_folder": str(tmp_path),
+    })
+    assert response.status_code == 200, response.text
+    trace_id = "abc123trace"
+    response = client.post("/ingest-schedule/", params={
+        "file_path": os.path.join(resources_dir, "test_1.xlsx"),
+        "schedule_id": "TRACE001",
+        "schedule_type": "target",
+    }, headers={"X-Trace-Id": trace_id})
+    assert response.status_code == 200, response.text
+    assert response.headers["x-trace-id"] == trace_id
+    event = client.get(f"/events/{response.json()['event_id']}", params={"wait": 30}).json()
+    assert event["status"] == "done", event
+    assert event["trace_id"] == trace_id
+
+    chrome = client.get(f"/traces/{trace_id}", params={"format": "chrome"})
+    assert chrome.status_code == 200
+    names = {e["name"] for e in chrome.json()["traceEvents"] if e["ph"] == "X"}
+    assert {"http.request", "ingest.parse", "ingest.write", "db.write_job", "event.dispatch",
+            "listener.schedule_ingested_handler", "pddl.domain_for_target"} <= names
+    assert client.get(f"/traces/{trace_id}", params={"format": "speedscope"}).json()["profiles"]
+    assert trace_id in {t["trace_id"] for t in client.get("/traces").json()}
+    assert client.get("/traces/unknown").status_code == 404
+    assert client.get(f"/traces/{trace_id}", params={"format": "xml"}).status_code == 400
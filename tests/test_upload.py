@@ -0,0 +1,54 @@
+import os
+from sqlalchemy import create_engine, select, func
+
+from construct.database import tasks_table
+
+def test_upload_schedule_streams_and_ingests(client, resources_dir, tmp_path):
+    response = client.post("/create-project/", json={
+        "project_name": "UploadProject", "schedule_id": "UPLOAD001", "project_folder": str(tmp_path),
+    })
+    assert response.status_code == 200, response.text
+    project = response.json()
+
+    with open(os.path.join(resources_dir, "test_1.xlsx"), "rb") as f:
+        body = f.read()
+    params = {"schedule_id": "UPLOAD001", "schedule_type": "target", "project_handle": project["project_file"]}
+    response = client.post("/upload-schedule/", params=params, content=body,
+                           headers={"Content-Type": "application/octet-stream"})
+    assert response.status_code == 200, response.text
+    submitted = response.json()
+    assert submitted["status"] == "submitted"
+
+    job = client.get(f"/ingest-jobs/{submitted['job_id']}", params={"wait": 60}).json()
+    assert job["status"] == "succeeded", job
+    assert job["meta"]["bytes"] == len(body)
+    assert job["result"]["schedule_id"] == "UPLOAD001"
+
+    engine = create_engine(f"sqlite:///{project['db_file']}")
+    with engine.connect() as conn:
+        count = conn.execute(
+            select(func.count()).select_from(tasks_table).where(tasks_table.c.schedule_id == "UPLOAD001")
+        ).scalar()
+    assert count > 0
+
+    # The same bytes again are recognised by their hash and not re-ingested.
+    response = client.post("/upload-schedule/", params=params, content=body,
+                           headers={"Content-Type": "application/octet-stream"})
+    assert response.json() == {"status": "duplicate", "job_id": submitted["job_id"], "sha256": submitted["sha256"]}
+
+def test_upload_schedule_rejects_bad_project_handle(client, tmp_path):
+    response = client.post("/upload-schedule/", params={
+        "schedule_id": "UPLOAD002", "project_handle": str(tmp_path / "missing.cproj"),
+    }, content=b"data")
+    assert response.status_code == 400
+
+def test_upload_dedup_memory_is_bounded(client, monkeypatch, tmp_path):
+    from construct import api
+    monkeypatch.setitem(api.UPLOAD_CONFIG, "max_tracked", 2)
+    monkeypatch.setitem(api.UPLOAD_CONFIG, "upload_dir", str(tmp_path))
+    monkeypatch.setattr(api, "_last_uploads", api.OrderedDict())
+    monkeypatch.setattr(api.ingest_jobs, "submit", lambda *args, **kwargs: type("Job", (), {"job_id": "j", "status": "queued"})())
+    for schedule_id in ("DEDUP1", "DEDUP2", "DEDUP3"):
+        response = client.post("/upload-schedule/", params={"schedule_id": schedule_id}, content=b"data")
+        assert response.json()["status"] == "submitted"
+    assert [key[1] for key in api._last_uploads] == ["DEDUP2", "DEDUP3"]